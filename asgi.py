@@ -0,0 +1,11 @@
+# ASGI entry point, e.g. `uvicorn asgi:app`.
+#
+# The /api/async generation routes are served on the event loop: waiting
+# on OpenAI holds no thread, and one AsyncOpenAI client is shared for the
+# life of the process. Every other route is the Flask app behind asgiref's
+# WsgiToAsgi.
+
+from backend.asgi import RecipeASGI
+from run import app as flask_app
+
+app = RecipeASGI(flask_app)
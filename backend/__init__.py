@@ -2,9 +2,9 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 from flask_migrate import Migrate
-from flask_session import Session
 from dotenv import load_dotenv
 import os
+import tempfile
 from datetime import timedelta
 
 db = SQLAlchemy()
@@ -12,18 +12,38 @@ migrate = Migrate()
 
 
 load_dotenv()
-secret_key = os.getenv("SECRET_KEY")
-
-if not secret_key:
-    raise RuntimeError(
-        "SECRET_KEY is not set. Please set it in the environment variables."
-    )
 
 
 def create_app():
+    secret_key = os.environ.get("SECRET_KEY")
+    if not secret_key:
+        raise RuntimeError(
+            "SECRET_KEY is not set. Please set it in the environment variables."
+        )
+
     app = Flask(__name__, static_folder='static/build', template_folder='static')
     CORS(app)
 
+    # Configure logging through a background queue listener
+    app.config['LOG_FILE'] = os.environ.get('LOG_FILE', 'recipe_api.log')
+    app.config['LOG_FORMAT'] = os.environ.get('LOG_FORMAT', 'json')
+    app.config['LOG_LEVEL'] = os.environ.get('LOG_LEVEL', 'INFO')
+    app.config['LOG_MAX_BYTES'] = int(
+        os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024))
+    app.config['LOG_BACKUP_COUNT'] = int(
+        os.environ.get('LOG_BACKUP_COUNT', 5))
+    app.config['LOG_QUEUE_SIZE'] = int(
+        os.environ.get('LOG_QUEUE_SIZE', 10000))
+    app.config['LOG_INFO_SAMPLE_RATE'] = float(
+        os.environ.get('LOG_INFO_SAMPLE_RATE', 1.0))
+
+    from .log_config import configure_logging
+    configure_logging(app)
+
+    # Encode and decode JSON with msgspec
+    from .json_provider import MsgspecJSONProvider
+    app.json = MsgspecJSONProvider(app)
+
     db_url = os.environ.get('DATABASE_URL', 'sqlite:///app.db')
     if db_url.startswith('postgres://'):
         db_url = db_url.replace('postgres://', 'postgresql://', 1)
@@ -31,20 +51,190 @@ def create_app():
     app.config['SQLALCHEMY_DATABASE_URI'] = db_url
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+    # Tune the engine for SQLite or Postgres
+    from . import engine
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine.engine_options(db_url)
+
     # Configure session
     app.config['SECRET_KEY'] = secret_key
-    app.config['SESSION_TYPE'] = 'filesystem'
+    app.config['SESSION_TYPE'] = os.environ.get('SESSION_TYPE', 'sqlalchemy')
     app.config['SESSION_PERMANENT'] = True
     app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(days=7)
     app.config['SESSION_USE_SIGNER'] = True
+    app.config['SESSION_REFRESH_INTERVAL'] = timedelta(
+        seconds=int(os.environ.get('SESSION_REFRESH_INTERVAL', 3600)))
+    app.config['SESSION_SWEEP_INTERVAL'] = int(
+        os.environ.get('SESSION_SWEEP_INTERVAL', 300))
+    app.config['SESSION_SWEEP_BATCH_SIZE'] = int(
+        os.environ.get('SESSION_SWEEP_BATCH_SIZE', 500))
+
+    # Configure authentication ('session' or stateless signed 'token')
+    app.config['AUTH_MODE'] = os.environ.get('AUTH_MODE', 'session')
+    app.config['AUTH_TOKEN_MAX_AGE'] = int(
+        os.environ.get('AUTH_TOKEN_MAX_AGE', 7 * 24 * 3600))
+    app.config['AUTH_REVOCATION_SYNC_INTERVAL'] = int(
+        os.environ.get('AUTH_REVOCATION_SYNC_INTERVAL', 30))
+
+    # Configure the user identity cache
+    app.config['USER_CACHE_TTL'] = int(os.environ.get('USER_CACHE_TTL', 30))
+    app.config['USER_CACHE_SIZE'] = int(
+        os.environ.get('USER_CACHE_SIZE', 1024))
+
+    # Configure per-user rate limiting of the generation endpoints
+    app.config['RATE_LIMIT_ENABLED'] = os.environ.get(
+        'RATE_LIMIT_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    app.config['RATE_LIMIT_STORE'] = os.environ.get(
+        'RATE_LIMIT_STORE', 'database')
+    app.config['RATE_LIMIT_CAPACITY'] = int(
+        os.environ.get('RATE_LIMIT_CAPACITY', 5))
+    app.config['RATE_LIMIT_REFILL_PER_MINUTE'] = float(
+        os.environ.get('RATE_LIMIT_REFILL_PER_MINUTE', 6))
+
+    # Configure admission control for outbound OpenAI calls; unless set
+    # explicitly, each of WEB_CONCURRENCY workers gets an equal share of
+    # the account-wide OPENAI_TIER_CONCURRENCY limit
+    app.config['OPENAI_MAX_CONCURRENCY'] = int(
+        os.environ.get('OPENAI_MAX_CONCURRENCY') or max(1, int(
+            os.environ.get('OPENAI_TIER_CONCURRENCY', 8)) // int(
+            os.environ.get('WEB_CONCURRENCY', 1))))
+    app.config['OPENAI_QUEUE_SIZE'] = int(
+        os.environ.get('OPENAI_QUEUE_SIZE', 32))
+    app.config['OPENAI_QUEUE_TIMEOUT'] = float(
+        os.environ.get('OPENAI_QUEUE_TIMEOUT', 3))
+
+    # Configure request tracing (off unless TRACE_SAMPLE_RATE is above zero)
+    app.config['TRACE_SAMPLE_RATE'] = float(
+        os.environ.get('TRACE_SAMPLE_RATE', 0))
+    app.config['TRACE_EXPORTER'] = os.environ.get('TRACE_EXPORTER', 'file')
+    app.config['TRACE_FILE'] = os.environ.get('TRACE_FILE', 'traces.jsonl')
+    app.config['TRACE_OTLP_ENDPOINT'] = os.environ.get(
+        'TRACE_OTLP_ENDPOINT', 'http://localhost:4318')
+    # Addresses or CIDR ranges whose sampled traceparent flag is followed
+    app.config['TRACE_TRUSTED_PARENTS'] = [
+        network.strip()
+        for network in os.environ.get('TRACE_TRUSTED_PARENTS', '').split(',')
+        if network.strip()]
+
+    # Configure the opt-in per-request SQL profiler
+    app.config['SQL_PROFILER_ENABLED'] = os.environ.get(
+        'SQL_PROFILER_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    app.config['SQL_SLOW_QUERY_MS'] = float(
+        os.environ.get('SQL_SLOW_QUERY_MS', 100))
+    app.config['SQL_REPEAT_THRESHOLD'] = int(
+        os.environ.get('SQL_REPEAT_THRESHOLD', 5))
+
+    # Configure the admin-only sampling profiler
+    app.config['PROFILER_ENABLED'] = os.environ.get(
+        'PROFILER_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    # Kept under the 30s worker timeout so a profile request is never killed
+    app.config['PROFILER_MAX_SECONDS'] = float(
+        os.environ.get('PROFILER_MAX_SECONDS', 25))
+    app.config['ADMIN_EMAILS'] = [
+        email.strip().lower()
+        for email in os.environ.get('ADMIN_EMAILS', '').split(',')
+        if email.strip()]
+    # Lets monitoring read /api/metrics without an admin session
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+
+    # Configure the shared generation cache and its off-peak warmer
+    app.config['GENERATION_CACHE_ENABLED'] = os.environ.get(
+        'GENERATION_CACHE_ENABLED', 'true').lower() in ('1', 'true', 'yes')
+    app.config['GENERATION_CACHE_TTL'] = int(
+        os.environ.get('GENERATION_CACHE_TTL', 24 * 3600))
+    app.config['WARMER_ENABLED'] = os.environ.get(
+        'WARMER_ENABLED', 'false').lower() in ('1', 'true', 'yes')
+    app.config['WARMER_TOKEN_BUDGET'] = int(
+        os.environ.get('WARMER_TOKEN_BUDGET', 20000))
+    app.config['WARMER_TOP_N'] = int(os.environ.get('WARMER_TOP_N', 20))
+    app.config['WARMER_MIN_COUNT'] = int(
+        os.environ.get('WARMER_MIN_COUNT', 2))
+    app.config['WARMER_LOOKBACK_HOURS'] = int(
+        os.environ.get('WARMER_LOOKBACK_HOURS', 24))
+    app.config['WARMER_OFF_PEAK_HOURS'] = os.environ.get(
+        'WARMER_OFF_PEAK_HOURS', '2-5')
+    # Hours between warming runs; entries expiring sooner are warmed again
+    app.config['WARMER_RUN_INTERVAL_HOURS'] = int(
+        os.environ.get('WARMER_RUN_INTERVAL_HOURS', 24))
+    # Only the worker holding this lock runs the background warmer
+    app.config['WARMER_LOCK_FILE'] = os.environ.get(
+        'WARMER_LOCK_FILE',
+        os.path.join(tempfile.gettempdir(), 'recipe-warmer.lock'))
+
+    # Configure response compression
+    app.config['COMPRESS_MIN_SIZE'] = int(
+        os.environ.get('COMPRESS_MIN_SIZE', 1024))
+    app.config['COMPRESS_LEVEL'] = int(os.environ.get('COMPRESS_LEVEL', 6))
 
-    # Initialize session and database
-    Session(app)
+    # Serve the SPA shell and bundle from memory
+    app.config['STATIC_IN_MEMORY'] = os.environ.get(
+        'STATIC_IN_MEMORY', 'true').lower() in ('1', 'true', 'yes')
+
+    # Configure the password hashing pool
+    app.config['PASSWORD_HASH_WORKERS'] = int(
+        os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    app.config['PASSWORD_HASH_QUEUE_SIZE'] = int(
+        os.environ.get('PASSWORD_HASH_QUEUE_SIZE', 32))
+    app.config['PASSWORD_HASH_QUEUE_TIMEOUT'] = float(
+        os.environ.get('PASSWORD_HASH_QUEUE_TIMEOUT', 5))
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get(
+        'PASSWORD_HASH_METHOD', 'pbkdf2:sha256')
+
+    # Initialize database and session
     db.init_app(app)
     migrate.init_app(app, db)
+    engine.init_app(app)
+
+    from . import tracing
+    tracing.init_app(app)
+
+    from . import sql_profiler
+    sql_profiler.init_app(app)
+
+    from . import sampling_profiler
+    sampling_profiler.init_app(app)
+
+    if app.config['SESSION_TYPE'] == 'sqlalchemy':
+        from .sessions import DatabaseSessionInterface
+        app.session_interface = DatabaseSessionInterface(
+            app,
+            use_signer=app.config['SESSION_USE_SIGNER'],
+            permanent=app.config['SESSION_PERMANENT'],
+            refresh_interval=app.config['SESSION_REFRESH_INTERVAL'],
+            sweep_interval=app.config['SESSION_SWEEP_INTERVAL'],
+            sweep_batch_size=app.config['SESSION_SWEEP_BATCH_SIZE']
+        )
+    else:
+        from flask_session import Session
+        Session(app)
+
+    from . import passwords
+    passwords.init_app(app)
+
+    from .auth import tokens
+    tokens.init_app(app)
+
+    from .identity import identities
+    identities.init_app(app)
+
+    from . import ratelimit
+    ratelimit.init_app(app)
+
+    from . import admission
+    admission.init_app(app)
+
+    from . import warmer
+    warmer.init_app(app)
+
+    from . import compression
+    compression.init_app(app)
+
+    if app.config['STATIC_IN_MEMORY']:
+        from . import static_assets
+        static_assets.init_app(app)
 
     # Import and register the blueprint
     from .routes import main
     app.register_blueprint(main)
+    tracing.trace_views(app)
 
     return app
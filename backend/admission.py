@@ -0,0 +1,236 @@
+from contextlib import asynccontextmanager, contextmanager
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+
+# Lower numbers are admitted first
+PRIORITY_USER = 0
+PRIORITY_ANONYMOUS = 1
+PRIORITY_BACKGROUND = 2
+
+
+class AdmissionRejected(RuntimeError):
+    """Raised when a call is shed instead of waiting for a slot."""
+
+
+class _Waiter:
+    __slots__ = ('granted', 'cancelled')
+
+    def __init__(self):
+        self.granted = False
+        self.cancelled = False
+
+
+class AdmissionController:
+    """Bounds concurrent outbound OpenAI calls with a priority wait queue.
+
+    At most ``max_concurrent`` calls run at once. Up to ``max_queue`` more
+    wait, highest priority first, for at most ``queue_timeout`` seconds;
+    anything beyond that is rejected straight away with
+    :class:`AdmissionRejected`.
+    """
+
+    def __init__(self, max_concurrent=8, max_queue=32, queue_timeout=3.0):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._active = 0
+        self._queued = 0
+        self._admitted = 0
+        self._rejected_full = 0
+        self._rejected_timeout = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+
+    def configure(self, max_concurrent, max_queue, queue_timeout):
+        with self._cond:
+            self.max_concurrent = max_concurrent
+            self.max_queue = max_queue
+            self.queue_timeout = queue_timeout
+
+    def _record_wait(self, waited):
+        self._admitted += 1
+        self._wait_seconds += waited
+        self._max_wait_seconds = max(self._max_wait_seconds, waited)
+
+    def acquire(self, priority=PRIORITY_ANONYMOUS):
+        start = time.monotonic()
+        with self._cond:
+            if self._active < self.max_concurrent and not self._queued:
+                self._active += 1
+                self._record_wait(0.0)
+                return
+
+            if self._queued >= self.max_queue:
+                self._rejected_full += 1
+                logging.warning('OpenAI admission queue is full, request shed.')
+                raise AdmissionRejected('Admission queue is full')
+
+            waiter = _Waiter()
+            heapq.heappush(
+                self._waiters, (priority, next(self._sequence), waiter))
+            self._queued += 1
+            deadline = start + self.queue_timeout
+            while not waiter.granted:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            if not waiter.granted:
+                waiter.cancelled = True
+                self._queued -= 1
+                self._rejected_timeout += 1
+                logging.warning('Timed out waiting for an OpenAI slot, request shed.')
+                raise AdmissionRejected('Timed out waiting for a slot')
+            self._record_wait(time.monotonic() - start)
+
+    def try_acquire(self):
+        """Take a free slot without queueing; return whether one was taken."""
+        with self._cond:
+            if self._active >= self.max_concurrent or self._queued:
+                return False
+            self._active += 1
+            self._record_wait(0.0)
+            return True
+
+    def release(self):
+        with self._cond:
+            # Hand the slot straight to the best waiter, if there is one
+            while self._waiters:
+                _, _, waiter = heapq.heappop(self._waiters)
+                if not waiter.cancelled:
+                    waiter.granted = True
+                    self._queued -= 1
+                    self._cond.notify_all()
+                    return
+            self._active -= 1
+
+    @contextmanager
+    def slot(self, priority=PRIORITY_ANONYMOUS):
+        """Hold a slot for the duration of the block."""
+        self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def metrics(self):
+        """Return a snapshot of concurrency, queue depth and wait times."""
+        with self._cond:
+            return {
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue,
+                'active': self._active,
+                'queue_depth': self._queued,
+                'admitted': self._admitted,
+                'rejected_queue_full': self._rejected_full,
+                'rejected_timeout': self._rejected_timeout,
+                'avg_wait_ms': round(self._wait_seconds / self._admitted * 1000, 3)
+                if self._admitted else 0.0,
+                'max_wait_ms': round(self._max_wait_seconds * 1000, 3)
+            }
+
+
+class AsyncAdmissionController:
+    """Event-loop counterpart of :class:`AdmissionController`.
+
+    Built on :class:`asyncio.Semaphore`, so a waiting request holds no
+    thread. Waiters are admitted in arrival order rather than by priority.
+    Use it from one event loop only, the ASGI server's.
+    """
+
+    def __init__(self, max_concurrent=8, max_queue=32, queue_timeout=3.0):
+        self.configure(max_concurrent, max_queue, queue_timeout)
+        self._active = 0
+        self._queued = 0
+        self._admitted = 0
+        self._rejected_full = 0
+        self._rejected_timeout = 0
+
+    def configure(self, max_concurrent, max_queue, queue_timeout):
+        """Resize the controller; call before the event loop starts using it."""
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold a slot for the duration of the block."""
+        if self._semaphore.locked():
+            if self._queued >= self.max_queue:
+                self._rejected_full += 1
+                logging.warning('OpenAI admission queue is full, request shed.')
+                raise AdmissionRejected('Admission queue is full')
+            self._queued += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self._rejected_timeout += 1
+                logging.warning('Timed out waiting for an OpenAI slot, request shed.')
+                raise AdmissionRejected('Timed out waiting for a slot')
+            finally:
+                self._queued -= 1
+        else:
+            await self._semaphore.acquire()
+        self._active += 1
+        self._admitted += 1
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._semaphore.release()
+
+    def metrics(self):
+        return {
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'active': self._active,
+            'queue_depth': self._queued,
+            'admitted': self._admitted,
+            'rejected_queue_full': self._rejected_full,
+            'rejected_timeout': self._rejected_timeout
+        }
+
+
+admission = AdmissionController()
+async_admission = AsyncAdmissionController()
+
+
+def split_budget(max_concurrent):
+    """Share one worker's OpenAI cap between the two controllers.
+
+    Behind the ASGI front end, the async routes take slots from
+    :data:`async_admission` while every route on the WSGI fallback takes
+    them from :data:`admission`, so each gets half of ``max_concurrent``
+    to keep the worker within it.
+    """
+    if max_concurrent < 2:
+        logging.warning('OPENAI_MAX_CONCURRENCY is below 2; sync and async '
+                        'routes each get one OpenAI slot.')
+    async_share = max(1, max_concurrent // 2)
+    admission.configure(max(1, max_concurrent - async_share),
+                        admission.max_queue, admission.queue_timeout)
+    async_admission.configure(async_share, async_admission.max_queue,
+                              async_admission.queue_timeout)
+
+
+def init_app(app):
+    """Size the shared admission controllers from the app config.
+
+    Each starts with the whole per-worker cap; the ASGI front end divides
+    it between them with :func:`split_budget`.
+    """
+    for controller in (admission, async_admission):
+        controller.configure(
+            max_concurrent=app.config['OPENAI_MAX_CONCURRENCY'],
+            max_queue=app.config['OPENAI_QUEUE_SIZE'],
+            queue_timeout=app.config['OPENAI_QUEUE_TIMEOUT']
+        )
@@ -0,0 +1,277 @@
+from flask import jsonify
+from functools import partial
+from .admission import AdmissionRejected, split_budget
+from backend import db
+from .auth import current_user_id
+from .chatgptAPI import generate_recipe_async, get_async_client, close_async_client
+from .generation_cache import generation_cache, public_result
+from .ratelimit import check_limit
+from .sampling_profiler import profiler
+from .schemas import parse_request, GenerateRecipe, GenerateFromFridge
+from .tracing import tracer, _current_span
+import asyncio
+import contextvars
+import io
+import logging
+import sys
+
+# path: (schema, ingredients field, message for a bad body, success log line)
+ASYNC_ROUTES = {
+    '/api/async/generate-recipe': (
+        GenerateRecipe, 'ingredients',
+        "Please provide ingredients as a comma-separated string",
+        "Successfully processed recipe request"),
+    '/api/async/generate-recipe-from-fridge': (
+        GenerateFromFridge, 'fridge_ingredients',
+        "Please provide ingredients as a list",
+        "Successfully processed recipe from fridge request"),
+}
+
+
+class ClientDisconnected(Exception):
+    """Raised when the client goes away before sending its whole body."""
+
+
+async def read_body(receive, limit=None):
+    """Return the request body, or None if it is over ``limit`` bytes."""
+    chunks = []
+    size = 0
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            raise ClientDisconnected()
+        chunk = message.get('body', b'')
+        size += len(chunk)
+        if limit is not None and size > limit:
+            return None
+        chunks.append(chunk)
+        if not message.get('more_body', False):
+            return b''.join(chunks)
+
+
+def wsgi_environ(scope, body):
+    """Build a WSGI environ for an ASGI HTTP scope and its body."""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        'PATH_INFO': scope['path'],
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = name if name == 'CONTENT_TYPE' else f'HTTP_{name}'
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+class RecipeASGI:
+    """ASGI front end that serves recipe generation on the event loop.
+
+    Requests to :data:`ASYNC_ROUTES` wait on OpenAI without holding a
+    thread: the short Flask work around the call (rate limiting, session,
+    body parsing, the generation cache) runs in the default executor, then
+    the call itself is awaited through one AsyncOpenAI client that lives
+    from lifespan start-up to shutdown. Every other request goes to
+    ``fallback``, by default the Flask app behind asgiref's ``WsgiToAsgi``.
+    Both kinds of request call OpenAI, so the worker's cap is split between
+    the sync and async admission controllers.
+    """
+
+    def __init__(self, flask_app, fallback=None):
+        self.flask_app = flask_app
+        self.fallback = fallback
+        split_budget(flask_app.config['OPENAI_MAX_CONCURRENCY'])
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif (scope['type'] == 'http' and scope['method'] == 'POST'
+                and scope['path'] in ASYNC_ROUTES):
+            try:
+                await self._generate(scope, receive, send)
+            except ClientDisconnected:
+                return
+        else:
+            await self._fallback_app()(scope, receive, send)
+
+    def _fallback_app(self):
+        if self.fallback is None:
+            from asgiref.wsgi import WsgiToAsgi
+            self.fallback = WsgiToAsgi(self.flask_app)
+        return self.fallback
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    get_async_client()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed',
+                                'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await close_async_client()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _generate(self, scope, receive, send):
+        schema, field, error_message, success_message = ASYNC_ROUTES[scope['path']]
+        body = await read_body(receive, self.flask_app.config.get('MAX_CONTENT_LENGTH'))
+        if body is None:
+            await _send(send, 413, [(b'content-type', b'application/json')],
+                        b'{"error": "Request body is too large"}')
+            return
+
+        environ = wsgi_environ(scope, body)
+        root = tracer.start_root(
+            f"POST {scope['path']}",
+            traceparent=environ.get('HTTP_TRACEPARENT'),
+            trusted=tracer.is_trusted(environ.get('REMOTE_ADDR')),
+            **{'http.method': 'POST', 'http.target': scope['path']}
+        )
+        token = _current_span.set(root) if root is not None else None
+        # The request context lives in this Context across executor hops
+        context = contextvars.copy_context()
+        loop = asyncio.get_running_loop()
+
+        def in_context(func, *args):
+            return loop.run_in_executor(None, partial(context.run, func, *args))
+
+        open_ctx = None
+        try:
+            response, state = await in_context(
+                self._open, environ, schema, field, error_message)
+            if response is None:
+                open_ctx, ingredients, dietary_concerns, logged_in = state
+                try:
+                    recipe = await generate_recipe_async(
+                        ingredients=ingredients,
+                        dietary_concerns=dietary_concerns,
+                        tier='user' if logged_in else 'anonymous'
+                    )
+                    build = partial(self._result, recipe, ingredients,
+                                    dietary_concerns, success_message)
+                except AdmissionRejected:
+                    build = _busy
+                except Exception as e:
+                    logging.error(f"Error in async recipe generation: {str(e)}")
+                    build = _internal_error
+                # _finish pops the context itself, even if this await is cancelled
+                ctx, open_ctx = open_ctx, None
+                response = await in_context(self._finish, ctx, build)
+            if root is not None:
+                root.set('http.status_code', response[0])
+        except BaseException as e:
+            if root is not None:
+                root.error = repr(e)
+            raise
+        finally:
+            if open_ctx is not None:
+                # Cancelled while waiting on OpenAI; still run the teardown
+                context.run(open_ctx.pop)
+            if root is not None:
+                _current_span.reset(token)
+                tracer.finish_root(root)
+        await _send(send, *response)
+
+    def _open(self, environ, schema, field, error_message):
+        """Push the request context and run the request up to the OpenAI call.
+
+        Returns (response, None) when the request is already answered, or
+        (None, state) with the still-open context for :meth:`_finish`.
+        """
+        ctx = self.flask_app.request_context(environ)
+        ctx.push()
+        try:
+            rv = self.flask_app.preprocess_request()
+            if rv is None:
+                rv, state = self._admit(schema, field, error_message)
+        except Exception as e:
+            logging.error(f"Error preparing async recipe request: {str(e)}")
+            rv = _internal_error()
+        if rv is not None:
+            return self._close(ctx, rv), None
+        # Hand the pooled DB connection and this thread back while waiting
+        db.session.close()
+        profiler._untrack_request()
+        return None, (ctx,) + state
+
+    def _finish(self, ctx, build):
+        """Build the response in the context opened by :meth:`_open`."""
+        try:
+            rv = build()
+        except Exception as e:
+            logging.error(f"Error finishing async recipe request: {str(e)}")
+            rv = _internal_error()
+        return self._close(ctx, rv)
+
+    def _close(self, ctx, rv):
+        try:
+            return self._to_asgi(rv)
+        finally:
+            ctx.pop()
+
+    def _admit(self, schema, field, error_message):
+        limited = check_limit()
+        if limited is not None:
+            return limited, None
+
+        body, error = parse_request(schema)
+        if error:
+            logging.warning(f"Invalid recipe request: {error}")
+            return (jsonify({"error": error_message}), 400), None
+
+        ingredients = getattr(body, field)
+        cached = generation_cache.get(ingredients, body.dietary_concerns)
+        if cached is not None:
+            return jsonify(public_result(cached)), None
+        return None, (ingredients, body.dietary_concerns, bool(current_user_id()))
+
+    def _result(self, recipe, ingredients, dietary_concerns, success_message):
+        if not recipe.get('success'):
+            logging.error(f"Failed to generate recipe: {recipe.get('error')}")
+            return jsonify(public_result(recipe)), 500
+        generation_cache.put(ingredients, dietary_concerns, recipe)
+        logging.info(success_message)
+        return jsonify(public_result(recipe))
+
+    def _to_asgi(self, rv):
+        response = self.flask_app.process_response(self.flask_app.make_response(rv))
+        headers = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                   for name, value in response.headers.items()]
+        return response.status_code, headers, response.get_data()
+
+
+def _busy():
+    response = jsonify({"error": "Recipe service is busy, please retry"})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+
+def _internal_error():
+    return jsonify({"error": "Internal server error"}), 500
+
+
+async def _send(send, status, headers, body):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': headers})
+    await send({'type': 'http.response.body', 'body': body})
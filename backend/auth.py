@@ -0,0 +1,147 @@
+from flask import current_app, request, session
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+from backend import db
+from .models import RevokedToken
+import logging
+import secrets
+import threading
+import time
+
+TOKEN_COOKIE_NAME = 'auth_token'
+
+
+class TokenAuth:
+    """Issues and verifies signed, expiring auth tokens carrying a user id.
+
+    Tokens are checked in memory. Revocations are written to the
+    ``revoked_tokens`` table and each worker pulls them into a local copy
+    at most once every ``sync_interval`` seconds.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.max_age = 7 * 24 * 3600
+        self.sync_interval = 30
+        self._serializer = None
+        self._lock = threading.Lock()
+        self._revoked_tokens = {}
+        self._revoked_users = {}
+        self._synced_at = None
+
+    def init_app(self, app):
+        self.enabled = app.config['AUTH_MODE'] == 'token'
+        self.max_age = app.config['AUTH_TOKEN_MAX_AGE']
+        self.sync_interval = app.config['AUTH_REVOCATION_SYNC_INTERVAL']
+        self._serializer = URLSafeTimedSerializer(
+            app.config['SECRET_KEY'], salt='auth-token')
+
+    def issue(self, user_id):
+        """Return a new signed token for the user."""
+        return self._serializer.dumps({
+            'uid': user_id,
+            'jti': secrets.token_urlsafe(12),
+            'iat': time.time()
+        })
+
+    def _decode(self, token):
+        try:
+            return self._serializer.loads(token, max_age=self.max_age)
+        except BadSignature:
+            return None
+
+    def verify(self, token):
+        """Return the user id carried by a valid token, else None."""
+        claims = self._decode(token)
+        if claims is None:
+            return None
+        self._sync()
+        if claims['jti'] in self._revoked_tokens:
+            return None
+        revoked_at = self._revoked_users.get(claims['uid'])
+        if revoked_at is not None and claims['iat'] < revoked_at:
+            return None
+        return claims['uid']
+
+    def revoke(self, token):
+        """Revoke a single token, e.g. on logout."""
+        claims = self._decode(token)
+        if claims is None:
+            return
+        now = time.time()
+        with self._lock:
+            self._revoked_tokens[claims['jti']] = claims['iat'] + self.max_age
+        self._store(claims['jti'], claims['uid'], now, claims['iat'] + self.max_age)
+
+    def revoke_user(self, user_id):
+        """Revoke every token issued to a user so far."""
+        now = time.time()
+        with self._lock:
+            self._revoked_users[user_id] = now
+        self._store(None, user_id, now, now + self.max_age)
+
+    def _store(self, token_id, user_id, revoked_at, expires_at):
+        db.session.add(RevokedToken(
+            token_id=token_id,
+            user_id=user_id,
+            revoked_at=revoked_at,
+            expires_at=expires_at
+        ))
+        db.session.commit()
+
+    def _sync(self):
+        if (self._synced_at is not None
+                and time.monotonic() - self._synced_at < self.sync_interval):
+            return
+        now = time.time()
+        try:
+            RevokedToken.query.filter(RevokedToken.expires_at <= now).delete()
+            rows = RevokedToken.query.filter(
+                RevokedToken.expires_at > now).all()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f'Error syncing revoked tokens: {str(e)}.')
+            return
+
+        revoked_tokens, revoked_users = {}, {}
+        for row in rows:
+            if row.token_id:
+                revoked_tokens[row.token_id] = row.expires_at
+            else:
+                revoked_users[row.user_id] = max(
+                    row.revoked_at, revoked_users.get(row.user_id, 0))
+        with self._lock:
+            self._revoked_tokens = revoked_tokens
+            self._revoked_users = revoked_users
+            self._synced_at = time.monotonic()
+
+    def request_token(self):
+        """Return the token sent with the current request, if any."""
+        header = request.headers.get('Authorization', '')
+        if header.startswith('Bearer '):
+            return header[len('Bearer '):]
+        return request.cookies.get(TOKEN_COOKIE_NAME)
+
+    def set_cookie(self, response, token):
+        response.set_cookie(
+            TOKEN_COOKIE_NAME,
+            token,
+            max_age=self.max_age,
+            httponly=True,
+            secure=current_app.config['SESSION_COOKIE_SECURE'],
+            samesite=current_app.config['SESSION_COOKIE_SAMESITE']
+        )
+
+    def clear_cookie(self, response):
+        response.delete_cookie(TOKEN_COOKIE_NAME)
+
+
+tokens = TokenAuth()
+
+
+def current_user_id():
+    """Return the logged-in user id from the token or the session."""
+    if tokens.enabled:
+        token = tokens.request_token()
+        return tokens.verify(token) if token else None
+    return session.get('user_id')
@@ -1,29 +1,110 @@
-from openai import OpenAI, OpenAIError
 import os
 from dotenv import load_dotenv
+import asyncio
 import logging
 import json
+import threading
 import time
+from .admission import admission, async_admission, AdmissionRejected, PRIORITY_ANONYMOUS
+from .hedging import hedger_from_env
+from .model_routing import router_from_env
+from .tracing import tracer
 
-# Configure logger
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler("recipe_api.log"),
-        logging.StreamHandler()
-    ]
+_client = None
+router = router_from_env()
+hedger = hedger_from_env(admission)
+_client_lock = threading.Lock()
+# Used only from the ASGI server's event loop, which owns its pool
+_async_client = None
+
+SYSTEM_PROMPT = (
+    "You are a professional chef. Provide recipes in a structured JSON format with the following: "
+    "recipe_name, cooking_time, ingredients, instructions, nutritional_info (calories, protein, fat, carbohydrates), and cooking_tips."
 )
 
-# Load environment variables
-load_dotenv()
-api_key = os.getenv("OPENAI_API_KEY")
 
-if not api_key:
-    logging.error("OpenAI API key not found in environment variables")
-    raise ValueError("OpenAI API key not configured")
+def _api_key():
+    # Load environment variables
+    load_dotenv()
+    api_key = os.getenv("OPENAI_API_KEY")
+
+    if not api_key:
+        logging.error("OpenAI API key not found in environment variables")
+        raise ValueError("OpenAI API key not configured")
+    return api_key
+
+
+def get_client():
+    """Return the shared OpenAI client, importing the SDK on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from openai import OpenAI
+                api_key = _api_key()
+
+                from .openai_http import build_http_client, transport_settings
+                settings = transport_settings()
+                _client = OpenAI(
+                    api_key=api_key,
+                    http_client=build_http_client(settings),
+                    max_retries=settings['sdk_max_retries']
+                )
+    return _client
+
+
+def get_async_client():
+    """Return the process-wide AsyncOpenAI client, building it on first use.
+
+    Its connection pool belongs to the event loop that first uses it, so
+    call it only from the ASGI server's loop.
+    """
+    global _async_client
+    if _async_client is None:
+        from openai import AsyncOpenAI
+        from .openai_http import build_async_http_client, transport_settings
+        settings = transport_settings()
+        _async_client = AsyncOpenAI(
+            api_key=_api_key(),
+            http_client=build_async_http_client(settings),
+            max_retries=settings['sdk_max_retries']
+        )
+    return _async_client
+
+
+async def close_async_client():
+    """Close the AsyncOpenAI client and its pool, e.g. at server shutdown."""
+    global _async_client
+    client, _async_client = _async_client, None
+    if client is not None:
+        await client.close()
+
+
+def reset_client():
+    """Drop the shared client so the next call builds a fresh connection pool.
+
+    Needed after a fork: sockets inherited from the parent must not be
+    shared between processes.
+    """
+    global _client, _async_client
+    with _client_lock:
+        _client = None
+        _async_client = None
+
 
-client = OpenAI(api_key=api_key)
+def connection_stats():
+    """Return connection reuse counters for the OpenAI transport."""
+    if _client is None:
+        return {}
+    from .openai_http import stats
+    return stats.snapshot()
+
+
+def __getattr__(name):
+    # Keep `chatgptAPI.client` working without building it at import time
+    if name == "client":
+        return get_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def format_prompt(ingredients, dietary_concerns):
@@ -47,6 +128,14 @@ def format_prompt(ingredients, dietary_concerns):
     return base_prompt
 
 
+def build_messages(prompt):
+    """Return the chat messages for a recipe prompt."""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+
+
 def validate_json(response_content):
     """Validate if the response content is a properly formatted JSON."""
     try:
@@ -64,59 +153,174 @@ def validate_json(response_content):
         return None
 
 
-def generate_recipe(ingredients, dietary_concerns=None, retries=3, delay=2):
-    """Generate a recipe using OpenAI with validation and retry logic."""
+def count_ingredients(ingredients):
+    """Count ingredients given as a list or a comma-separated string."""
+    if isinstance(ingredients, list):
+        return len(ingredients)
+    return len([item for item in str(ingredients).split(',') if item.strip()])
+
+
+def generate_recipe(ingredients, dietary_concerns=None, retries=3, delay=2, tier=None,
+                    priority=PRIORITY_ANONYMOUS):
+    """Generate a recipe using OpenAI with validation and retry logic.
+
+    Each attempt uses the next model from the router's candidate list, so a
+    failing primary model fails over along the configured chain. When
+    hedging is enabled a slow call is raced against a second copy.
+
+    Every attempt takes its own admission slot at ``priority`` and gives it
+    back before the retry sleep; :class:`AdmissionRejected` is raised if
+    an attempt is shed.
+    """
+    client = get_client()
+    from openai import OpenAIError
+
+    models = router.choose(count_ingredients(ingredients), dietary_concerns, tier)
+    tokens_used = 0
+
     for attempt in range(retries):
+        model = models[attempt % len(models)]
+        started = time.monotonic()
         try:
-            logging.info(f"Generating recipe for ingredients: {ingredients}, Attempt: {attempt + 1}")
-            prompt = format_prompt(ingredients, dietary_concerns)
-
-            # Call OpenAI API
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": (
-                            "You are a professional chef. Provide recipes in a structured JSON format with the following: "
-                            "recipe_name, cooking_time, ingredients, instructions, nutritional_info (calories, protein, fat, carbohydrates), and cooking_tips."
-                        )
-                    },
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.2,  # Lower temperature for deterministic output
-                top_p=0.9
-            )
+            logging.info(f"Generating recipe for ingredients: {ingredients}, Attempt: {attempt + 1}, Model: {model}, Diet: {dietary_concerns}")
+            with tracer.span('format_prompt'):
+                prompt = format_prompt(ingredients, dietary_concerns)
+
+            def request_completion():
+                # Call OpenAI API
+                with tracer.span('openai.chat.completions.create', model=model,
+                                 attempt=attempt + 1) as span:
+                    response = client.chat.completions.create(
+                        model=model,
+                        messages=build_messages(prompt),
+                        temperature=0.2,  # Lower temperature for deterministic output
+                        top_p=0.9
+                    )
+                    if span is not None:
+                        span.set('tokens', response.usage.total_tokens)
+
+                # Validate JSON response
+                with tracer.span('validate_json'):
+                    return response, validate_json(response.choices[0].message.content.strip())
+
+            # A slow call may be hedged with a second identical one
+            with admission.slot(priority):
+                response, recipe = hedger.run(
+                    request_completion, is_valid=lambda result: result[1] is not None)
 
             # Log token usage
             prompt_tokens = response.usage.prompt_tokens
             completion_tokens = response.usage.completion_tokens
             total_tokens = response.usage.total_tokens
+            tokens_used += total_tokens or 0
 
             logging.info(
                 f"Token usage - Prompt: {prompt_tokens}, Completion: {completion_tokens}, Total: {total_tokens}")
 
-            # Validate JSON response
-            response_content = response.choices[0].message.content.strip()
-            recipe = validate_json(response_content)
             if recipe:
+                router.record(model, time.monotonic() - started, True)
                 logging.info("Recipe successfully validated and received from OpenAI")
-                return {"success": True, "recipe": recipe, "dietary_concerns": dietary_concerns or "None specified"}
+                return {"success": True, "recipe": recipe, "dietary_concerns": dietary_concerns or "None specified",
+                        "model": model, "tokens": tokens_used}
             else:
                 logging.warning("Invalid recipe format received, retrying...")
 
+        except AdmissionRejected:
+            raise
         except OpenAIError as e:
             logging.error(f"OpenAI API error: {e}")
         except Exception as e:
             logging.error(f"Unexpected error in generate_recipe: {e}")
 
+        router.record(model, time.monotonic() - started, False)
+
         # Retry logic
-        time.sleep(delay)
+        with tracer.span('retry_sleep', seconds=delay):
+            time.sleep(delay)
+
+    return {"success": False, "error": "Failed to generate a valid recipe after retries", "tokens": tokens_used}
+
 
-    return {"success": False, "error": "Failed to generate a valid recipe after retries"}
+async def generate_recipe_async(ingredients, dietary_concerns=None, retries=3, delay=2, tier=None,
+                                timeout=None):
+    """Async variant of generate_recipe built on AsyncOpenAI.
+
+    Each attempt holds an async admission slot only while its call runs
+    and is cancelled after ``timeout`` seconds (OPENAI_ATTEMPT_TIMEOUT by
+    default); retries back off with asyncio.sleep, so waiting never blocks
+    a thread. Attempts are not hedged. Raises AdmissionRejected if an
+    attempt is shed.
+    """
+    client = get_async_client()
+    from openai import OpenAIError
+
+    if timeout is None:
+        timeout = float(os.environ.get('OPENAI_ATTEMPT_TIMEOUT', 30))
+    models = router.choose(count_ingredients(ingredients), dietary_concerns, tier)
+    tokens_used = 0
+
+    for attempt in range(retries):
+        model = models[attempt % len(models)]
+        started = time.monotonic()
+        try:
+            logging.info(f"Generating recipe for ingredients: {ingredients}, Attempt: {attempt + 1}, Model: {model}, Diet: {dietary_concerns}")
+            with tracer.span('format_prompt'):
+                prompt = format_prompt(ingredients, dietary_concerns)
+
+            # Call OpenAI API, cancelling the attempt if it runs too long
+            async with async_admission.slot():
+                with tracer.span('openai.chat.completions.create', model=model,
+                                 attempt=attempt + 1):
+                    response = await asyncio.wait_for(
+                        client.chat.completions.create(
+                            model=model,
+                            messages=build_messages(prompt),
+                            temperature=0.2,  # Lower temperature for deterministic output
+                            top_p=0.9
+                        ),
+                        timeout
+                    )
+
+            # Log token usage
+            total_tokens = response.usage.total_tokens
+            tokens_used += total_tokens or 0
+            logging.info(
+                f"Token usage - Prompt: {response.usage.prompt_tokens}, Completion: {response.usage.completion_tokens}, Total: {total_tokens}")
+
+            # Validate JSON response
+            with tracer.span('validate_json'):
+                recipe = validate_json(response.choices[0].message.content.strip())
+            if recipe:
+                router.record(model, time.monotonic() - started, True)
+                logging.info("Recipe successfully validated and received from OpenAI")
+                return {"success": True, "recipe": recipe, "dietary_concerns": dietary_concerns or "None specified",
+                        "model": model, "tokens": tokens_used}
+            else:
+                logging.warning("Invalid recipe format received, retrying...")
+
+        except AdmissionRejected:
+            raise
+        except asyncio.TimeoutError:
+            logging.error(f"OpenAI call timed out after {timeout}s")
+        except OpenAIError as e:
+            logging.error(f"OpenAI API error: {e}")
+        except Exception as e:
+            logging.error(f"Unexpected error in generate_recipe_async: {e}")
+
+        router.record(model, time.monotonic() - started, False)
+
+        # Retry logic
+        with tracer.span('retry_sleep', seconds=delay):
+            await asyncio.sleep(delay)
+
+    return {"success": False, "error": "Failed to generate a valid recipe after retries", "tokens": tokens_used}
 
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(levelname)s - %(message)s"
+    )
     ingredients_list = ["tomatoes", "pasta", "garlic", "olive oil", "basil"]
     recipe = generate_recipe(ingredients_list)
     print(f"Generated Recipe: {json.dumps(recipe, indent=2)}")
\ No newline at end of file
@@ -0,0 +1,135 @@
+from flask import request, send_from_directory
+from werkzeug.utils import safe_join
+import gzip
+import logging
+import mimetypes
+import os
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, gzip is always available
+    brotli = None
+
+PRECOMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+# Compressed path -> ((source stat, compressed stat), verdict)
+_verified_siblings = {}
+
+
+def choose_encoding(accept_encodings, available):
+    """Pick the best encoding the client accepts from ``available``."""
+    for encoding in available:
+        if accept_encodings[encoding] > 0:
+            return encoding
+    return None
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=min(level, 9), mtime=0)
+
+
+def sibling_matches(data, compressed, encoding):
+    """Return True if ``compressed`` decodes to exactly ``data``."""
+    try:
+        if encoding == 'br':
+            # Without brotli a .br file cannot be checked, so it is not used
+            return brotli is not None and brotli.decompress(compressed) == data
+        return gzip.decompress(compressed) == data
+    except Exception:
+        return False
+
+
+def _stat_key(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def fresh_sibling(path, encoding):
+    """Return True if ``path`` has a compressed sibling matching its bytes.
+
+    A stale sibling, e.g. left over from an earlier build, would otherwise be
+    served in place of the current file. Verdicts are cached until either
+    file changes on disk.
+    """
+    compressed = path + PRECOMPRESSED_SUFFIXES[encoding]
+    try:
+        stamp = (_stat_key(path), _stat_key(compressed))
+    except OSError:
+        return False
+    cached = _verified_siblings.get(compressed)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(compressed, 'rb') as f:
+        verdict = sibling_matches(data, f.read(), encoding)
+    if not verdict:
+        logging.warning(f'Ignoring {compressed}: it does not match {path}.')
+    _verified_siblings[compressed] = (stamp, verdict)
+    return verdict
+
+
+def _available_encodings():
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def compress_response(response, min_size, level):
+    """Compress a JSON response in place if it is large enough."""
+    if (response.direct_passthrough
+            or response.status_code < 200 or response.status_code == 204
+            or 'Content-Encoding' in response.headers
+            or response.mimetype != 'application/json'):
+        return response
+
+    response.vary.add('Accept-Encoding')
+    data = response.get_data()
+    if len(data) < min_size:
+        return response
+
+    encoding = choose_encoding(request.accept_encodings, _available_encodings())
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding, level))
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def send_precompressed(directory, filename, **kwargs):
+    """Serve a ``.br``/``.gz`` sibling of a static file when one matches."""
+    path = safe_join(directory, filename)
+    for encoding in ('br', 'gzip'):
+        if path is None or request.accept_encodings[encoding] <= 0:
+            continue
+        if not fresh_sibling(path, encoding):
+            continue
+        compressed = filename + PRECOMPRESSED_SUFFIXES[encoding]
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = send_from_directory(
+            directory, compressed, mimetype=mimetype, **kwargs)
+        response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        return response
+
+    response = send_from_directory(directory, filename, **kwargs)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def init_app(app):
+    """Compress JSON responses and serve precompressed static files."""
+    min_size = app.config['COMPRESS_MIN_SIZE']
+    level = app.config['COMPRESS_LEVEL']
+
+    @app.after_request
+    def _compress(response):
+        return compress_response(response, min_size, level)
+
+    def static(filename):
+        return send_precompressed(app.static_folder, filename)
+
+    app.view_functions['static'] = static
+
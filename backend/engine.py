@@ -0,0 +1,74 @@
+from sqlalchemy import event
+from backend import db
+import os
+
+
+def _env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() in ('1', 'true', 'yes')
+
+
+def sqlite_pragmas():
+    """Return the PRAGMA settings applied to every new SQLite connection."""
+    return {
+        # WAL lets readers run alongside a writer instead of locking the file
+        'journal_mode': os.environ.get('SQLITE_JOURNAL_MODE', 'WAL'),
+        'synchronous': os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL'),
+        'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000)),
+        'mmap_size': int(os.environ.get('SQLITE_MMAP_SIZE', 268435456)),
+        # Negative values are in KiB rather than pages
+        'cache_size': int(os.environ.get('SQLITE_CACHE_SIZE', -20000)),
+        # SQLite ignores ON DELETE CASCADE unless foreign keys are enforced
+        'foreign_keys': 'ON',
+    }
+
+
+def postgres_engine_options():
+    """Return pool and connection options for the Postgres engine."""
+    options = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': _env_bool('DB_POOL_PRE_PING', True),
+    }
+    statement_timeout = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))
+    if statement_timeout:
+        options['connect_args'] = {
+            'options': f'-c statement_timeout={statement_timeout}'
+        }
+    return options
+
+
+def engine_options(db_url):
+    """Return SQLALCHEMY_ENGINE_OPTIONS for the configured database."""
+    if db_url.startswith('postgresql'):
+        return postgres_engine_options()
+    return {}
+
+
+def _apply_sqlite_pragmas(pragmas):
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+    return on_connect
+
+
+def init_app(app):
+    """Attach per-connection tuning to the app's engine."""
+    with app.app_context():
+        engine = db.engine
+        if engine.dialect.name == 'sqlite':
+            app.config['SQLITE_PRAGMAS'] = sqlite_pragmas()
+            event.listen(
+                engine, 'connect',
+                _apply_sqlite_pragmas(app.config['SQLITE_PRAGMAS'])
+            )
+
+
+def dispose_after_fork(app):
+    """Forget pooled connections inherited from a parent process."""
+    with app.app_context():
+        # close=False leaves the parent's sockets alone
+        db.engine.dispose(close=False)
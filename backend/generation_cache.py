@@ -0,0 +1,107 @@
+from backend import db
+from .log_parsing import normalize_combo
+from .models import GeneratedRecipe
+import json
+import logging
+import time
+
+# Generation result fields kept for logging and budgets, never sent to clients
+INTERNAL_FIELDS = ('model', 'tokens')
+
+
+def public_result(result):
+    """Return a generation result without its internal fields."""
+    return {key: value for key, value in result.items()
+            if key not in INTERNAL_FIELDS}
+
+
+def cache_key(ingredients, dietary_concerns=None):
+    items, diet = normalize_combo(ingredients, dietary_concerns)
+    return f"{','.join(items)}|{diet}"[:512]
+
+
+class GenerationCache:
+    """Stores successful generations in the app database for every worker.
+
+    Entries live for ``ttl`` seconds. A cache failure is logged and treated
+    as a miss, so generation keeps working without it. The table is created
+    by the migrations (``flask db upgrade``).
+    """
+
+    def __init__(self, enabled=True, ttl=24 * 3600):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.enabled = app.config['GENERATION_CACHE_ENABLED']
+        self.ttl = app.config['GENERATION_CACHE_TTL']
+
+    def get(self, ingredients, dietary_concerns=None):
+        """Return the cached generation result, or None."""
+        if not self.enabled:
+            return None
+        items, diet = normalize_combo(ingredients, dietary_concerns)
+        try:
+            entry = db.session.get(GeneratedRecipe, cache_key(items, diet))
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f'Error reading generation cache: {str(e)}.')
+            return None
+        if entry is None or entry.expires_at <= time.time():
+            self.misses += 1
+            return None
+        self.hits += 1
+        # Logged with the combo so the warmer still counts demand served here
+        logging.info(f"Serving cached recipe for ingredients: {', '.join(items)}, "
+                     f"Diet: {diet or 'None'}")
+        return json.loads(entry.payload)
+
+    def contains(self, ingredients, dietary_concerns=None, min_remaining=0):
+        """Return whether an entry exists that lives another ``min_remaining`` seconds."""
+        try:
+            entry = db.session.get(
+                GeneratedRecipe, cache_key(ingredients, dietary_concerns))
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f'Error reading generation cache: {str(e)}.')
+            return False
+        return entry is not None and entry.expires_at > time.time() + min_remaining
+
+    def put(self, ingredients, dietary_concerns, result):
+        """Store a successful generation result."""
+        if not self.enabled or not result.get('success'):
+            return
+        now = time.time()
+        try:
+            db.session.merge(GeneratedRecipe(
+                cache_key=cache_key(ingredients, dietary_concerns),
+                payload=json.dumps(public_result(result)),
+                created_at=now,
+                expires_at=now + self.ttl
+            ))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f'Error writing generation cache: {str(e)}.')
+
+    def purge_expired(self):
+        """Delete expired entries and return how many were removed."""
+        result = db.session.execute(
+            db.delete(GeneratedRecipe)
+            .where(GeneratedRecipe.expires_at <= time.time()))
+        db.session.commit()
+        return result.rowcount
+
+    def metrics(self):
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+generation_cache = GenerationCache()
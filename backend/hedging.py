@@ -0,0 +1,160 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from .log_parsing import percentile
+import contextvars
+import logging
+import os
+import threading
+import time
+
+
+class Hedger:
+    """Sends a second identical request when the first one runs long.
+
+    The hedge fires after a fixed ``hedge_after`` delay, or after the rolling
+    p90 of recent call latencies once ``min_samples`` calls were seen. The
+    first valid result wins. Python threads cannot be interrupted, so a
+    losing call that already started is abandoned rather than aborted; its
+    result is dropped and its connection returns to the pool when it ends.
+    At most ``max_rate`` of recent calls may be hedged.
+
+    With an ``admission`` controller the hedge needs a slot of its own and
+    is skipped when none is free. That slot is released only once both
+    copies have finished, so an abandoned call still counts against the
+    concurrency cap.
+    """
+
+    def __init__(self, enabled=False, hedge_after=None, fallback_delay=6.0,
+                 max_rate=0.1, min_samples=20, window=200, max_workers=32,
+                 admission=None):
+        self.enabled = enabled
+        self.admission = admission
+        self.hedge_after = hedge_after
+        self.fallback_delay = fallback_delay
+        self.max_rate = max_rate
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=window)
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._max_workers = max_workers
+        self.calls = 0
+        self.fired = 0
+        self.won = 0
+        self.skipped = 0
+
+    def delay(self):
+        """Seconds to wait on the first request before hedging."""
+        if self.hedge_after is not None:
+            return self.hedge_after
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return self.fallback_delay
+            return percentile(list(self._latencies), 90)
+
+    def _allow_hedge(self):
+        with self._lock:
+            if not self._recent:
+                return self.max_rate > 0
+            return sum(self._recent) / len(self._recent) < self.max_rate
+
+    def _submit(self, fn):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self._max_workers,
+                        thread_name_prefix='openai-hedge'
+                    )
+        # Carry the request context over so log lines keep the request id
+        return self._executor.submit(contextvars.copy_context().run, fn)
+
+    def _take_slot(self):
+        if self.admission is None or self.admission.try_acquire():
+            return True
+        with self._lock:
+            self.skipped += 1
+        return False
+
+    def _release_when_done(self, futures):
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def done(_):
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                self.admission.release()
+
+        for future in futures:
+            future.add_done_callback(done)
+
+    def _finish(self, started, hedged):
+        with self._lock:
+            self.calls += 1
+            self._latencies.append(time.monotonic() - started)
+            self._recent.append(1 if hedged else 0)
+
+    def run(self, fn, is_valid=lambda result: True):
+        """Call ``fn`` (possibly twice) and return the first valid result."""
+        if not self.enabled:
+            return fn()
+
+        started = time.monotonic()
+        primary = self._submit(fn)
+        done, _ = wait([primary], timeout=self.delay())
+        if done or not self._allow_hedge() or not self._take_slot():
+            try:
+                return primary.result()
+            finally:
+                self._finish(started, hedged=False)
+
+        with self._lock:
+            self.fired += 1
+        logging.info("OpenAI call is slow, sending a hedged request")
+        hedge = self._submit(fn)
+        if self.admission is not None:
+            self._release_when_done([primary, hedge])
+        pending = {primary, hedge}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None and is_valid(future.result()):
+                        if future is hedge:
+                            with self._lock:
+                                self.won += 1
+                        for other in pending:
+                            other.cancel()
+                        return future.result()
+            # Neither copy produced a valid result, report the primary's
+            return primary.result()
+        finally:
+            self._finish(started, hedged=True)
+
+    def metrics(self):
+        delay = self.delay()
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'calls': self.calls,
+                'hedges_fired': self.fired,
+                'hedges_won': self.won,
+                'hedges_skipped_no_slot': self.skipped,
+                'hedge_rate': round(self.fired / self.calls, 3) if self.calls else 0.0,
+                'delay_s': delay
+            }
+
+
+def hedger_from_env(admission=None):
+    """Build the hedger from OPENAI_HEDGE_* environment variables."""
+    hedge_after = os.environ.get('OPENAI_HEDGE_AFTER', 'p90')
+    return Hedger(
+        enabled=os.environ.get('OPENAI_HEDGE_ENABLED', 'false').lower() in ('1', 'true', 'yes'),
+        hedge_after=None if hedge_after == 'p90' else float(hedge_after),
+        fallback_delay=float(os.environ.get('OPENAI_HEDGE_FALLBACK_DELAY', 6)),
+        max_rate=float(os.environ.get('OPENAI_HEDGE_MAX_RATE', 0.1)),
+        min_samples=int(os.environ.get('OPENAI_HEDGE_MIN_SAMPLES', 20)),
+        admission=admission
+    )
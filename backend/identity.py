@@ -0,0 +1,97 @@
+from collections import OrderedDict, namedtuple
+from flask import g
+from backend import db
+from .models import User
+import threading
+import time
+
+UserIdentity = namedtuple('UserIdentity', ['user_id', 'user_name', 'user_email'])
+
+
+class UserIdentityCache:
+    """Caches read-only snapshots of users per request and across requests.
+
+    Lookups check the current request first, then a small LRU whose entries
+    live for ``ttl`` seconds, and only then query the database. Missing users
+    are only remembered for the current request. Invalidation is local to the
+    process, so other workers may serve a stale name for up to ``ttl``.
+    """
+
+    def __init__(self, ttl=30, max_size=1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config['USER_CACHE_TTL']
+        self.max_size = app.config['USER_CACHE_SIZE']
+        self.clear()
+        app.before_request(self._reset_request_cache)
+
+    def _reset_request_cache(self):
+        # g outlives a request when an outer app context is shared (tests)
+        g.pop('_user_identities', None)
+
+    def _request_cache(self):
+        if '_user_identities' not in g:
+            g._user_identities = {}
+        return g._user_identities
+
+    def get(self, user_id):
+        """Return a UserIdentity for the id, or None if the user is gone."""
+        request_cache = self._request_cache()
+        if user_id in request_cache:
+            return request_cache[user_id]
+
+        identity = self._get_shared(user_id)
+        if identity is None:
+            user = db.session.get(User, user_id)
+            if user is not None:
+                identity = UserIdentity(
+                    user.user_id, user.user_name, user.user_email)
+                self._put_shared(identity)
+
+        request_cache[user_id] = identity
+        return identity
+
+    def exists(self, user_id):
+        """Return True if a user with this id exists."""
+        return self.get(user_id) is not None
+
+    def invalidate(self, user_id):
+        """Drop any cached copy of the user."""
+        self._request_cache().pop(user_id, None)
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _get_shared(self, user_id):
+        if not self.ttl:
+            return None
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            expires_at, identity = entry
+            if expires_at <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return identity
+
+    def _put_shared(self, identity):
+        if not self.ttl:
+            return
+        with self._lock:
+            self._entries[identity.user_id] = (
+                time.monotonic() + self.ttl, identity)
+            self._entries.move_to_end(identity.user_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+identities = UserIdentityCache()
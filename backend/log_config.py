@@ -0,0 +1,197 @@
+from flask import g, has_request_context, request
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import random
+import time
+import uuid
+
+TEXT_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+_listener = None
+_queue_handler = None
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats records as one JSON object per line."""
+
+    FIELDS = ('request_id', 'method', 'path', 'status', 'duration_ms')
+
+    def format(self, record):
+        entry = {
+            'ts': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        for field in self.FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class RequestContextFilter(logging.Filter):
+    """Attaches request details to records and samples INFO lines.
+
+    It runs on the request thread before the record is queued, because the
+    request context is gone by the time the listener thread formats it.
+    INFO records are kept for ``info_sample_rate`` of requests, decided once
+    per request so sampled requests keep their whole timeline.
+    """
+
+    def __init__(self, info_sample_rate=1.0):
+        super().__init__()
+        self.info_sample_rate = info_sample_rate
+
+    def filter(self, record):
+        if not has_request_context():
+            return (record.levelno != logging.INFO
+                    or random.random() < self.info_sample_rate)
+
+        record.request_id = g.get('request_id')
+        record.method = request.method
+        record.path = request.path
+        if record.levelno != logging.INFO:
+            return True
+        if 'log_sampled' not in g:
+            g.log_sampled = random.random() < self.info_sample_rate
+        return g.log_sampled
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of blocking when full."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        # The listener runs in this process, so unlike the base class keep
+        # exc_info on the record for the JSON formatter's 'exc' field; only
+        # the message is rendered now, while its arguments are current.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+class WorkerFileHandler(RotatingFileHandler):
+    """Rotating file handler whose path may contain a ``{pid}`` placeholder.
+
+    Rotation renames the file, which loses lines when several processes
+    write to it, so multi-worker servers should either log to stdout only
+    or give each worker its own file through the placeholder.
+    """
+
+    def __init__(self, template, **kwargs):
+        self.template = template
+        super().__init__(self._path(), **kwargs)
+
+    def _path(self):
+        return os.path.abspath(self.template.replace('{pid}', str(os.getpid())))
+
+    def reopen(self):
+        """Point the handler at this process's file after a fork."""
+        path = self._path()
+        if path == self.baseFilename:
+            return
+        self.acquire()
+        try:
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+            # Opened again on the next record
+            self.baseFilename = path
+        finally:
+            self.release()
+
+
+def _stop_listener():
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+
+
+atexit.register(_stop_listener)
+
+
+def restart_listener():
+    """Start a new listener thread in a forked child, which inherits none."""
+    if _listener is not None:
+        for handler in _listener.handlers:
+            if isinstance(handler, WorkerFileHandler):
+                handler.reopen()
+        _listener.start()
+
+
+def configure_logging(app):
+    """Route all logging through a queue drained by a background thread."""
+    global _listener, _queue_handler
+    _stop_listener()
+
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    handlers = [stream_handler]
+    # An empty LOG_FILE logs to the stream only
+    if app.config['LOG_FILE']:
+        file_handler = WorkerFileHandler(
+            app.config['LOG_FILE'],
+            maxBytes=app.config['LOG_MAX_BYTES'],
+            backupCount=app.config['LOG_BACKUP_COUNT']
+        )
+        if app.config['LOG_FORMAT'] == 'json':
+            file_handler.setFormatter(JSONFormatter())
+        else:
+            file_handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+        handlers.insert(0, file_handler)
+
+    log_queue = queue.Queue(maxsize=app.config['LOG_QUEUE_SIZE'])
+    _queue_handler = DroppingQueueHandler(log_queue)
+    _queue_handler.addFilter(
+        RequestContextFilter(app.config['LOG_INFO_SAMPLE_RATE']))
+    _listener = QueueListener(
+        log_queue, *handlers, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.setLevel(app.config['LOG_LEVEL'])
+    root.addHandler(_queue_handler)
+    _listener.start()
+
+    @app.before_request
+    def _start_request_log():
+        g.request_id = request.headers.get('X-Request-ID') or uuid.uuid4().hex
+        g.request_start = time.perf_counter()
+        g.pop('log_sampled', None)
+
+    @app.after_request
+    def _finish_request_log(response):
+        start = g.get('request_start')
+        if start is None:
+            return response
+        duration_ms = round((time.perf_counter() - start) * 1000, 3)
+        logging.info(
+            f'{request.method} {request.path} {response.status_code} '
+            f'{duration_ms}ms',
+            extra={'status': response.status_code, 'duration_ms': duration_ms}
+        )
+        response.headers['X-Request-ID'] = g.request_id
+        return response
@@ -0,0 +1,81 @@
+from datetime import datetime
+import ast
+import json
+import math
+import re
+
+# Standard library only: tools/log_analyzer.py imports these without the app
+
+LOG_TIME_FORMAT = '%Y-%m-%d %H:%M:%S,%f'
+GENERATION_LINE = re.compile(
+    r"Generating recipe for(?: ingredients)?: (?P<ingredients>.*?)"
+    r"(?:, Attempt: (?P<attempt>\d+))?(?:, Model: [^,]*)?"
+    r"(?:, Diet: (?P<diet>.*))?$"
+)
+CACHE_HIT_LINE = re.compile(
+    r"Serving cached recipe for ingredients: (?P<ingredients>.*), Diet: (?P<diet>.*)$"
+)
+
+
+def parse_log_line(line):
+    """Split a text or JSON log line into (timestamp, level, message, fields).
+
+    ``fields`` holds the extra keys of a JSON line, such as ``request_id``
+    and ``duration_ms``; it is empty for text lines.
+    """
+    line = line.strip()
+    if line.startswith('{'):
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            return None, None, line, {}
+        return (_parse_time(entry.get('ts', '')), entry.get('level'),
+                entry.get('msg', ''), entry)
+
+    parts = line.split(' - ', 2)
+    if len(parts) == 3:
+        timestamp = _parse_time(parts[0])
+        if timestamp is not None:
+            return timestamp, parts[1], parts[2], {}
+    return None, None, line, {}
+
+
+def _parse_time(value):
+    try:
+        return datetime.strptime(value, LOG_TIME_FORMAT)
+    except ValueError:
+        return None
+
+
+def percentile(values, pct):
+    """Return the nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def normalize_combo(ingredients, dietary_concerns=None):
+    """Return a canonical (ingredients, diet) pair for a generation request.
+
+    Ingredients may be a list or a comma-separated string; they are
+    lower-cased, stripped, de-duplicated and sorted so that requests for the
+    same fridge contents share one cache entry.
+    """
+    if isinstance(ingredients, str):
+        text = ingredients.strip()
+        if text.startswith('['):
+            # Lists were logged with their Python repr
+            try:
+                ingredients = ast.literal_eval(text)
+            except (ValueError, SyntaxError):
+                ingredients = text.strip('[]').split(',')
+        else:
+            ingredients = text.split(',')
+    items = sorted({str(item).strip().strip('\'"').lower()
+                    for item in ingredients if str(item).strip()})
+    diet = (dietary_concerns or '').strip().lower()
+    if diet in ('none', 'none specified'):
+        diet = ''
+    return tuple(items), diet
@@ -0,0 +1,142 @@
+from collections import deque
+from .log_parsing import percentile
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+DEFAULT_MODEL = "gpt-3.5-turbo"
+
+
+class ModelStats:
+    """Rolling latency and outcome window for one model.
+
+    Samples older than ``max_age`` seconds are dropped, so a model judged
+    on an old bad spell is given a fresh start once it has gone quiet.
+    """
+
+    def __init__(self, window=50, max_age=600.0):
+        self.max_age = max_age
+        self._samples = deque(maxlen=window)
+
+    @property
+    def samples(self):
+        cutoff = time.monotonic() - self.max_age
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+        return [(latency, ok) for _, latency, ok in self._samples]
+
+    def record(self, latency, ok):
+        self._samples.append((time.monotonic(), latency, ok))
+
+    def latency(self, pct):
+        return percentile([latency for latency, _ in self.samples], pct)
+
+    def error_rate(self):
+        samples = self.samples
+        if not samples:
+            return 0.0
+        return sum(1 for _, ok in samples if not ok) / len(samples)
+
+
+class ModelRouter:
+    """Picks a model per request and fails over along a chain.
+
+    ``rules`` is a list of ``{"when": {...}, "model": name}`` entries checked
+    in order; ``when`` may hold ``min_ingredients``, ``max_ingredients``,
+    ``diets`` (a list) and ``tier`` ("user" or "anonymous"). The chosen model
+    is tried first, followed by the rest of ``chain``. Models whose rolling
+    p95 latency or error rate is over the limit are moved to the back.
+    A ``probe_rate`` share of requests still tries the first demoted model
+    first, so it keeps getting fresh samples and can be promoted again.
+    """
+
+    def __init__(self, chain=None, rules=None, p95_limit=10.0, error_limit=0.5,
+                 min_samples=5, window=50, max_age=600.0, probe_rate=0.05):
+        self.chain = chain or [DEFAULT_MODEL]
+        self.rules = rules or []
+        self.p95_limit = p95_limit
+        self.error_limit = error_limit
+        self.min_samples = min_samples
+        self.window = window
+        self.max_age = max_age
+        self.probe_rate = probe_rate
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _matches(self, when, ingredient_count, diet, tier):
+        if 'min_ingredients' in when and ingredient_count < when['min_ingredients']:
+            return False
+        if 'max_ingredients' in when and ingredient_count > when['max_ingredients']:
+            return False
+        if 'diets' in when and (diet or '').lower() not in [d.lower() for d in when['diets']]:
+            return False
+        if 'tier' in when and tier != when['tier']:
+            return False
+        return True
+
+    def choose(self, ingredient_count, diet=None, tier=None):
+        """Return the models to try for this request, best first."""
+        preferred = self.chain[0]
+        for rule in self.rules:
+            if self._matches(rule.get('when', {}), ingredient_count, diet, tier):
+                preferred = rule['model']
+                break
+
+        candidates = [preferred] + [m for m in self.chain if m != preferred]
+        healthy = [m for m in candidates if self.is_healthy(m)]
+        unhealthy = [m for m in candidates if m not in healthy]
+        if unhealthy and healthy and random.random() < self.probe_rate:
+            return unhealthy[:1] + healthy + unhealthy[1:]
+        return healthy + unhealthy
+
+    def is_healthy(self, model):
+        with self._lock:
+            stats = self._stats.get(model)
+            if stats is None or len(stats.samples) < self.min_samples:
+                return True
+            return (stats.latency(95) <= self.p95_limit
+                    and stats.error_rate() <= self.error_limit)
+
+    def record(self, model, latency, ok):
+        with self._lock:
+            stats = self._stats.get(model)
+            if stats is None:
+                stats = self._stats[model] = ModelStats(self.window, self.max_age)
+            stats.record(latency, ok)
+
+    def metrics(self):
+        with self._lock:
+            return {
+                model: {
+                    'samples': len(stats.samples),
+                    'p50_s': stats.latency(50),
+                    'p95_s': stats.latency(95),
+                    'error_rate': round(stats.error_rate(), 3)
+                }
+                for model, stats in self._stats.items()
+            }
+
+
+def router_from_env():
+    """Build the router from OPENAI_MODEL_* environment variables."""
+    chain = [m.strip() for m in os.environ.get(
+        'OPENAI_MODEL_CHAIN', DEFAULT_MODEL).split(',') if m.strip()]
+    rules = []
+    if os.environ.get('OPENAI_MODEL_RULES'):
+        try:
+            rules = json.loads(os.environ['OPENAI_MODEL_RULES'])
+        except ValueError:
+            logging.error("OPENAI_MODEL_RULES is not valid JSON, ignoring rules")
+    return ModelRouter(
+        chain=chain,
+        rules=rules,
+        p95_limit=float(os.environ.get('OPENAI_MODEL_P95_LIMIT', 10)),
+        error_limit=float(os.environ.get('OPENAI_MODEL_ERROR_LIMIT', 0.5)),
+        min_samples=int(os.environ.get('OPENAI_MODEL_MIN_SAMPLES', 5)),
+        window=int(os.environ.get('OPENAI_MODEL_WINDOW', 50)),
+        max_age=float(os.environ.get('OPENAI_MODEL_MAX_AGE', 600)),
+        probe_rate=float(os.environ.get('OPENAI_MODEL_PROBE_RATE', 0.05))
+    )
@@ -1,7 +1,38 @@
 from backend import db
-import re
 from sqlalchemy.orm import validates
-from werkzeug.security import generate_password_hash
+from sqlalchemy.types import LargeBinary, TypeDecorator
+from .passwords import hasher
+from .schemas import EMAIL_PATTERN, PASSWORD_PATTERN, PASSWORD_RULES
+import msgspec
+import zlib
+
+
+class CompressedJSON(TypeDecorator):
+    """JSON stored as bytes, zlib-compressed once it is worth it.
+
+    The first byte records the format: ``j`` for plain JSON, ``z`` for
+    compressed. Values shorter than ``min_size`` are kept plain, where
+    the zlib header would cost more than it saves.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+    min_size = 256
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        data = msgspec.json.encode(value)
+        if len(data) < self.min_size:
+            return b'j' + data
+        return b'z' + zlib.compress(data, 9)
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        value = bytes(value)
+        data = zlib.decompress(value[1:]) if value[:1] == b'z' else value[1:]
+        return msgspec.json.decode(data)
 
 
 class User(db.Model):
@@ -12,18 +43,22 @@ class User(db.Model):
     user_password = db.Column(db.String(255), nullable=False)
 
     # Relationships with Ingredient and Recipe
+    # The database deletes children through ON DELETE CASCADE, so deleting
+    # a user does not load them first
     ingredients = db.relationship(
         'Ingredient',
         backref='users',
         lazy=True,
-        cascade='all, delete-orphan'
+        cascade='all, delete-orphan',
+        passive_deletes=True
     )
 
     recipes = db.relationship(
         'Recipe',
         backref='users',
         lazy=True,
-        cascade='all, delete-orphan'
+        cascade='all, delete-orphan',
+        passive_deletes=True
     )
 
     @validates('user_name')
@@ -44,8 +79,7 @@ class User(db.Model):
             raise ValueError("User email cannot be null")
         if not isinstance(user_email, str):
             raise TypeError("User email must be a string")
-        email_pattern = r'^[\w\.-]+@[\w\.-]+\.\w+$'
-        if not re.match(email_pattern, user_email):
+        if not EMAIL_PATTERN.match(user_email):
             raise ValueError("Invalid email format")
         return user_email
 
@@ -55,15 +89,9 @@ class User(db.Model):
             raise ValueError("User password cannot be null")
         if not isinstance(user_password, str):
             raise TypeError("User name must be a string")
-        password_pattern = (
-            r'^(?=.*[A-Z])(?=.*\d)'
-            r'(?=.*[@$!%*?&])[A-Za-z\d@$!%*?&]{8,}$'
-        )
-        if not re.match(password_pattern, user_password):
-            raise ValueError("Password must be at least 8 characters long, "
-                             "contain one uppercase letter, one number, and "
-                             "one special character")
-        return generate_password_hash(user_password, method='pbkdf2:sha256')
+        if not PASSWORD_PATTERN.match(user_password):
+            raise ValueError(PASSWORD_RULES)
+        return hasher.hash(user_password)
 
 
 class Ingredient(db.Model):
@@ -72,7 +100,7 @@ class Ingredient(db.Model):
     ingredient_name = db.Column(db.String(100), nullable=False)
     user_id = db.Column(
         db.Integer,
-        db.ForeignKey('users.user_id'),
+        db.ForeignKey('users.user_id', ondelete='CASCADE'),
         nullable=False
     )
 
@@ -103,9 +131,11 @@ class Recipe(db.Model):
     recipe_name = db.Column(db.String(100), nullable=False)
     recipe_cooktime = db.Column(db.Integer, nullable=False)
     recipe_instructions = db.Column(db.Text, nullable=False)
+    # The full generated recipe (ingredients, nutrition, tips), if saved
+    recipe_payload = db.Column(CompressedJSON, nullable=True)
     user_id = db.Column(
         db.Integer,
-        db.ForeignKey('users.user_id'),
+        db.ForeignKey('users.user_id', ondelete='CASCADE'),
         nullable=False
     )
 
@@ -146,3 +176,36 @@ class Recipe(db.Model):
             raise ValueError("Recipe instructions must be at least 10 "
                              "characters long")
         return recipe_instructions
+
+
+class UserSession(db.Model):
+    __tablename__ = 'sessions'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    session_id = db.Column(db.String(255), nullable=False, unique=True)
+    data = db.Column(db.LargeBinary)
+    expiry = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_tokens'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    # Either a single token id, or None to revoke every token of the user
+    token_id = db.Column(db.String(64), nullable=True, index=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    revoked_at = db.Column(db.Float, nullable=False)
+    expires_at = db.Column(db.Float, nullable=False, index=True)
+
+
+class RateLimitBucket(db.Model):
+    __tablename__ = 'rate_limit_buckets'
+    bucket_key = db.Column(db.String(128), primary_key=True)
+    tokens = db.Column(db.Float, nullable=False)
+    updated_at = db.Column(db.Float, nullable=False, index=True)
+
+
+class GeneratedRecipe(db.Model):
+    __tablename__ = 'generation_cache'
+    cache_key = db.Column(db.String(512), primary_key=True)
+    payload = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.Float, nullable=False)
+    expires_at = db.Column(db.Float, nullable=False, index=True)
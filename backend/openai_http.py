@@ -0,0 +1,116 @@
+import httpx
+import logging
+import os
+import threading
+
+
+def _env_float(name, default):
+    return float(os.environ.get(name, default))
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def transport_settings():
+    """Read OpenAI transport settings from the environment."""
+    return {
+        'max_connections': _env_int('OPENAI_MAX_CONNECTIONS', 20),
+        'max_keepalive_connections': _env_int('OPENAI_MAX_KEEPALIVE', 10),
+        'keepalive_expiry': _env_float('OPENAI_KEEPALIVE_EXPIRY', 60),
+        'http2': os.environ.get('OPENAI_HTTP2', 'false').lower() in ('1', 'true', 'yes'),
+        'connect_timeout': _env_float('OPENAI_CONNECT_TIMEOUT', 5),
+        'read_timeout': _env_float('OPENAI_READ_TIMEOUT', 30),
+        'write_timeout': _env_float('OPENAI_WRITE_TIMEOUT', 10),
+        'pool_timeout': _env_float('OPENAI_POOL_TIMEOUT', 5),
+        # Our own retry loop in generate_recipe handles retries
+        'sdk_max_retries': _env_int('OPENAI_SDK_MAX_RETRIES', 0),
+    }
+
+
+class ConnectionStats:
+    """Counts requests and new connections through httpcore trace events."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+        self.tls_handshakes = 0
+
+    def on_request(self, request):
+        with self._lock:
+            self.requests += 1
+        request.extensions['trace'] = self.trace
+
+    async def on_request_async(self, request):
+        with self._lock:
+            self.requests += 1
+        request.extensions['trace'] = self.trace_async
+
+    def trace(self, event_name, info):
+        if event_name == 'connection.connect_tcp.complete':
+            with self._lock:
+                self.new_connections += 1
+        elif event_name == 'connection.start_tls.complete':
+            with self._lock:
+                self.tls_handshakes += 1
+
+    async def trace_async(self, event_name, info):
+        self.trace(event_name, info)
+
+    def snapshot(self):
+        with self._lock:
+            reused = max(self.requests - self.new_connections, 0)
+            return {
+                'requests': self.requests,
+                'new_connections': self.new_connections,
+                'tls_handshakes': self.tls_handshakes,
+                'reused_connections': reused,
+                'reuse_ratio': round(reused / self.requests, 3) if self.requests else 0.0
+            }
+
+
+stats = ConnectionStats()
+
+
+def _client_options(settings):
+    http2 = settings['http2']
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            logging.warning("OPENAI_HTTP2 is set but the h2 package is missing, using HTTP/1.1")
+            http2 = False
+
+    return {
+        'http2': http2,
+        'limits': httpx.Limits(
+            max_connections=settings['max_connections'],
+            max_keepalive_connections=settings['max_keepalive_connections'],
+            keepalive_expiry=settings['keepalive_expiry']
+        ),
+        'timeout': httpx.Timeout(
+            connect=settings['connect_timeout'],
+            read=settings['read_timeout'],
+            write=settings['write_timeout'],
+            pool=settings['pool_timeout']
+        ),
+    }
+
+
+def build_http_client(settings=None):
+    """Build the pooled httpx client shared by every OpenAI call."""
+    settings = settings or transport_settings()
+    return httpx.Client(
+        event_hooks={'request': [stats.on_request]},
+        **_client_options(settings)
+    )
+
+
+def build_async_http_client(settings=None):
+    """Build a pooled httpx client for AsyncOpenAI; bound to one event loop."""
+    settings = settings or transport_settings()
+    return httpx.AsyncClient(
+        event_hooks={'request': [stats.on_request_async]},
+        **_client_options(settings)
+    )
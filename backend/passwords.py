@@ -0,0 +1,152 @@
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import generate_password_hash, check_password_hash
+from .sampling_profiler import profiler
+import logging
+import threading
+import time
+
+DEFAULT_HASH_METHOD = 'pbkdf2:sha256'
+
+
+class HashingBusyError(RuntimeError):
+    """Raised when the hashing queue is full and the request is shed."""
+
+
+class PasswordHasher:
+    """Runs password hashing and verification on a bounded worker pool.
+
+    pbkdf2 releases the GIL inside OpenSSL, so a small thread pool caps the
+    CPU spent on auth bursts without blocking the other request threads.
+    Callers wait for their result; once ``max_workers + max_queue`` jobs are
+    in flight new callers wait up to ``queue_timeout`` seconds and are then
+    rejected with :class:`HashingBusyError`.
+    """
+
+    def __init__(self, max_workers=2, max_queue=32, queue_timeout=5.0,
+                 method=DEFAULT_HASH_METHOD):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.method = method
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='password-hash'
+        )
+        self._lock = threading.Lock()
+        self._capacity = threading.Condition(self._lock)
+        self._hash_prefix = None
+        self._in_flight = 0
+        self._queued = 0
+        self._active = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_seconds = 0.0
+
+    def configure(self, max_workers=None, max_queue=None, queue_timeout=None,
+                  method=None):
+        """Resize the pool in place; counters and waiting callers carry over.
+
+        Jobs already submitted finish on the old executor.
+        """
+        old_executor = None
+        with self._capacity:
+            if max_workers and max_workers != self.max_workers:
+                old_executor = self._executor
+                self.max_workers = max_workers
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max_workers,
+                    thread_name_prefix='password-hash'
+                )
+            if max_queue is not None:
+                self.max_queue = max_queue
+            if queue_timeout is not None:
+                self.queue_timeout = queue_timeout
+            if method and method != self.method:
+                self.method = method
+                self._hash_prefix = None
+            # A larger limit may admit callers that are already waiting
+            self._capacity.notify_all()
+        if old_executor is not None:
+            old_executor.shutdown(wait=False)
+
+    def _job(self, submitted_at, caller, func, *args):
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            self._wait_seconds += time.monotonic() - submitted_at
+        try:
+            # Profiles of the caller's route include the hashing done here
+            with profiler.serving_for(caller):
+                return func(*args)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+
+    def _has_capacity(self):
+        return self._in_flight < self.max_workers + self.max_queue
+
+    def _run(self, func, *args):
+        with self._capacity:
+            if not self._capacity.wait_for(self._has_capacity,
+                                           timeout=self.queue_timeout):
+                self._rejected += 1
+                logging.warning('Password hashing queue is full, request shed.')
+                raise HashingBusyError('Password hashing queue is full')
+            # Submitted under the lock so configure() cannot shut the
+            # executor down in between
+            future = self._executor.submit(
+                self._job, time.monotonic(), threading.get_ident(), func, *args)
+            self._in_flight += 1
+            self._queued += 1
+        try:
+            return future.result()
+        finally:
+            with self._capacity:
+                self._in_flight -= 1
+                self._capacity.notify()
+
+    def hash(self, password):
+        """Hash a password with the configured method."""
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        """Check a password against a stored hash."""
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """Return True if the stored hash uses outdated parameters."""
+        if self._hash_prefix is None:
+            # Werkzeug fills in default iterations, so derive the full
+            # "method:hash:iterations" prefix from a throwaway hash.
+            sample = self._run(generate_password_hash, 'x', self.method)
+            self._hash_prefix = sample.split('$', 1)[0]
+        return password_hash.split('$', 1)[0] != self._hash_prefix
+
+    def metrics(self):
+        """Return a snapshot of queue depth and throughput counters."""
+        with self._lock:
+            started = self._completed + self._active
+            return {
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'queue_depth': self._queued,
+                'active': self._active,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'avg_wait_ms': round(
+                    self._wait_seconds / started * 1000, 3) if started else 0.0
+            }
+
+
+hasher = PasswordHasher()
+
+
+def init_app(app):
+    """Size the shared hasher from the app config."""
+    hasher.configure(
+        max_workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_queue=app.config['PASSWORD_HASH_QUEUE_SIZE'],
+        queue_timeout=app.config['PASSWORD_HASH_QUEUE_TIMEOUT'],
+        method=app.config['PASSWORD_HASH_METHOD']
+    )
@@ -0,0 +1,208 @@
+from flask import current_app, jsonify, request
+from functools import wraps
+from backend import db
+from .auth import current_user_id
+from .models import RateLimitBucket
+from sqlalchemy import case
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+import logging
+import math
+import threading
+import time
+
+
+def refill(tokens, updated_at, now, capacity, refill_rate):
+    """Return the bucket level after refilling since ``updated_at``."""
+    return min(capacity, tokens + (now - updated_at) * refill_rate)
+
+
+def take_token(tokens, capacity, refill_rate):
+    """Try to spend one token; return (allowed, new_tokens, retry_after)."""
+    if tokens >= 1:
+        return True, tokens - 1, 0.0
+    return False, tokens, (1 - tokens) / refill_rate
+
+
+class LocalBucketStore:
+    """Keeps buckets in process memory; each worker limits on its own."""
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill_rate):
+        now = time.time()
+        with self._lock:
+            tokens, updated_at = self._buckets.get(key, (capacity, now))
+            tokens = refill(tokens, updated_at, now, capacity, refill_rate)
+            allowed, tokens, retry_after = take_token(
+                tokens, capacity, refill_rate)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now, capacity, refill_rate)
+        return allowed, retry_after
+
+    def _prune(self, now, capacity, refill_rate):
+        # Buckets that have refilled completely carry no state
+        full_after = capacity / refill_rate
+        for key, (_, updated_at) in list(self._buckets.items()):
+            if now - updated_at >= full_after:
+                del self._buckets[key]
+
+
+class DatabaseBucketStore:
+    """Keeps buckets in the app database so every worker shares them.
+
+    A token is spent by one conditional UPDATE that refills and decrements
+    in SQL, so concurrent requests cannot overwrite each other's counts;
+    this holds on SQLite, which ignores SELECT ... FOR UPDATE, as well as
+    on Postgres. Missing rows are created with INSERT ... ON CONFLICT DO
+    NOTHING, and rows that have refilled completely are deleted every
+    ``prune_interval`` seconds.
+    """
+
+    def __init__(self, prune_interval=300, prune_batch_size=1000):
+        self.prune_interval = prune_interval
+        self.prune_batch_size = prune_batch_size
+        self._pruned_at = time.time()
+
+    def _ensure_bucket(self, key, capacity, now):
+        values = {'bucket_key': key, 'tokens': capacity, 'updated_at': now}
+        dialect = db.session.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            insert = sqlite_insert if dialect == 'sqlite' else postgresql_insert
+            db.session.execute(insert(RateLimitBucket).values(**values)
+                               .on_conflict_do_nothing(index_elements=['bucket_key']))
+            return
+        try:
+            with db.session.begin_nested():
+                db.session.execute(db.insert(RateLimitBucket).values(**values))
+        except IntegrityError:
+            pass  # Another request created it first
+
+    def consume(self, key, capacity, refill_rate):
+        now = time.time()
+        bucket = RateLimitBucket.__table__.c
+        refilled = bucket.tokens + (now - bucket.updated_at) * refill_rate
+        level = case((refilled > capacity, capacity), else_=refilled)
+        try:
+            self._ensure_bucket(key, capacity, now)
+            spent = db.session.execute(
+                db.update(RateLimitBucket)
+                .where(RateLimitBucket.bucket_key == key, level >= 1)
+                .values(tokens=level - 1, updated_at=now)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if spent:
+                allowed, retry_after = True, 0.0
+            else:
+                tokens, updated_at = db.session.execute(
+                    db.select(RateLimitBucket.tokens, RateLimitBucket.updated_at)
+                    .where(RateLimitBucket.bucket_key == key)
+                ).one()
+                allowed, _, retry_after = take_token(
+                    refill(tokens, updated_at, now, capacity, refill_rate),
+                    capacity, refill_rate)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if now - self._pruned_at >= self.prune_interval:
+            self._pruned_at = now
+            self.prune(now, capacity, refill_rate)
+        return allowed, retry_after
+
+    def prune(self, now, capacity, refill_rate):
+        """Delete buckets that have refilled completely; return the count."""
+        full_before = now - capacity / refill_rate
+        removed = 0
+        try:
+            while True:
+                stale = db.session.execute(
+                    db.select(RateLimitBucket.bucket_key)
+                    .where(RateLimitBucket.updated_at <= full_before)
+                    .limit(self.prune_batch_size)
+                ).scalars().all()
+                if not stale:
+                    break
+                db.session.execute(
+                    db.delete(RateLimitBucket)
+                    .where(RateLimitBucket.bucket_key.in_(stale),
+                           RateLimitBucket.updated_at <= full_before))
+                db.session.commit()
+                removed += len(stale)
+                if len(stale) < self.prune_batch_size:
+                    break
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f'Error pruning rate limit buckets: {str(e)}.')
+        return removed
+
+
+class RateLimiter:
+    def __init__(self, store, capacity, refill_rate):
+        self.store = store
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+
+    def consume(self, key):
+        return self.store.consume(key, self.capacity, self.refill_rate)
+
+
+def client_key():
+    """Key buckets on the logged-in user, else on the client IP."""
+    user_id = current_user_id()
+    if user_id:
+        return f'user:{user_id}'
+    # Heroku's router appends the address it saw to X-Forwarded-For
+    return f'ip:{request.access_route[-1]}'
+
+
+def check_limit():
+    """Return a 429 response if the caller is over the limit, else None."""
+    if not current_app.config['RATE_LIMIT_ENABLED']:
+        return None
+
+    limiter = current_app.extensions['rate_limiter']
+    key = client_key()
+    try:
+        allowed, retry_after = limiter.consume(key)
+    except Exception as e:
+        # Fail open, a broken limiter must not take generation down
+        logging.error(f'Error in rate limiter: {str(e)}.')
+        return None
+
+    if not allowed:
+        logging.warning(f'Rate limit exceeded for {key}.')
+        response = jsonify({
+            'error': 'Too many recipe requests, please try again later'})
+        response.headers['Retry-After'] = str(math.ceil(retry_after))
+        return response, 429
+    return None
+
+
+def rate_limited(view):
+    """Reject the request with 429 once the caller's bucket is empty."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        limited = check_limit()
+        if limited is not None:
+            return limited
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def init_app(app):
+    if app.config['RATE_LIMIT_STORE'] == 'database':
+        store = DatabaseBucketStore()
+    else:
+        store = LocalBucketStore()
+    app.extensions['rate_limiter'] = RateLimiter(
+        store,
+        capacity=app.config['RATE_LIMIT_CAPACITY'],
+        refill_rate=app.config['RATE_LIMIT_REFILL_PER_MINUTE'] / 60
+    )
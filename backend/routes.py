@@ -1,9 +1,21 @@
-from flask import Blueprint, request, jsonify, session, send_from_directory
-from .chatgptAPI import generate_recipe
+from flask import (Blueprint, request, jsonify, session, send_from_directory,
+                   current_app, Response)
+from .chatgptAPI import generate_recipe, connection_stats, router, hedger
+import hmac
 import logging
-from werkzeug.security import check_password_hash
+import math
 from backend import db
 from .models import User, Ingredient, Recipe
+from .passwords import hasher, HashingBusyError
+from .auth import tokens, current_user_id
+from .identity import identities
+from .ratelimit import rate_limited
+from .generation_cache import generation_cache, public_result
+from .schemas import (parse_request, NewUser, UserUpdate, Login, NewIngredient,
+                      NewRecipe, GenerateRecipe, GenerateFromFridge)
+from .sampling_profiler import profiler, ProfilerBusyError, format_collapsed
+from .admission import (admission, async_admission, AdmissionRejected,
+                        PRIORITY_USER, PRIORITY_ANONYMOUS)
 from sqlalchemy.exc import IntegrityError
 
 main = Blueprint('main', __name__)
@@ -12,33 +24,54 @@ main = Blueprint('main', __name__)
 @main.route('/', defaults={'path': ''})
 @main.route('/<path:path>')
 def catch_all(path):
+    assets = current_app.extensions.get('static_assets')
+    if assets is not None:
+        return assets.serve_shell(path)
     return send_from_directory('static', 'index.html')
 
 
 @main.route('/api/generate-recipe', methods=['POST'])
+@rate_limited
 def create_recipe():
     try:
-        data = request.get_json()
-
-        ingredients_string = data.get('ingredients', '')  # Expecting a string
-        dietary_concerns = data.get('dietary_concerns')
-
-        if not ingredients_string or not isinstance(ingredients_string, str):
-            logging.warning("No ingredients string provided in request")
+        body, error = parse_request(GenerateRecipe)
+        if error:
+            logging.warning(f"Invalid recipe request: {error}")
             return jsonify({"error": "Please provide ingredients as a "
                             "comma-separated string"}), 400
 
+        ingredients_string = body.ingredients
+        dietary_concerns = body.dietary_concerns
+
+        cached = generation_cache.get(ingredients_string, dietary_concerns)
+        if cached is not None:
+            return jsonify(public_result(cached))
+
+        # Logged-in users are admitted ahead of anonymous visitors
+        logged_in = bool(current_user_id())
+        priority = PRIORITY_USER if logged_in else PRIORITY_ANONYMOUS
+
+        # Don't hold a pooled DB connection while waiting on OpenAI
+        db.session.close()
         recipe = generate_recipe(
             ingredients=ingredients_string,
-            dietary_concerns=dietary_concerns
+            dietary_concerns=dietary_concerns,
+            tier='user' if logged_in else 'anonymous',
+            priority=priority
         )
 
         if not recipe.get('success'):
             logging.error(f"Failed to generate recipe: {recipe.get('error')}")
-            return jsonify(recipe), 500
+            return jsonify(public_result(recipe)), 500
 
+        generation_cache.put(ingredients_string, dietary_concerns, recipe)
         logging.info("Successfully processed recipe request")
-        return jsonify(recipe)
+        return jsonify(public_result(recipe))
+
+    except AdmissionRejected:
+        response = jsonify({"error": "Recipe service is busy, please retry"})
+        response.headers['Retry-After'] = '1'
+        return response, 503
 
     except Exception as e:
         logging.error(f"Error in create_recipe: {str(e)}")
@@ -46,56 +79,160 @@ def create_recipe():
 
 
 @main.route('/api/generate-recipe-from-fridge', methods=['POST'])
+@rate_limited
 def generate_recipe_from_fridge():
     try:
-        data = request.get_json()
-        ingredients_list = data.get(
-            'fridge_ingredients', [])  # Expecting a list
-        dietary_concerns = data.get('dietary_concerns')
-
-        if not ingredients_list or not isinstance(ingredients_list, list):
-            logging.warning("No ingredients list provided in request")
+        body, error = parse_request(GenerateFromFridge)
+        if error:
+            logging.warning(f"Invalid fridge recipe request: {error}")
             return jsonify(
                 {"error": "Please provide ingredients as a list"}), 400
 
+        ingredients_list = body.fridge_ingredients
+        dietary_concerns = body.dietary_concerns
+
+        cached = generation_cache.get(ingredients_list, dietary_concerns)
+        if cached is not None:
+            return jsonify(public_result(cached))
+
+        # Logged-in users are admitted ahead of anonymous visitors
+        logged_in = bool(current_user_id())
+        priority = PRIORITY_USER if logged_in else PRIORITY_ANONYMOUS
+
+        # Don't hold a pooled DB connection while waiting on OpenAI
+        db.session.close()
         recipe = generate_recipe(
             ingredients=ingredients_list,
-            dietary_concerns=dietary_concerns
+            dietary_concerns=dietary_concerns,
+            tier='user' if logged_in else 'anonymous',
+            priority=priority
         )
 
         if not recipe.get('success'):
             logging.error(f"Failed to generate recipe: {recipe.get('error')}")
-            return jsonify(recipe), 500
+            return jsonify(public_result(recipe)), 500
 
+        generation_cache.put(ingredients_list, dietary_concerns, recipe)
         logging.info("Successfully processed recipe from fridge request")
-        return jsonify(recipe)
+        return jsonify(public_result(recipe))
+
+    except AdmissionRejected:
+        response = jsonify({"error": "Recipe service is busy, please retry"})
+        response.headers['Retry-After'] = '1'
+        return response, 503
 
     except Exception as e:
         logging.error(f"Error in generate_recipe_from_fridge: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
 
+def _admin_error(action):
+    """Return an error response unless an admin is logged in."""
+    user_id = current_user_id()
+    user = identities.get(user_id) if user_id else None
+    if user is None:
+        return jsonify({'message': 'Unauthorized. Please log in.'}), 401
+    if user.user_email.lower() not in current_app.config['ADMIN_EMAILS']:
+        logging.warning(f'Non-admin user ID #{user_id} requested {action}.')
+        return jsonify({'message': 'Forbidden'}), 403
+    return None
+
+
+# Password hashing pool and OpenAI transport metrics (admins or METRICS_TOKEN)
+@main.route('/api/metrics', methods=['GET'])
+def metrics():
+    token = current_app.config['METRICS_TOKEN']
+    bearer = request.headers.get('Authorization', '')
+    if not (token and hmac.compare_digest(bearer, f'Bearer {token}')):
+        error = _admin_error('metrics')
+        if error is not None:
+            return error
+
+    return jsonify({
+        'password_hashing': hasher.metrics(),
+        'openai_admission': admission.metrics(),
+        'openai_async_admission': async_admission.metrics(),
+        'openai_connections': connection_stats(),
+        'openai_models': router.metrics(),
+        'openai_hedging': hedger.metrics(),
+        'generation_cache': generation_cache.metrics()}), 200
+
+
+# Sample worker stacks as collapsed flame graph input (admins only)
+@main.route('/api/admin/profile', methods=['POST'])
+def profile_workers():
+    if not current_app.config['PROFILER_ENABLED']:
+        return jsonify({'message': 'Not found'}), 404
+
+    error = _admin_error('a profile')
+    if error is not None:
+        return error
+
+    data = request.get_json(silent=True) or {}
+    try:
+        seconds = float(data.get('seconds', 5))
+        interval = float(data.get('interval_ms', 10)) / 1000
+    except (TypeError, ValueError):
+        return jsonify({'message': 'seconds and interval_ms must be numbers'}), 400
+    if not (math.isfinite(seconds) and math.isfinite(interval)):
+        return jsonify({'message': 'seconds and interval_ms must be finite'}), 400
+
+    try:
+        logging.info(f'Profiling workers for {seconds}s (route: {data.get("route")}).')
+        stacks = profiler.profile(seconds, interval, route=data.get('route'))
+    except ProfilerBusyError:
+        return jsonify({'message': 'A profile is already running'}), 409
+    return Response(format_collapsed(stacks), mimetype='text/plain')
+
+
 # Existing user login (with password verification)
 @main.route('/login', methods=['POST'])
 def login():
-    data = request.get_json()
+    data, error = parse_request(Login)
+    if error:
+        logging.warning(f'Invalid login request: {error}')
+        return jsonify({'message': error}), 400
     try:
-        user = User.query.filter_by(user_email=data['user_email']).first()
-        if user and check_password_hash(
+        user = User.query.filter_by(user_email=data.user_email).first()
+        if user and hasher.verify(
             user.user_password,
-            data['user_password']
+            data.user_password
         ):
+            try:
+                if hasher.needs_rehash(user.user_password):
+                    # The validator rehashes with the current parameters
+                    user.user_password = data.user_password
+                    db.session.commit()
+                    logging.info(
+                        f'Rehashed password for user "{user.user_email}".'
+                    )
+            except (ValueError, HashingBusyError):
+                # The login stands; the rehash waits for a later one
+                db.session.rollback()
+
+            body = {'id': user.user_id, 'user_name': user.user_name}
+            if tokens.enabled:
+                token = tokens.issue(user.user_id)
+                body['token'] = token
+                response = jsonify(body)
+                tokens.set_cookie(response, token)
+                logging.info(
+                    f'User "{user.user_email}" logged in successfully.')
+                return response, 200
+
             session['user_id'] = user.user_id
             logging.info(f'User "{user.user_email}" logged in successfully.')
-            return jsonify({
-                'id': user.user_id,
-                'user_name': user.user_name}), 200
+            return jsonify(body), 200
 
         logging.warning(
-            f'Invalid login attempt for email: "{data["user_email"]}".'
+            f'Invalid login attempt for email: "{data.user_email}".'
         )
         return jsonify({'message': 'Invalid email or password'}), 401
 
+    except HashingBusyError:
+        db.session.rollback()
+        return jsonify({'message': 'Server busy, please retry'}), 503
+
     except Exception as e:
         db.session.rollback()
         logging.error(f'Error on login route: {str(e)}.')
@@ -109,6 +246,20 @@ def login():
 @main.route('/logout', methods=['POST'])
 def logout():
     try:
+        if tokens.enabled:
+            token = tokens.request_token()
+            user_id = tokens.verify(token) if token else None
+            if user_id:
+                tokens.revoke(token)
+                response = jsonify({'message': 'Logout successful'})
+                tokens.clear_cookie(response)
+                logging.info(
+                    f'User with ID {user_id} logged out successfully.')
+                return response, 200
+
+            logging.warning('Logout attempt without a valid auth token.')
+            return jsonify({'message': 'No active session found'}), 400
+
         if 'user_id' in session:
             # Remove user_id from and clear the entire session
             user_id = session.pop('user_id', None)
@@ -127,12 +278,15 @@ def logout():
 # Add a new user
 @main.route('/users', methods=['POST'])
 def add_user():
-    data = request.get_json()
+    data, error = parse_request(NewUser)
+    if error:
+        logging.warning(f'Invalid add_user request: {error}')
+        return jsonify({'message': error}), 400
     try:
         new_user = User(
-            user_name=data['user_name'],
-            user_email=data['user_email'],
-            user_password=data['user_password']
+            user_name=data.user_name,
+            user_email=data.user_email,
+            user_password=data.user_password
         )
         db.session.add(new_user)
         db.session.commit()
@@ -144,9 +298,13 @@ def add_user():
 
     except IntegrityError:
         db.session.rollback()
-        logging.warning(f'Duplicate email attempted: {data["user_email"]}')
+        logging.warning(f'Duplicate email attempted: {data.user_email}')
         return jsonify({'message': 'User email must be unique'}), 400
 
+    except HashingBusyError:
+        db.session.rollback()
+        return jsonify({'message': 'Server busy, please retry'}), 503
+
     except Exception as e:
         db.session.rollback()
         logging.error(f'Error on add_user route: {str(e)}.')
@@ -160,15 +318,15 @@ def add_user():
 @main.route('/users', methods=['GET'])
 def get_user():
     try:
-        # Get user_id from session
-        user_id = session.get('user_id')
+        # Get user_id from session or auth token
+        user_id = current_user_id()
         if not user_id:
             logging.warning(
                 'Attempt to access user info without an active session.'
             )
             return jsonify({'message': 'Unauthorized. Please log in.'}), 401
 
-        user = User.query.get(user_id)
+        user = identities.get(user_id)
         if user:
             logging.info(
                 f'User "{user.user_email}" account information loaded'
@@ -192,9 +350,13 @@ def get_user():
 # Update a user by ID (with password verification)
 @main.route('/users', methods=['PUT'])
 def update_user():
+    data, error = parse_request(UserUpdate)
+    if error:
+        logging.warning(f'Invalid update_user request: {error}')
+        return jsonify({'message': error}), 400
     try:
-        # Get user_id from session
-        user_id = session.get('user_id')
+        # Get user_id from session or auth token
+        user_id = current_user_id()
         if not user_id:
             logging.warning(
                 'Attempt to update user info without an active session.'
@@ -203,12 +365,10 @@ def update_user():
 
         user = User.query.get(user_id)
         if user:
-            data = request.get_json()
-
             # Verify the existing password for security before allowing updates
-            if 'current_user_password' not in data or not check_password_hash(
+            if data.current_user_password is None or not hasher.verify(
                 user.user_password,
-                data['current_user_password']
+                data.current_user_password
             ):
                 logging.warning(
                     f'User "{user.user_email}" entered an incorrect current '
@@ -218,13 +378,15 @@ def update_user():
                     'message': 'Current password is incorrect'}), 403
 
             # Update user_name if provided
-            user.user_name = data.get('user_name', user.user_name)
+            if data.user_name is not None:
+                user.user_name = data.user_name
 
             # Update password if provided
-            if 'new_user_password' in data:
-                user.user_password = data['new_user_password']
+            if data.new_user_password is not None:
+                user.user_password = data.new_user_password
 
             db.session.commit()
+            identities.invalidate(user_id)
             logging.info(
                 f'User "{user.user_email}" updated account name and/or '
                 f'password successfully.'
@@ -236,6 +398,10 @@ def update_user():
         logging.warning(f'User with ID #{user_id} not found.')
         return jsonify({'message': 'User not found'}), 404
 
+    except HashingBusyError:
+        db.session.rollback()
+        return jsonify({'message': 'Server busy, please retry'}), 503
+
     except Exception as e:
         db.session.rollback()
         logging.error(f'Error on update_user route: {str(e)}.')
@@ -248,8 +414,8 @@ def update_user():
 @main.route('/users', methods=['DELETE'])
 def delete_user():
     try:
-        # Get user_id from session
-        user_id = session.get('user_id')
+        # Get user_id from session or auth token
+        user_id = current_user_id()
         if not user_id:
             logging.warning(
                 'Attempt to delete user without an active session.'
@@ -260,6 +426,9 @@ def delete_user():
         if user:
             db.session.delete(user)
             db.session.commit()
+            identities.invalidate(user_id)
+            if tokens.enabled:
+                tokens.revoke_user(user_id)
             logging.info(f'User "{user.user_email}" deleted successfully.')
             return jsonify({'message': 'User deleted successfully'}), 200
 
@@ -279,10 +448,13 @@ def delete_user():
 # Add a new ingredient
 @main.route('/ingredients', methods=['POST'])
 def add_ingredient():
-    data = request.get_json()
+    data, error = parse_request(NewIngredient)
+    if error:
+        logging.warning(f'Invalid add_ingredient request: {error}')
+        return jsonify({'message': error}), 400
     try:
-        # Get user_id from session
-        user_id = session.get('user_id')
+        # Get user_id from session or auth token
+        user_id = current_user_id()
         if not user_id:
             logging.warning(
                 'Attempt to save ingredient without an active session.'
@@ -290,7 +462,7 @@ def add_ingredient():
             return jsonify({'message': 'Unauthorized. Please log in.'}), 401
 
         new_ingredient = Ingredient(
-            ingredient_name=data['ingredient_name'],
+            ingredient_name=data.ingredient_name,
             user_id=user_id
         )
         db.session.add(new_ingredient)
@@ -326,8 +498,8 @@ def add_ingredient():
 @main.route('/ingredients', methods=['GET'])
 def get_ingredients():
     try:
-        # Get user_id from session
-        user_id = session.get('user_id')
+        # Get user_id from session or auth token
+        user_id = current_user_id()
         if not user_id:
             logging.warning(
                 'Attempt to get available ingredients without an active session.'
@@ -381,10 +553,13 @@ def delete_ingredient(ingredient_id):
 # Add a new recipe
 @main.route('/recipes', methods=['POST'])
 def add_recipe():
-    data = request.get_json()
+    data, error = parse_request(NewRecipe)
+    if error:
+        logging.warning(f'Invalid add_recipe request: {error}')
+        return jsonify({'message': error}), 400
     try:
-        # Get user_id from session
-        user_id = session.get('user_id')
+        # Get user_id from session or auth token
+        user_id = current_user_id()
         if not user_id:
             logging.warning(
                 'Attempt to save recipe without an active session.'
@@ -392,9 +567,10 @@ def add_recipe():
             return jsonify({'message': 'Unauthorized. Please log in.'}), 401
 
         new_recipe = Recipe(
-            recipe_name=data['recipe_name'],
-            recipe_cooktime=data['recipe_cooktime'],
-            recipe_instructions=data['recipe_instructions'],
+            recipe_name=data.recipe_name,
+            recipe_cooktime=data.recipe_cooktime,
+            recipe_instructions=data.recipe_instructions,
+            recipe_payload=data.recipe_payload,
             user_id=user_id
         )
         db.session.add(new_recipe)
@@ -430,8 +606,8 @@ def add_recipe():
 @main.route('/recipes/', methods=['GET'])
 def get_recipes():
     try:
-        # Get user_id from session
-        user_id = session.get('user_id')
+        # Get user_id from session or auth token
+        user_id = current_user_id()
         if not user_id:
             logging.warning(
                 'Attempt to get saved recipes without an active session.'
@@ -446,7 +622,8 @@ def get_recipes():
             'id': recipe.recipe_id,
             'name': recipe.recipe_name,
             'cooktime': recipe.recipe_cooktime,
-            'instructions': recipe.recipe_instructions}
+            'instructions': recipe.recipe_instructions,
+            'payload': recipe.recipe_payload}
             for recipe in recipes]), 200
 
     except Exception as e:
@@ -471,7 +648,8 @@ def get_recipe(recipe_id):
                 'id': recipe.recipe_id,
                 'name': recipe.recipe_name,
                 'cooktime': recipe.recipe_cooktime,
-                'instructions': recipe.recipe_instructions}), 200
+                'instructions': recipe.recipe_instructions,
+                'payload': recipe.recipe_payload}), 200
 
         logging.warning(f'Recipe with ID #{recipe_id} not found.')
         return jsonify({'message': 'Recipe not found'}), 404
@@ -0,0 +1,115 @@
+from collections import Counter
+from contextlib import contextmanager
+from flask import request
+import math
+import sys
+import threading
+import time
+
+
+class ProfilerBusyError(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+
+def collapse_stack(frame, max_depth=128):
+    """Return a frame's stack as ``root;...;leaf`` of module:function names."""
+    names = []
+    while frame is not None and len(names) < max_depth:
+        code = frame.f_code
+        module = frame.f_globals.get('__name__', '?')
+        names.append(f'{module}:{code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def format_collapsed(stacks):
+    """Render stack counts in the collapsed format flame graph tools read."""
+    return ''.join(f'{stack} {count}\n' for stack, count in stacks.most_common())
+
+
+class SamplingProfiler:
+    """Samples the stacks of request threads with sys._current_frames.
+
+    Nothing runs between profiles except a dict update per request that
+    records which path each thread is serving; only those threads, and
+    helper threads working for them (see :meth:`serving_for`), are
+    sampled, so idle workers and background threads stay out of the
+    profile. While a profile runs, one thread wakes every ``interval``
+    seconds to walk the other threads' stacks; only one profile runs at a
+    time per process.
+    """
+
+    def __init__(self, max_seconds=25.0, min_interval=0.001):
+        self.max_seconds = max_seconds
+        self.min_interval = min_interval
+        self._active_paths = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.max_seconds = app.config['PROFILER_MAX_SECONDS']
+        app.before_request(self._track_request)
+        app.teardown_request(self._untrack_request)
+
+    def _track_request(self):
+        self._active_paths[threading.get_ident()] = request.path
+
+    def _untrack_request(self, exc=None):
+        self._active_paths.pop(threading.get_ident(), None)
+
+    @contextmanager
+    def serving_for(self, thread_id):
+        """Count the current thread as serving ``thread_id``'s request.
+
+        Helper pools, such as the password-hash pool, wrap each job in this
+        so their work shows up in profiles of the route that asked for it.
+        """
+        path = self._active_paths.get(thread_id)
+        if path is None:
+            yield
+            return
+        own_thread = threading.get_ident()
+        self._active_paths[own_thread] = path
+        try:
+            yield
+        finally:
+            self._active_paths.pop(own_thread, None)
+
+    def profile(self, seconds=5.0, interval=0.01, route=None):
+        """Sample for ``seconds`` and return a Counter of collapsed stacks.
+
+        Only threads serving a request are sampled; with ``route`` set,
+        only those serving a path that starts with it. The calling thread
+        is never sampled.
+        """
+        if not (math.isfinite(seconds) and math.isfinite(interval)):
+            raise ValueError('seconds and interval must be finite')
+        seconds = min(max(seconds, 0.0), self.max_seconds)
+        interval = max(interval, self.min_interval)
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusyError('A profile is already running')
+        try:
+            own_thread = threading.get_ident()
+            stacks = Counter()
+            deadline = time.monotonic() + seconds
+            while True:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_thread:
+                        continue
+                    path = self._active_paths.get(thread_id)
+                    if path is None or (route is not None
+                                        and not path.startswith(route)):
+                        continue
+                    stacks[collapse_stack(frame)] += 1
+                if time.monotonic() >= deadline:
+                    return stacks
+                time.sleep(interval)
+        finally:
+            self._lock.release()
+
+
+profiler = SamplingProfiler()
+
+
+def init_app(app):
+    if app.config['PROFILER_ENABLED']:
+        profiler.init_app(app)
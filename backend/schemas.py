@@ -0,0 +1,118 @@
+from flask import request
+from typing import Optional
+import msgspec
+import re
+
+EMAIL_PATTERN = re.compile(r'^[\w\.-]+@[\w\.-]+\.\w+$')
+PASSWORD_PATTERN = re.compile(
+    r'^(?=.*[A-Z])(?=.*\d)'
+    r'(?=.*[@$!%*?&])[A-Za-z\d@$!%*?&]{8,}$'
+)
+PASSWORD_RULES = ("Password must be at least 8 characters long, "
+                  "contain one uppercase letter, one number, and "
+                  "one special character")
+# Upper bound on a saved recipe's generated payload, encoded
+MAX_RECIPE_PAYLOAD = 32 * 1024
+
+
+def _check_name(value, label, min_length):
+    if any(char.isdigit() for char in value):
+        raise ValueError(f"{label} cannot contain numbers")
+    if len(value) < min_length:
+        raise ValueError(f"{label} must be at least {min_length} "
+                         f"characters long")
+
+
+def _check_password(value):
+    if not PASSWORD_PATTERN.match(value):
+        raise ValueError(PASSWORD_RULES)
+
+
+class NewUser(msgspec.Struct):
+    user_name: str
+    user_email: str
+    user_password: str
+
+    def __post_init__(self):
+        _check_name(self.user_name, 'User name', 3)
+        if not EMAIL_PATTERN.match(self.user_email):
+            raise ValueError("Invalid email format")
+        _check_password(self.user_password)
+
+
+class UserUpdate(msgspec.Struct):
+    # A missing current password is answered with 403 by the route
+    current_user_password: Optional[str] = None
+    user_name: Optional[str] = None
+    new_user_password: Optional[str] = None
+
+    def __post_init__(self):
+        if self.user_name is not None:
+            _check_name(self.user_name, 'User name', 3)
+        if self.new_user_password is not None:
+            _check_password(self.new_user_password)
+
+
+class Login(msgspec.Struct):
+    user_email: str
+    user_password: str
+
+
+class NewIngredient(msgspec.Struct):
+    ingredient_name: str
+
+    def __post_init__(self):
+        _check_name(self.ingredient_name, 'Ingredient name', 2)
+
+
+class NewRecipe(msgspec.Struct):
+    recipe_name: str
+    recipe_cooktime: int
+    recipe_instructions: str
+    recipe_payload: Optional[dict] = None
+
+    def __post_init__(self):
+        _check_name(self.recipe_name, 'Recipe name', 3)
+        if len(self.recipe_instructions.strip()) < 10:
+            raise ValueError("Recipe instructions must be at least 10 "
+                             "characters long")
+        if (self.recipe_payload is not None and
+                len(msgspec.json.encode(self.recipe_payload)) > MAX_RECIPE_PAYLOAD):
+            raise ValueError("Recipe payload is too large")
+
+
+class GenerateRecipe(msgspec.Struct):
+    ingredients: str = ''
+    dietary_concerns: Optional[str] = None
+
+    def __post_init__(self):
+        if not self.ingredients:
+            raise ValueError("No ingredients provided")
+
+
+class GenerateFromFridge(msgspec.Struct):
+    fridge_ingredients: list[str] = []
+    dietary_concerns: Optional[str] = None
+
+    def __post_init__(self):
+        if not self.fridge_ingredients:
+            raise ValueError("No ingredients provided")
+
+
+_decoders = {
+    schema: msgspec.json.Decoder(schema)
+    for schema in (NewUser, UserUpdate, Login, NewIngredient, NewRecipe,
+                   GenerateRecipe, GenerateFromFridge)
+}
+
+
+def parse_request(schema):
+    """Decode and validate the request body in one pass.
+
+    Returns ``(body, None)`` on success, or ``(None, message)`` when the
+    body is not JSON or does not match ``schema``.
+    """
+    try:
+        return _decoders[schema].decode(request.get_data(cache=True)), None
+    except msgspec.DecodeError as e:
+        return None, str(e)
@@ -0,0 +1,178 @@
+from datetime import datetime, timedelta
+from flask import current_app, g
+from flask.cli import with_appcontext
+from flask_session.base import ServerSideSession, ServerSideSessionInterface
+from itsdangerous import want_bytes
+from sqlalchemy import select, update, delete
+from backend import db
+from .models import UserSession
+from .tracing import tracer
+import click
+import logging
+import os
+import threading
+import time
+
+
+class DatabaseSession(ServerSideSession):
+    pass
+
+
+class DatabaseSessionInterface(ServerSideSessionInterface):
+    """Stores Flask sessions in the app database through the shared ``db``.
+
+    Unchanged sessions are only written back once their stored expiry is
+    older than ``refresh_interval``, and a background thread deletes expired
+    rows in batches of ``sweep_batch_size`` every ``sweep_interval`` seconds.
+    """
+
+    session_class = DatabaseSession
+    ttl = False
+
+    def __init__(self, app, key_prefix='session:', use_signer=False,
+                 permanent=True, sid_length=32, serialization_format='msgpack',
+                 refresh_interval=timedelta(hours=1), sweep_interval=300,
+                 sweep_batch_size=500):
+        self.refresh_interval = refresh_interval
+        self.sweep_interval = sweep_interval
+        self.sweep_batch_size = sweep_batch_size
+        self._sweeper_pid = None
+        self._sweeper_lock = threading.Lock()
+
+        super().__init__(
+            app,
+            key_prefix,
+            use_signer,
+            permanent,
+            sid_length,
+            serialization_format,
+            None
+        )
+        app.before_request(self._ensure_sweeper)
+        app.cli.add_command(session_cleanup_command)
+
+    def open_session(self, app, request):
+        g.pop('_session_expiry', None)
+        with tracer.span('session.open'):
+            return super().open_session(app, request)
+
+    def save_session(self, app, session, response):
+        with tracer.span('session.save'):
+            return super().save_session(app, session, response)
+
+    def _retrieve_session_data(self, store_id):
+        record = db.session.execute(
+            select(UserSession.data, UserSession.expiry)
+            .where(UserSession.session_id == store_id)
+        ).first()
+        if record is None:
+            return None
+
+        if record.expiry <= datetime.utcnow():
+            self._delete_session(store_id)
+            return None
+
+        # Remember the stored expiry so unchanged sessions can skip the write
+        g._session_expiry = record.expiry
+        return self.serializer.decode(want_bytes(record.data))
+
+    def _delete_session(self, store_id):
+        try:
+            db.session.execute(
+                delete(UserSession).where(UserSession.session_id == store_id)
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def _upsert_session(self, session_lifetime, session, store_id):
+        expiry = datetime.utcnow() + session_lifetime
+        data = self.serializer.encode(session)
+        try:
+            result = db.session.execute(
+                update(UserSession)
+                .where(UserSession.session_id == store_id)
+                .values(data=data, expiry=expiry)
+            )
+            if result.rowcount == 0:
+                db.session.add(
+                    UserSession(session_id=store_id, data=data, expiry=expiry)
+                )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        g._session_expiry = expiry
+
+    def should_set_storage(self, app, session):
+        if session.modified:
+            return True
+        if not app.config['SESSION_REFRESH_EACH_REQUEST']:
+            return False
+
+        stored_expiry = g.get('_session_expiry')
+        if stored_expiry is None:
+            return True
+        written_at = stored_expiry - app.permanent_session_lifetime
+        return datetime.utcnow() - written_at >= self.refresh_interval
+
+    def _delete_expired_sessions(self):
+        """Delete expired sessions in batches and return how many went."""
+        removed = 0
+        while True:
+            expired_ids = db.session.execute(
+                select(UserSession.id)
+                .where(UserSession.expiry <= datetime.utcnow())
+                .limit(self.sweep_batch_size)
+            ).scalars().all()
+            if not expired_ids:
+                break
+            try:
+                db.session.execute(
+                    delete(UserSession).where(UserSession.id.in_(expired_ids))
+                )
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            removed += len(expired_ids)
+            if len(expired_ids) < self.sweep_batch_size:
+                break
+        return removed
+
+    def _ensure_sweeper(self):
+        # Threads do not survive a fork, so start one per worker process
+        if not self.sweep_interval or self._sweeper_pid == os.getpid():
+            return
+        with self._sweeper_lock:
+            if self._sweeper_pid == os.getpid():
+                return
+            self._sweeper_pid = os.getpid()
+            threading.Thread(
+                target=self._sweep_loop,
+                name='session-sweeper',
+                daemon=True
+            ).start()
+
+    def _sweep_loop(self):
+        while True:
+            time.sleep(self.sweep_interval)
+            with self.app.app_context():
+                try:
+                    removed = self._delete_expired_sessions()
+                    if removed:
+                        logging.info(f'Session sweeper removed {removed} '
+                                     f'expired sessions.')
+                except Exception as e:
+                    logging.error(f'Error in session sweeper: {str(e)}.')
+                finally:
+                    db.session.remove()
+
+
+@click.command('session_cleanup')
+@with_appcontext
+def session_cleanup_command():
+    """Delete expired sessions now, in the sweeper's batches."""
+    removed = current_app.session_interface._delete_expired_sessions()
+    click.echo(f'Removed {removed} expired sessions.')
@@ -1,4 +1,8 @@
 from backend import create_app, db
+from flask_migrate import stamp
+import os
+
+MIGRATIONS = os.path.join(os.path.dirname(__file__), '..', 'migrations')
 
 
 def setup_database():
@@ -6,6 +10,9 @@ def setup_database():
     with app.app_context():
         db.drop_all()
         db.create_all()
+        # The tables already match the models, so mark every migration as
+        # applied; `flask db upgrade` then only runs ones added later
+        stamp(directory=MIGRATIONS, revision='head')
         print("Database tables recreated successfully!")
 
 
@@ -0,0 +1,101 @@
+from collections import Counter
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+import logging
+import re
+import time
+
+_IN_LIST = re.compile(r'\((?:\s*(?:\?|%\(\w+\)s|:\w+)\s*,)+\s*(?:\?|%\(\w+\)s|:\w+)\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def statement_shape(statement):
+    """Collapse whitespace and IN lists so repeated queries share a shape."""
+    return _IN_LIST.sub('(?)', _WHITESPACE.sub(' ', statement).strip())
+
+
+class RequestProfile:
+    __slots__ = ('count', 'total_ms', 'shapes')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.shapes = Counter()
+
+    def repeated(self, threshold):
+        """Return (shape, count) pairs run at least ``threshold`` times."""
+        return [(shape, count) for shape, count in self.shapes.most_common()
+                if count >= threshold]
+
+
+class SQLProfiler:
+    """Counts and times every SQL statement issued while serving a request.
+
+    Statements slower than ``slow_query_ms`` are logged with their
+    parameters, and a statement shape repeated ``repeat_threshold`` times
+    in one request is logged as a possible N+1. In debug mode the totals
+    are also returned in ``X-SQL-*`` response headers.
+    """
+
+    def __init__(self, slow_query_ms=100.0, repeat_threshold=5):
+        self.slow_query_ms = slow_query_ms
+        self.repeat_threshold = repeat_threshold
+
+    def init_app(self, app):
+        self.slow_query_ms = app.config['SQL_SLOW_QUERY_MS']
+        self.repeat_threshold = app.config['SQL_REPEAT_THRESHOLD']
+
+        from backend import db
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', self._before_execute)
+            event.listen(db.engine, 'after_cursor_execute', self._after_execute)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    def _start_request(self):
+        g._sql_profile = RequestProfile()
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_sql_profile_start', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('_sql_profile_start')
+        if not starts:
+            return
+        elapsed_ms = (time.perf_counter() - starts.pop()) * 1000
+        if elapsed_ms >= self.slow_query_ms:
+            logging.warning(
+                f'Slow query ({elapsed_ms:.1f}ms): {statement_shape(statement)} '
+                f'params={str(parameters)[:500]}')
+
+        profile = g.get('_sql_profile') if has_app_context() else None
+        if profile is None:
+            return
+        profile.count += 1
+        profile.total_ms += elapsed_ms
+        profile.shapes[statement_shape(statement)] += 1
+
+    def _finish_request(self, response):
+        profile = g.pop('_sql_profile', None)
+        if profile is None:
+            return response
+
+        for shape, count in profile.repeated(self.repeat_threshold):
+            logging.warning(
+                f'Possible N+1 in {request.endpoint}: {count} x {shape}')
+
+        if current_app.debug:
+            response.headers['X-SQL-Queries'] = str(profile.count)
+            response.headers['X-SQL-Time-ms'] = f'{profile.total_ms:.3f}'
+            response.headers['X-SQL-Max-Repeat'] = str(
+                max(profile.shapes.values(), default=0))
+        return response
+
+
+sql_profiler = SQLProfiler()
+
+
+def init_app(app):
+    """Attach the profiler when SQL_PROFILER_ENABLED is set."""
+    if app.config['SQL_PROFILER_ENABLED']:
+        sql_profiler.init_app(app)
@@ -0,0 +1,157 @@
+from flask import current_app, request
+from .compression import choose_encoding, compress, PRECOMPRESSED_SUFFIXES
+from .compression import send_precompressed, sibling_matches
+import hashlib
+import logging
+import mimetypes
+import os
+import threading
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+
+class StaticAsset:
+    """A static file held in memory with its compressed variants."""
+
+    __slots__ = ('data', 'mimetype', 'digest', 'encoded')
+
+    def __init__(self, data, mimetype, encoded=None):
+        self.data = data
+        self.mimetype = mimetype
+        self.digest = hashlib.sha256(data).hexdigest()[:12]
+        self.encoded = encoded or {}
+
+
+def hashed_name(name, digest):
+    """Turn ``bundle.js`` into ``bundle.<digest>.js``."""
+    stem, dot, ext = name.partition('.')
+    return f'{stem}.{digest}{dot}{ext}'
+
+
+class StaticAssetStore:
+    """Serves the SPA shell and build artifacts from memory.
+
+    Everything is read once, on first use. Build files are also exposed
+    under content-hashed names with an ``immutable`` Cache-Control header,
+    and the shell is rewritten to reference those names and revalidated by
+    ETag. Prebuilt ``.gz``/``.br`` siblings are only used if they decompress
+    to the file's current bytes; otherwise gzip is done in memory at load.
+    """
+
+    def __init__(self, static_dir, build_dir, build_url='/build', level=9):
+        self.static_dir = static_dir
+        self.build_dir = build_dir
+        self.build_url = build_url
+        self.level = level
+        self.shell = None
+        self.files = {}
+        self.build_files = {}
+        self.hashed_build_files = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _read(self, path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        encoded = {}
+        for encoding, suffix in PRECOMPRESSED_SUFFIXES.items():
+            if not os.path.isfile(path + suffix):
+                continue
+            with open(path + suffix, 'rb') as f:
+                compressed = f.read()
+            # Hashed URLs are cached forever, so a stale sibling must not be used
+            if sibling_matches(data, compressed, encoding):
+                encoded[encoding] = compressed
+            else:
+                logging.warning(f'Ignoring {path + suffix}: it does not match {path}.')
+        if 'gzip' not in encoded:
+            gzipped = compress(data, 'gzip', self.level)
+            if len(gzipped) < len(data):
+                encoded['gzip'] = gzipped
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        return StaticAsset(data, mimetype, encoded)
+
+    @staticmethod
+    def _is_servable(name):
+        return not name.endswith(tuple(PRECOMPRESSED_SUFFIXES.values()))
+
+    def load(self):
+        for name in sorted(os.listdir(self.build_dir)):
+            path = os.path.join(self.build_dir, name)
+            if os.path.isfile(path) and self._is_servable(name):
+                asset = self._read(path)
+                self.build_files[name] = asset
+                self.hashed_build_files[hashed_name(name, asset.digest)] = asset
+
+        for name in sorted(os.listdir(self.static_dir)):
+            path = os.path.join(self.static_dir, name)
+            if (os.path.isfile(path) and self._is_servable(name)
+                    and name != 'index.html'):
+                self.files[name] = self._read(path)
+
+        with open(os.path.join(self.static_dir, 'index.html'), 'rb') as f:
+            html = f.read().decode('utf-8')
+        for name, asset in self.build_files.items():
+            hashed_url = f'{self.build_url}/{hashed_name(name, asset.digest)}'
+            for quote in ("'", '"'):
+                html = html.replace(
+                    f'{quote}{self.build_url}/{name}{quote}',
+                    f'{quote}{hashed_url}{quote}'
+                )
+        self.shell = StaticAsset(html.encode('utf-8'), 'text/html')
+        self.shell.encoded['gzip'] = compress(self.shell.data, 'gzip', self.level)
+        self._loaded = True
+        return self
+
+    def _ensure_loaded(self):
+        # Loaded on first use so processes that never serve pages skip it
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load()
+
+    def _respond(self, asset, cache_control):
+        encoding = choose_encoding(request.accept_encodings, [
+            name for name in ('br', 'gzip') if name in asset.encoded])
+        body = asset.encoded[encoding] if encoding else asset.data
+
+        response = current_app.response_class(body, mimetype=asset.mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.set_etag(f'{asset.digest}-{encoding}' if encoding
+                          else asset.digest)
+        response.headers['Cache-Control'] = cache_control
+        return response.make_conditional(request)
+
+    def serve_shell(self, path=''):
+        """Serve a top-level static file, or the SPA shell for any route."""
+        self._ensure_loaded()
+        asset = self.files.get(path)
+        if asset is not None:
+            return self._respond(asset, REVALIDATE_CACHE_CONTROL)
+        return self._respond(self.shell, REVALIDATE_CACHE_CONTROL)
+
+    def serve_build(self, filename):
+        """Serve a build artifact by hashed or plain name."""
+        self._ensure_loaded()
+        asset = self.hashed_build_files.get(filename)
+        if asset is not None:
+            return self._respond(asset, IMMUTABLE_CACHE_CONTROL)
+        asset = self.build_files.get(filename)
+        if asset is not None:
+            return self._respond(asset, REVALIDATE_CACHE_CONTROL)
+        # Files added after startup are still served from disk
+        return send_precompressed(self.build_dir, filename)
+
+
+def init_app(app):
+    """Serve the static assets from memory, loading them on first use."""
+    store = StaticAssetStore(
+        static_dir=os.path.join(app.root_path, 'static'),
+        build_dir=app.static_folder,
+        build_url=app.static_url_path
+    )
+    app.extensions['static_assets'] = store
+    app.view_functions['static'] = store.serve_build
@@ -0,0 +1,327 @@
+from contextlib import contextmanager
+from functools import wraps
+from sqlalchemy import event
+import atexit
+import contextvars
+import ipaddress
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    __slots__ = ('trace', 'name', 'span_id', 'parent_id', 'start_ns',
+                 'end_ns', 'attributes', 'error')
+
+    def __init__(self, trace, name, parent_id=None, attributes=None):
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes or {}
+        self.error = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def end(self):
+        self.end_ns = time.time_ns()
+        self.trace.spans.append(self)
+
+    def to_otlp(self):
+        """Return the span in OTLP/JSON form."""
+        span = {
+            'traceId': self.trace.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [
+                {'key': key, 'value': _otlp_value(value)}
+                for key, value in self.attributes.items()
+            ],
+            'status': {'code': 2, 'message': self.error} if self.error else {}
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+class Trace:
+    __slots__ = ('trace_id', 'spans')
+
+    def __init__(self, trace_id=None):
+        self.trace_id = trace_id or os.urandom(16).hex()
+        self.spans = []
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _otlp_payload(spans):
+    return {'resourceSpans': [{
+        'resource': {'attributes': [
+            {'key': 'service.name', 'value': {'stringValue': 'recipe-api'}}]},
+        'scopeSpans': [{'scope': {'name': 'backend.tracing'},
+                        'spans': [span.to_otlp() for span in spans]}]
+    }]}
+
+
+class FileExporter:
+    """Appends one OTLP/JSON payload per trace to a local file."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def export(self, spans):
+        with open(self.path, 'a', encoding='utf-8') as trace_file:
+            trace_file.write(json.dumps(_otlp_payload(spans)) + '\n')
+
+
+class OTLPHttpExporter:
+    """Posts OTLP/JSON payloads to a collector's /v1/traces endpoint."""
+
+    def __init__(self, endpoint, timeout=2.0):
+        import httpx
+        self.url = endpoint.rstrip('/') + '/v1/traces'
+        self._client = httpx.Client(timeout=timeout)
+
+    def export(self, spans):
+        self._client.post(self.url, json=_otlp_payload(spans))
+
+
+class Tracer:
+    """Request-scoped tracing with sampled, batched export.
+
+    A root span covers the whole WSGI request, including session load and
+    save. Child spans are only recorded while a sampled root is active, so
+    unsampled requests pay one context variable lookup per span. Finished
+    traces are exported from a background thread; when its queue is full
+    traces are dropped rather than slowing requests down.
+
+    An incoming ``traceparent`` always lends its trace id, but its sampled
+    flag is only honoured from ``trusted_parents`` addresses; anyone else
+    could otherwise force every request to be traced.
+    """
+
+    def __init__(self, sample_rate=0.0, exporter=None, queue_size=1000,
+                 trusted_parents=()):
+        self.sample_rate = sample_rate
+        self.exporter = exporter
+        self.trusted_parents = [ipaddress.ip_network(network, strict=False)
+                                for network in trusted_parents]
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._worker_pid = None
+        self._lock = threading.Lock()
+        self.exported = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self):
+        return self.sample_rate > 0 and self.exporter is not None
+
+    @contextmanager
+    def span(self, name, **attributes):
+        """Record a child span of the current span, if one is active."""
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+        span = Span(parent.trace, name, parent.span_id, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = repr(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            span.end()
+
+    def traced(self, name=None):
+        """Decorator form of :meth:`span`."""
+        def decorator(func):
+            span_name = name or func.__qualname__
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def is_trusted(self, remote_addr):
+        """Whether a caller's sampling decision should be followed."""
+        if not remote_addr or not self.trusted_parents:
+            return False
+        try:
+            address = ipaddress.ip_address(remote_addr)
+        except ValueError:
+            return False
+        return any(address in network for network in self.trusted_parents)
+
+    def start_root(self, name, traceparent=None, trusted=False, **attributes):
+        """Start a root span if this request is sampled; return it or None."""
+        trace_id = parent_id = None
+        sampled = random.random() < self.sample_rate
+        if traceparent:
+            parts = traceparent.split('-')
+            if len(parts) == 4 and len(parts[1]) == 32:
+                trace_id, parent_id = parts[1], parts[2]
+                sampled = sampled or (trusted and parts[3] == '01')
+        if not self.enabled or not sampled:
+            return None
+        return Span(Trace(trace_id), name, parent_id, attributes)
+
+    def finish_root(self, span):
+        span.end()
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(span.trace.spans)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_worker(self):
+        if self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker_pid == os.getpid():
+                return
+            self._worker_pid = os.getpid()
+            threading.Thread(
+                target=self._export_loop, name='trace-exporter', daemon=True
+            ).start()
+
+    def _export_loop(self):
+        while True:
+            spans = self._queue.get()
+            try:
+                self.exporter.export(spans)
+                self.exported += 1
+            except Exception as e:
+                self.dropped += 1
+                logging.warning(f'Error exporting trace: {str(e)}.')
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Block until every queued trace has been exported."""
+        if self._worker_pid == os.getpid():
+            self._queue.join()
+
+
+tracer = Tracer()
+
+
+class TracingMiddleware:
+    """WSGI middleware that opens the root span for each request."""
+
+    def __init__(self, wsgi_app, tracer):
+        self.wsgi_app = wsgi_app
+        self.tracer = tracer
+
+    def __call__(self, environ, start_response):
+        root = self.tracer.start_root(
+            f"{environ.get('REQUEST_METHOD')} {environ.get('PATH_INFO')}",
+            traceparent=environ.get('HTTP_TRACEPARENT'),
+            trusted=self.tracer.is_trusted(environ.get('REMOTE_ADDR')),
+            **{'http.method': environ.get('REQUEST_METHOD', ''),
+               'http.target': environ.get('PATH_INFO', '')}
+        )
+        if root is None:
+            return self.wsgi_app(environ, start_response)
+
+        def traced_start_response(status, headers, exc_info=None):
+            root.set('http.status_code', int(status.split(' ', 1)[0]))
+            return start_response(status, headers, exc_info)
+
+        token = _current_span.set(root)
+        try:
+            return self.wsgi_app(environ, traced_start_response)
+        except BaseException as e:
+            root.error = repr(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.tracer.finish_root(root)
+
+
+def _trace_view(endpoint, view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if _current_span.get() is None:
+            return view(*args, **kwargs)
+        with tracer.span(f'view {endpoint}', endpoint=endpoint):
+            return view(*args, **kwargs)
+    return wrapper
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_span.get() is None:
+        return
+    span_cm = tracer.span('sql', **{'db.statement': statement[:500]})
+    span_cm.__enter__()
+    conn.info.setdefault('_trace_spans', []).append(span_cm)
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    spans = conn.info.get('_trace_spans')
+    if spans:
+        spans.pop().__exit__(None, None, None)
+
+
+def _handle_error(exception_context):
+    spans = exception_context.connection.info.get('_trace_spans') \
+        if exception_context.connection is not None else None
+    if spans:
+        error = exception_context.original_exception
+        spans.pop().__exit__(type(error), error, None)
+
+
+def build_exporter(app):
+    if app.config['TRACE_EXPORTER'] == 'otlp':
+        return OTLPHttpExporter(app.config['TRACE_OTLP_ENDPOINT'])
+    return FileExporter(app.config['TRACE_FILE'])
+
+
+def init_app(app):
+    """Trace sampled requests when TRACE_SAMPLE_RATE is above zero."""
+    tracer.sample_rate = app.config['TRACE_SAMPLE_RATE']
+    tracer.trusted_parents = [
+        ipaddress.ip_network(network, strict=False)
+        for network in app.config['TRACE_TRUSTED_PARENTS']]
+    if not tracer.sample_rate:
+        return
+    tracer.exporter = build_exporter(app)
+    app.wsgi_app = TracingMiddleware(app.wsgi_app, tracer)
+
+    from backend import db
+    with app.app_context():
+        engine = db.engine
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(engine, 'handle_error', _handle_error)
+    atexit.register(tracer.flush)
+
+
+def trace_views(app):
+    """Wrap every registered view in a span; call after blueprints."""
+    if not tracer.enabled:
+        return
+    for endpoint, view in list(app.view_functions.items()):
+        app.view_functions[endpoint] = _trace_view(endpoint, view)
@@ -0,0 +1,223 @@
+from collections import Counter
+from datetime import datetime, timedelta
+from .admission import AdmissionRejected, PRIORITY_BACKGROUND
+from .generation_cache import generation_cache
+from .log_parsing import (
+    CACHE_HIT_LINE, GENERATION_LINE, normalize_combo, parse_log_line)
+import click
+import glob
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows; every process may warm there
+    fcntl = None
+
+def parse_generation(message):
+    """Return (ingredients, diet) for a cache hit or a generation's first attempt."""
+    match = CACHE_HIT_LINE.match(message)
+    if match is None:
+        match = GENERATION_LINE.match(message)
+        if match is None or match.group('attempt') not in (None, '1'):
+            return None
+    items, diet = normalize_combo(match.group('ingredients'), match.group('diet'))
+    if not items:
+        return None
+    return items, diet
+
+
+def log_files(path):
+    """Return the log files and their rotated backups, oldest first.
+
+    A ``{pid}`` placeholder matches every worker's file. Backups are
+    ordered by their number, so ``.10`` comes before ``.2``.
+    """
+    if not path:
+        return []
+    pattern = path.replace('{pid}', '*')
+    backups = [p for p in glob.glob(f'{pattern}.*')
+               if p.rsplit('.', 1)[1].isdigit()]
+    backups.sort(key=lambda p: (-int(p.rsplit('.', 1)[1]), p))
+    return backups + sorted(glob.glob(pattern))
+
+
+def mine_log(paths, since=None):
+    """Count normalized (ingredients, diet) combos requested in the logs.
+
+    Both generations and generation cache hits count as demand. Files are
+    read one line at a time so large logs are never loaded whole.
+    """
+    combos = Counter()
+    for path in paths:
+        with open(path, encoding='utf-8', errors='replace') as log_file:
+            for line in log_file:
+                if ('Generating recipe for' not in line
+                        and 'Serving cached recipe for' not in line):
+                    continue
+                timestamp, _, message, _ = parse_log_line(line)
+                if since is not None and timestamp is not None and timestamp < since:
+                    continue
+                combo = parse_generation(message)
+                if combo is not None:
+                    combos[combo] += 1
+    return combos
+
+
+def parse_hours(spec):
+    """Parse an hour spec such as "2-5" or "1,3,23" into a set of hours."""
+    hours = set()
+    for part in spec.split(','):
+        part = part.strip()
+        if not part:
+            continue
+        if '-' in part:
+            start, end = (int(value) for value in part.split('-', 1))
+            hours.update(range(start, end + 1))
+        else:
+            hours.add(int(part))
+    return hours
+
+
+class RecipeWarmer:
+    """Pre-generates recipes for popular requests into the generation cache.
+
+    The most frequent combos from the last ``lookback_hours`` of logs are
+    generated until ``token_budget`` tokens have been spent, skipping those
+    cached for at least another ``run_interval_hours``, the gap until the
+    next run. Calls go through admission control at background
+    priority, so live requests are served first. The background thread
+    runs once a day during ``off_peak_hours``. Every worker starts one, but
+    only the process holding ``lock_path`` warms; run ``flask warm-recipes``
+    from a scheduler instead to avoid the threads altogether.
+    """
+
+    def __init__(self, log_path='recipe_api.log', token_budget=20000, top_n=20,
+                 min_count=2, lookback_hours=24, off_peak_hours=None,
+                 check_interval=600, lock_path=None, run_interval_hours=24):
+        self.log_path = log_path
+        self.token_budget = token_budget
+        self.top_n = top_n
+        self.min_count = min_count
+        self.lookback_hours = lookback_hours
+        self.off_peak_hours = off_peak_hours or set()
+        self.check_interval = check_interval
+        self.lock_path = lock_path
+        self.run_interval_hours = run_interval_hours
+        self._lock_file = None
+        self._last_run = None
+        self._thread_pid = None
+        self._lock = threading.Lock()
+
+    def candidates(self, now=None):
+        """Return the most requested combos worth warming, best first."""
+        since = (now or datetime.now()) - timedelta(hours=self.lookback_hours)
+        combos = mine_log(log_files(self.log_path), since=since)
+        return [(combo, count) for combo, count in combos.most_common(self.top_n)
+                if count >= self.min_count]
+
+    def warm(self, generate=None):
+        """Generate recipes for uncached popular combos within the budget."""
+        if generate is None:
+            from .chatgptAPI import generate_recipe as generate
+
+        summary = {'candidates': 0, 'cached': 0, 'generated': 0,
+                   'failed': 0, 'tokens': 0}
+        for (items, diet), _ in self.candidates():
+            summary['candidates'] += 1
+            if generation_cache.contains(list(items), diet,
+                                         min_remaining=self.run_interval_hours * 3600):
+                summary['cached'] += 1
+                continue
+            if summary['tokens'] >= self.token_budget:
+                logging.info('Recipe warmer token budget spent, stopping.')
+                break
+            try:
+                result = generate(ingredients=list(items),
+                                  dietary_concerns=diet or None,
+                                  priority=PRIORITY_BACKGROUND)
+            except AdmissionRejected:
+                logging.warning('Recipe warmer shed by admission control, stopping.')
+                break
+            summary['tokens'] += result.get('tokens') or 0
+            if result.get('success'):
+                generation_cache.put(list(items), diet, result)
+                summary['generated'] += 1
+            else:
+                summary['failed'] += 1
+
+        logging.info(f'Recipe warmer finished: {summary}')
+        return summary
+
+    def start(self, app):
+        """Start the off-peak warming thread once per process."""
+        if self._thread_pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread_pid == os.getpid():
+                return
+            self._thread_pid = os.getpid()
+            threading.Thread(
+                target=self._run_loop, args=(app,),
+                name='recipe-warmer', daemon=True
+            ).start()
+
+    def hold_lock(self):
+        """Take the warmer lock file if no other process has it.
+
+        The lock is kept for the life of the process and is freed by the
+        OS when it exits, so another worker takes over warming.
+        """
+        if self._lock_file is not None or fcntl is None or not self.lock_path:
+            return True
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _run_loop(self, app):
+        while True:
+            time.sleep(self.check_interval)
+            now = datetime.now()
+            if now.hour not in self.off_peak_hours or self._last_run == now.date():
+                continue
+            if not self.hold_lock():
+                continue
+            self._last_run = now.date()
+            try:
+                with app.app_context():
+                    self.warm()
+            except Exception as e:
+                logging.error(f'Error in recipe warmer: {str(e)}.')
+
+
+warmer = RecipeWarmer()
+
+
+@click.command('warm-recipes')
+def warm_recipes_command():
+    """Pre-generate recipes for the most requested ingredient combos."""
+    summary = warmer.warm()
+    click.echo(json.dumps(summary))
+
+
+def init_app(app):
+    generation_cache.init_app(app)
+    warmer.log_path = app.config['LOG_FILE']
+    warmer.token_budget = app.config['WARMER_TOKEN_BUDGET']
+    warmer.top_n = app.config['WARMER_TOP_N']
+    warmer.min_count = app.config['WARMER_MIN_COUNT']
+    warmer.lookback_hours = app.config['WARMER_LOOKBACK_HOURS']
+    warmer.off_peak_hours = parse_hours(app.config['WARMER_OFF_PEAK_HOURS'])
+    warmer.lock_path = app.config['WARMER_LOCK_FILE']
+    warmer.run_interval_hours = app.config['WARMER_RUN_INTERVAL_HOURS']
+    app.cli.add_command(warm_recipes_command)
+    if app.config['WARMER_ENABLED']:
+        warmer.start(app)
@@ -0,0 +1,59 @@
+# Compares per-request JSON cost of Flask's default provider and msgspec.
+#
+# Usage (from the project root):
+#     python -m benchmarks.json_provider [iterations]
+
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from backend.json_provider import MsgspecJSONProvider
+
+# Shaped like a generate_recipe() result
+RECIPE = {
+    "success": True,
+    "dietary_concerns": "vegetarian",
+    "recipe": {
+        "recipe_name": "Pasta Primavera",
+        "cooking_time": "30 minutes",
+        "ingredients": [
+            {"ingredient": f"Ingredient {i}", "quantity": str(i), "unit": "grams"}
+            for i in range(15)
+        ],
+        "instructions": [f"Step {i}: " + "stir and simmer gently " * 4 for i in range(12)],
+        "nutritional_info": {"calories": "400", "protein": "15g", "fat": "10g", "carbohydrates": "60g"},
+        "cooking_tips": "Use fresh basil for better flavor. " * 5,
+    },
+}
+
+
+def bench(provider_class, iterations):
+    app = Flask(__name__)
+    app.json = provider_class(app)
+    body = app.json.dumps(RECIPE).encode('utf-8')
+
+    with app.app_context():
+        encode = timeit.timeit(lambda: app.json.response(RECIPE), number=iterations)
+        decode = timeit.timeit(lambda: app.json.loads(body), number=iterations)
+    return encode / iterations * 1e6, decode / iterations * 1e6
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    results = {}
+    for name, provider_class in (('stdlib json', DefaultJSONProvider),
+                                 ('msgspec', MsgspecJSONProvider)):
+        results[name] = bench(provider_class, iterations)
+        encode, decode = results[name]
+        print(f"{name:12} response: {encode:7.2f} us   loads: {decode:7.2f} us")
+
+    base, fast = results['stdlib json'], results['msgspec']
+    print(f"speedup      response: {base[0] / fast[0]:6.1f}x    loads: {base[1] / fast[1]:6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# Reports cold-start cost: import time per module and create_app() time.
+#
+# Usage (from the project root):
+#     python -m benchmarks.startup_report [module] [top_n]
+#
+# Each measurement runs in a fresh interpreter so nothing is cached.
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+CREATE_APP_SNIPPET = (
+    "import time; t = time.perf_counter(); "
+    "from backend import create_app; i = time.perf_counter(); "
+    "create_app(); c = time.perf_counter(); "
+    "print(f'{(i - t) * 1000:.1f} {(c - i) * 1000:.1f}')"
+)
+
+
+def _env():
+    env = dict(os.environ)
+    env.setdefault('SECRET_KEY', 'startup-report')
+    return env
+
+
+def import_times(module):
+    """Return (cumulative_us, self_us, name) for every module imported."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, env=_env(), capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), name.rstrip()))
+    return rows
+
+
+def create_app_times():
+    """Return (import_ms, create_app_ms) for building the app once."""
+    result = subprocess.run(
+        [sys.executable, '-c', CREATE_APP_SNIPPET],
+        cwd=ROOT, env=_env(), capture_output=True, text=True, check=True
+    )
+    import_ms, create_ms = result.stdout.split()[-2:]
+    return float(import_ms), float(create_ms)
+
+
+def main():
+    module = sys.argv[1] if len(sys.argv) > 1 else 'backend.routes'
+    top_n = int(sys.argv[2]) if len(sys.argv) > 2 else 25
+
+    rows = import_times(module)
+    total_us = max(cumulative for cumulative, _, _ in rows)
+    print(f"import {module}: {total_us / 1000:.1f} ms across {len(rows)} modules\n")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for cumulative, self_us, name in sorted(rows, reverse=True)[:top_n]:
+        print(f"{cumulative / 1000:14.1f} {self_us / 1000:9.1f}  {name}")
+
+    heavy = [name.strip() for _, _, name in rows if name.strip() in ('openai', 'httpx')]
+    print(f"\nheavy SDKs imported: {', '.join(heavy) or 'none'}")
+
+    import_ms, create_ms = create_app_times()
+    print(f"import backend: {import_ms:.1f} ms, create_app(): {create_ms:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+# Production server settings, read by `gunicorn --config gunicorn.conf.py run:app`.
+#
+# Generation requests spend nearly all their time waiting on OpenAI, so each
+# worker process serves many requests concurrently instead of one at a time:
+#
+#   GUNICORN_WORKER_CLASS=gthread (default)  GUNICORN_THREADS threads per worker
+#   GUNICORN_WORKER_CLASS=gevent             GUNICORN_WORKER_CONNECTIONS greenlets
+#                                            per worker (needs `pip install gevent`,
+#                                            plus psycogreen on Postgres)
+#
+# Under gevent, password hashing runs on the event loop and stalls other
+# requests for the length of a hash, so prefer gthread for login-heavy load.
+
+import multiprocessing
+import os
+import sys
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+# Heroku sets WEB_CONCURRENCY from the dyno size
+workers = int(os.environ.get(
+    'WEB_CONCURRENCY', min(multiprocessing.cpu_count() + 1, 4)))
+threads = int(os.environ.get('GUNICORN_THREADS', 64))
+worker_connections = int(os.environ.get('GUNICORN_WORKER_CONNECTIONS', 500))
+
+if worker_class == 'gevent':
+    concurrency = worker_connections
+else:
+    concurrency = threads
+
+# OpenAI's concurrency limit covers the whole account, so the app gives
+# each worker OPENAI_TIER_CONCURRENCY / WEB_CONCURRENCY slots rather than
+# one per thread; the rest of a worker's threads wait in the queue
+os.environ['WEB_CONCURRENCY'] = str(workers)
+os.environ.setdefault('OPENAI_QUEUE_SIZE', str(concurrency))
+os.environ.setdefault('OPENAI_MAX_CONNECTIONS', str(min(concurrency, 100)))
+os.environ.setdefault('OPENAI_MAX_KEEPALIVE', str(min(concurrency, 100)))
+
+# Postgres plans cap connections for the whole app (20 on Heroku's smallest;
+# the default leaves a few for `heroku run` and migrations), so each worker's
+# pool is its share of DB_MAX_CONNECTIONS rather than one connection per
+# thread. Requests hand their connection back before waiting on OpenAI, so
+# threads only queue on the pool briefly, for up to DB_POOL_TIMEOUT seconds.
+db_max_connections = int(os.environ.get('DB_MAX_CONNECTIONS', 16))
+os.environ.setdefault('DB_POOL_SIZE', str(max(1, db_max_connections // workers)))
+os.environ.setdefault('DB_MAX_OVERFLOW', '0')
+os.environ.setdefault('DB_POOL_TIMEOUT', '10')
+
+# Heroku's router drops requests after 30s, so a worker stuck longer than
+# that is serving no one
+timeout = min(int(os.environ.get('GUNICORN_TIMEOUT', 30)), 30)
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers now and then to bound any slow memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+# Each worker imports the app itself, so no DB connection, OpenAI client or
+# background thread is ever created before the fork
+preload_app = os.environ.get(
+    'GUNICORN_PRELOAD', 'false').lower() in ('1', 'true', 'yes')
+
+accesslog = '-'
+errorlog = '-'
+
+# Workers would rotate a shared log file under each other; log to stdout,
+# which Heroku collects, unless LOG_FILE is set (use a '{pid}' placeholder
+# in it to give each worker its own file)
+os.environ.setdefault('LOG_FILE', '')
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        try:
+            from psycogreen.gevent import patch_psycopg
+            patch_psycopg()
+        except ImportError:
+            server.log.warning(
+                'psycogreen is not installed; Postgres queries will block the gevent loop')
+
+    # Only a preloaded app has state from the master that must be dropped
+    app_module = sys.modules.get('run')
+    if app_module is not None:
+        from backend import chatgptAPI, engine, log_config
+        log_config.restart_listener()
+        engine.dispose_after_fork(app_module.app)
+        chatgptAPI.reset_client()
@@ -0,0 +1,49 @@
+"""Delete a user's ingredients and recipes with ON DELETE CASCADE
+
+Revision ID: 3f2a9c1d7b4e
+Revises: 
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7b4e'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+CHILD_TABLES = ('ingredients', 'recipes')
+# Lets batch mode on SQLite address the existing, unnamed foreign keys
+NAMING_CONVENTION = {
+    'fk': 'fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s'}
+
+
+def _user_fk_name(table):
+    for fk in sa.inspect(op.get_bind()).get_foreign_keys(table):
+        if fk['referred_table'] == 'users':
+            return fk['name'] or f'fk_{table}_user_id_users'
+    return None
+
+
+def _replace_user_fk(table, ondelete):
+    old_name = _user_fk_name(table)
+    with op.batch_alter_table(
+            table, naming_convention=NAMING_CONVENTION) as batch_op:
+        if old_name:
+            batch_op.drop_constraint(old_name, type_='foreignkey')
+        batch_op.create_foreign_key(
+            f'{table}_user_id_fkey', 'users', ['user_id'], ['user_id'],
+            ondelete=ondelete)
+
+
+def upgrade():
+    for table in CHILD_TABLES:
+        _replace_user_fk(table, 'CASCADE')
+
+
+def downgrade():
+    for table in CHILD_TABLES:
+        _replace_user_fk(table, None)
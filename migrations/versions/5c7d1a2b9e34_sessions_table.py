@@ -0,0 +1,34 @@
+"""Create the sessions table used by the database session interface
+
+Revision ID: 5c7d1a2b9e34
+Revises: 8b1e4d2c6a90
+Create Date: 2026-10-20 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5c7d1a2b9e34'
+down_revision = '8b1e4d2c6a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'sessions',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('session_id', sa.String(length=255), nullable=False),
+        sa.Column('data', sa.LargeBinary(), nullable=True),
+        sa.Column('expiry', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('session_id')
+    )
+    op.create_index('ix_sessions_expiry', 'sessions', ['expiry'])
+
+
+def downgrade():
+    op.drop_index('ix_sessions_expiry', table_name='sessions')
+    op.drop_table('sessions')
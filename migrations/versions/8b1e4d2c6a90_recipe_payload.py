@@ -0,0 +1,28 @@
+"""Store the full generated recipe payload on saved recipes
+
+Revision ID: 8b1e4d2c6a90
+Revises: 3f2a9c1d7b4e
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b1e4d2c6a90'
+down_revision = '3f2a9c1d7b4e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Nullable, so existing rows need no backfill
+    with op.batch_alter_table('recipes') as batch_op:
+        batch_op.add_column(
+            sa.Column('recipe_payload', sa.LargeBinary(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('recipes') as batch_op:
+        batch_op.drop_column('recipe_payload')
@@ -0,0 +1,36 @@
+"""Create the revoked_tokens table used by signed-token auth
+
+Revision ID: 9d4e2f7a1c58
+Revises: 5c7d1a2b9e34
+Create Date: 2026-10-20 10:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4e2f7a1c58'
+down_revision = '5c7d1a2b9e34'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'revoked_tokens',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('token_id', sa.String(length=64), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('revoked_at', sa.Float(), nullable=False),
+        sa.Column('expires_at', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_revoked_tokens_token_id', 'revoked_tokens', ['token_id'])
+    op.create_index('ix_revoked_tokens_expires_at', 'revoked_tokens', ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_revoked_tokens_expires_at', table_name='revoked_tokens')
+    op.drop_index('ix_revoked_tokens_token_id', table_name='revoked_tokens')
+    op.drop_table('revoked_tokens')
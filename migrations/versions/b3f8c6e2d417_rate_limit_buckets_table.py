@@ -0,0 +1,34 @@
+"""Create the rate_limit_buckets table with an index for pruning
+
+Revision ID: b3f8c6e2d417
+Revises: 9d4e2f7a1c58
+Create Date: 2026-10-20 10:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3f8c6e2d417'
+down_revision = '9d4e2f7a1c58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'rate_limit_buckets',
+        sa.Column('bucket_key', sa.String(length=128), nullable=False),
+        sa.Column('tokens', sa.Float(), nullable=False),
+        sa.Column('updated_at', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('bucket_key')
+    )
+    op.create_index('ix_rate_limit_buckets_updated_at', 'rate_limit_buckets',
+                    ['updated_at'])
+
+
+def downgrade():
+    op.drop_index('ix_rate_limit_buckets_updated_at',
+                  table_name='rate_limit_buckets')
+    op.drop_table('rate_limit_buckets')
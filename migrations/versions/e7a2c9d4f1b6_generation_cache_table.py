@@ -0,0 +1,35 @@
+"""Create the generation_cache table
+
+Revision ID: e7a2c9d4f1b6
+Revises: b3f8c6e2d417
+Create Date: 2026-10-20 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a2c9d4f1b6'
+down_revision = 'b3f8c6e2d417'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'generation_cache',
+        sa.Column('cache_key', sa.String(length=512), nullable=False),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.Float(), nullable=False),
+        sa.Column('expires_at', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('cache_key')
+    )
+    op.create_index('ix_generation_cache_expires_at', 'generation_cache',
+                    ['expires_at'])
+
+
+def downgrade():
+    op.drop_index('ix_generation_cache_expires_at',
+                  table_name='generation_cache')
+    op.drop_table('generation_cache')
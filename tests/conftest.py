@@ -10,6 +10,8 @@ import pytest
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from backend import create_app, db
+from backend.identity import identities
+from backend.generation_cache import generation_cache
 from unittest.mock import patch
 
 
@@ -29,6 +31,8 @@ def test_app():
     app.config['TESTING'] = True
     app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'  # In-memory database for testing
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['RATE_LIMIT_ENABLED'] = False  # Enabled per test where needed
+    generation_cache.enabled = False  # Mocked generations must not be cached
 
     # Set up app context for the entire module
     with app.app_context():
@@ -51,3 +55,4 @@ def init_db(test_app):
 
         db.session.remove()
         db.drop_all()  # Drop all tables after each test
+        identities.clear()  # Cached users went with the tables
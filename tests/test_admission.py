@@ -0,0 +1,81 @@
+# Tests for admission control of outbound OpenAI calls
+
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from backend.chatgptAPI import generate_recipe
+from backend.admission import (AdmissionController, AdmissionRejected, admission,
+                               PRIORITY_USER, PRIORITY_ANONYMOUS)
+
+
+def test_full_queue_is_shed():
+    # With every slot busy and no queue room, callers are rejected at once
+    controller = AdmissionController(max_concurrent=1, max_queue=0, queue_timeout=5)
+    controller.acquire()
+
+    start = time.monotonic()
+    with pytest.raises(AdmissionRejected):
+        controller.acquire()
+    assert time.monotonic() - start < 1
+    assert controller.metrics()['rejected_queue_full'] == 1
+
+
+def test_queue_timeout_is_shed():
+    # Waiting callers give up after the queue timeout
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_timeout=0.05)
+    controller.acquire()
+
+    with pytest.raises(AdmissionRejected):
+        controller.acquire()
+    metrics = controller.metrics()
+    assert metrics['rejected_timeout'] == 1
+    assert metrics['queue_depth'] == 0
+
+
+def test_higher_priority_admitted_first():
+    # A released slot goes to the logged-in waiter before the anonymous one
+    controller = AdmissionController(max_concurrent=1, max_queue=2, queue_timeout=5)
+    controller.acquire()
+    order = []
+
+    def wait(priority, name):
+        with controller.slot(priority):
+            order.append(name)
+
+    anonymous = threading.Thread(target=wait, args=(PRIORITY_ANONYMOUS, 'anonymous'))
+    anonymous.start()
+    while controller.metrics()['queue_depth'] < 1:
+        time.sleep(0.001)
+    user = threading.Thread(target=wait, args=(PRIORITY_USER, 'user'))
+    user.start()
+    while controller.metrics()['queue_depth'] < 2:
+        time.sleep(0.001)
+
+    controller.release()
+    anonymous.join()
+    user.join()
+    assert order == ['user', 'anonymous']
+    assert controller.metrics()['active'] == 0
+
+
+def test_generation_shed_returns_503(test_client):
+    # A shed generation request answers quickly with 503 and Retry-After
+    with patch.object(admission, 'acquire', side_effect=AdmissionRejected('full')):
+        response = test_client.post('/api/generate-recipe', json={'ingredients': 'eggs, rice'})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_slot_released_between_attempts(test_app):
+    # A failing attempt gives its slot back before the retry sleep
+    active_during_sleep = []
+    with patch('backend.chatgptAPI.client.chat.completions.create',
+               side_effect=Exception('provider down')), \
+            patch('backend.chatgptAPI.time.sleep',
+                  side_effect=lambda _: active_during_sleep.append(admission.metrics()['active'])):
+        result = generate_recipe('eggs, rice', retries=2, delay=5)
+
+    assert result['success'] is False
+    assert active_during_sleep == [0, 0]
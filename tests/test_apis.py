@@ -48,7 +48,9 @@ def test_add_user_invalid_data(test_client):
         'user_password': 'FD@'
     })
 
-    assert response.status_code == 500
+    assert response.status_code == 400
+    assert response.get_json()['message'] == \
+        'User name must be at least 3 characters long'
 
 def test_get_valid_user(test_client, init_db):
     # Retrieves valid user
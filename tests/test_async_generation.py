@@ -0,0 +1,255 @@
+# Tests for the async recipe generation path
+
+import asyncio
+import json
+import threading
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from backend import chatgptAPI
+from backend.admission import (AdmissionRejected, AsyncAdmissionController,
+                               admission, async_admission, init_app as init_admission)
+from backend.asgi import RecipeASGI
+from backend.chatgptAPI import generate_recipe_async
+
+VALID_RECIPE = json.dumps({
+    "recipe_name": "Egg Fried Rice",
+    "cooking_time": "15 minutes",
+    "ingredients": [{"ingredient": "Rice", "quantity": "1", "unit": "cup"}],
+    "instructions": ["Fry rice", "Add eggs"],
+    "nutritional_info": {"calories": "300", "protein": "10g", "fat": "8g", "carbohydrates": "45g"},
+    "cooking_tips": "Use day-old rice."
+})
+
+
+def make_response(content=VALID_RECIPE):
+    response = Mock()
+    response.choices = [Mock(message=Mock(content=content))]
+    response.usage = Mock(prompt_tokens=20, completion_tokens=30, total_tokens=50)
+    return response
+
+
+def async_client(create):
+    client = Mock()
+    client.chat.completions.create = create
+    return client
+
+
+def test_async_generate_recipe_valid():
+    # A valid response is returned without blocking
+    create = AsyncMock(return_value=make_response())
+    with patch('backend.chatgptAPI.get_async_client', return_value=async_client(create)):
+        result = asyncio.run(generate_recipe_async('rice, egg'))
+
+    assert result['success'] is True
+    assert result['recipe']['recipe_name'] == 'Egg Fried Rice'
+    assert result['tokens'] == 50
+
+
+def test_async_attempt_is_cancelled_on_timeout():
+    # Slow attempts are cancelled and retried with asyncio.sleep backoff
+    cancelled = []
+
+    async def slow_create(**kwargs):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    with patch('backend.chatgptAPI.get_async_client', return_value=async_client(slow_create)):
+        result = asyncio.run(generate_recipe_async('rice', retries=2, delay=0, timeout=0.01))
+
+    assert result['success'] is False
+    assert len(cancelled) == 2
+
+
+def test_async_invalid_json_retries():
+    # Invalid content is retried until a valid recipe arrives
+    create = AsyncMock(side_effect=[make_response('not json'), make_response()])
+    with patch('backend.chatgptAPI.get_async_client', return_value=async_client(create)):
+        result = asyncio.run(generate_recipe_async('rice', delay=0))
+
+    assert result['success'] is True
+    assert create.await_count == 2
+
+
+def test_async_admission_sheds_excess():
+    # Waiters beyond the queue are shed and a stuck slot times waiters out
+    controller = AsyncAdmissionController(max_concurrent=1, max_queue=1, queue_timeout=0.05)
+
+    async def scenario():
+        async with controller.slot():
+            waiter = asyncio.ensure_future(controller.slot().__aenter__())
+            await asyncio.sleep(0)
+            with pytest.raises(AdmissionRejected):
+                async with controller.slot():
+                    pass
+            with pytest.raises(AdmissionRejected):
+                await waiter
+        async with controller.slot():
+            return controller.metrics()
+
+    metrics = asyncio.run(scenario())
+    assert metrics['rejected_queue_full'] == 1
+    assert metrics['rejected_timeout'] == 1
+    assert metrics['active'] == 1
+
+
+async def call_asgi(app, path, body=b'', method='POST', headers=()):
+    # Drive one HTTP request through an ASGI app and collect the response
+    messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+    sent = []
+
+    async def receive():
+        if not messages:
+            # Nothing more to read; wait as a server would for the client
+            await asyncio.Event().wait()
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'http_version': '1.1', 'method': method, 'path': path,
+             'query_string': b'', 'root_path': '',
+             'headers': [(b'content-type', b'application/json'),
+                         (b'content-length', str(len(body)).encode()), *headers],
+             'client': ('127.0.0.1', 5000), 'server': ('testserver', 80)}
+    await app(scope, receive, send)
+    headers = {name.decode(): value.decode() for name, value in sent[0]['headers']}
+    body = b''.join(message.get('body', b'') for message in sent[1:])
+    return sent[0]['status'], headers, body
+
+
+def test_async_route_runs_on_event_loop(test_app, init_db):
+    # The OpenAI wait happens on the loop thread, not a worker thread
+    result = {"success": True, "recipe": {"recipe_name": "Egg Fried Rice"},
+              "model": "m", "tokens": 50}
+    threads = []
+
+    async def fake_generate(**kwargs):
+        threads.append(threading.current_thread())
+        return result
+
+    app = RecipeASGI(test_app)
+    body = json.dumps({'fridge_ingredients': ['rice', 'egg']}).encode()
+    with patch('backend.asgi.generate_recipe_async', fake_generate):
+        status, headers, data = asyncio.run(
+            call_asgi(app, '/api/async/generate-recipe-from-fridge', body))
+
+    assert status == 200
+    assert json.loads(data) == {"success": True, "recipe": {"recipe_name": "Egg Fried Rice"}}
+    assert 'x-request-id' in headers
+    assert threads == [threading.main_thread()]
+
+
+def test_async_route_rejects_bad_body_and_sheds(test_app, init_db):
+    # Bad bodies get 400 before admission, and a full controller answers 503
+    app = RecipeASGI(test_app)
+    create = AsyncMock(return_value=make_response())
+    controller = AsyncAdmissionController(max_concurrent=0, max_queue=0)
+    with patch('backend.chatgptAPI.get_async_client', return_value=async_client(create)), \
+            patch('backend.chatgptAPI.async_admission', controller):
+        status, _, _ = asyncio.run(call_asgi(
+            app, '/api/async/generate-recipe', b'{"ingredients": ["eggs"]}'))
+        assert status == 400
+        status, headers, _ = asyncio.run(call_asgi(
+            app, '/api/async/generate-recipe', b'{"ingredients": "eggs"}'))
+
+    assert status == 503
+    assert headers['retry-after'] == '1'
+    create.assert_not_awaited()
+
+
+def test_async_slot_released_between_attempts():
+    # A failed attempt gives its slot back before the retry sleep
+    controller = AsyncAdmissionController(max_concurrent=1)
+    active_during_sleep = []
+    sleep = asyncio.sleep
+
+    async def record_sleep(seconds):
+        active_during_sleep.append(controller.metrics()['active'])
+        await sleep(0)
+
+    create = AsyncMock(side_effect=[Exception('provider down'), make_response()])
+    with patch('backend.chatgptAPI.get_async_client', return_value=async_client(create)), \
+            patch('backend.chatgptAPI.async_admission', controller), \
+            patch('backend.chatgptAPI.asyncio.sleep', record_sleep):
+        result = asyncio.run(generate_recipe_async('rice', delay=5))
+
+    assert result['success'] is True
+    assert active_during_sleep == [0]
+
+
+def test_asgi_splits_openai_cap(test_app):
+    # Sync fallback routes and async routes share one worker's OpenAI cap
+    cap = test_app.config['OPENAI_MAX_CONCURRENCY']
+    test_app.config['OPENAI_MAX_CONCURRENCY'] = 9
+    try:
+        RecipeASGI(test_app)
+        assert admission.max_concurrent + async_admission.max_concurrent == 9
+        assert async_admission.max_concurrent == 4
+    finally:
+        test_app.config['OPENAI_MAX_CONCURRENCY'] = cap
+        init_admission(test_app)
+
+
+def test_fallback_serves_flask_routes(test_app, init_db):
+    # Other routes run through asgiref's WsgiToAsgi, and their session
+    # cookie is honoured by the async routes, which load it only once
+    app = RecipeASGI(test_app)
+    user = {'user_name': 'FooBar', 'user_email': 'FooBar@oregonstate.edu',
+            'user_password': 'LegITpW123@!'}
+    status, _, _ = asyncio.run(call_asgi(app, '/users', json.dumps(user).encode()))
+    assert status == 201
+    status, headers, _ = asyncio.run(call_asgi(app, '/login', json.dumps(
+        {'user_email': user['user_email'], 'user_password': user['user_password']}).encode()))
+    assert status == 200
+    cookie = [(b'cookie', headers['set-cookie'].split(';', 1)[0].encode())]
+
+    status, _, data = asyncio.run(call_asgi(app, '/users', method='GET', headers=cookie))
+    assert status == 200
+    assert json.loads(data)['user_email'] == user['user_email']
+
+    tiers = []
+
+    async def fake_generate(**kwargs):
+        tiers.append(kwargs['tier'])
+        return {"success": True, "recipe": {"recipe_name": "Toast"}}
+
+    interface = test_app.session_interface
+    with patch('backend.asgi.generate_recipe_async', fake_generate), \
+            patch.object(interface, 'open_session', wraps=interface.open_session) as open_session:
+        status, _, _ = asyncio.run(call_asgi(
+            app, '/api/async/generate-recipe', b'{"ingredients": "bread"}', headers=cookie))
+
+    assert status == 200
+    assert tiers == ['user']
+    assert open_session.call_count == 1
+
+
+def test_lifespan_owns_one_client(test_app):
+    # One AsyncOpenAI client is built at start-up and closed at shutdown
+    app = RecipeASGI(test_app)
+    chatgptAPI.reset_client()
+
+    async def scenario():
+        events = asyncio.Queue()
+        sent = []
+
+        async def send(message):
+            sent.append(message['type'])
+
+        server = asyncio.ensure_future(app({'type': 'lifespan'}, events.get, send))
+        await events.put({'type': 'lifespan.startup'})
+        while not sent:
+            await asyncio.sleep(0)
+        client = chatgptAPI._async_client
+        assert chatgptAPI.get_async_client() is client
+        with patch.object(client, 'close', AsyncMock()) as close:
+            await events.put({'type': 'lifespan.shutdown'})
+            await server
+        close.assert_awaited_once()
+        return sent
+
+    assert asyncio.run(scenario()) == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+    assert chatgptAPI._async_client is None
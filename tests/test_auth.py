@@ -0,0 +1,73 @@
+# Tests for the stateless signed-token authentication mode
+
+import pytest
+from unittest.mock import patch
+from backend.auth import tokens
+from backend.models import User
+
+
+@pytest.fixture
+def token_mode():
+    with patch.object(tokens, 'enabled', True), \
+            patch.object(tokens, '_synced_at', None), \
+            patch.object(tokens, '_revoked_tokens', {}), \
+            patch.object(tokens, '_revoked_users', {}):
+        yield tokens
+
+
+def create_user(init_db):
+    user = User(user_name='FooBar', user_email='FooBar@oregonstate.edu', user_password='LegITpW123@!')
+    init_db.session.add(user)
+    init_db.session.commit()
+    return user.user_id
+
+
+def login(test_client):
+    return test_client.post('/login', json={
+        'user_email': 'FooBar@oregonstate.edu',
+        'user_password': 'LegITpW123@!'
+    })
+
+
+def test_token_round_trip(test_app, token_mode):
+    # A freshly issued token should carry the user id
+    token = token_mode.issue(42)
+    assert token_mode.verify(token) == 42
+    assert token_mode.verify(token + 'x') is None
+
+
+def test_login_returns_token(test_client, init_db, token_mode):
+    # Login should hand out a token usable as a bearer header
+    create_user(init_db)
+    token = login(test_client).get_json()['token']
+    test_client.delete_cookie('auth_token')
+
+    response = test_client.get('/users', headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 200
+    assert response.get_json()['user_name'] == 'FooBar'
+
+
+def test_logout_revokes_token(test_client, init_db, token_mode):
+    # A token used to log out should no longer authenticate
+    create_user(init_db)
+    token = login(test_client).get_json()['token']
+    headers = {'Authorization': f'Bearer {token}'}
+
+    assert test_client.post('/logout', headers=headers).status_code == 200
+    assert test_client.get('/users', headers=headers).status_code == 401
+
+
+def test_delete_user_revokes_all_tokens(test_client, init_db, token_mode):
+    # Deleting an account should revoke every token issued to it
+    create_user(init_db)
+    first = login(test_client).get_json()['token']
+    second = login(test_client).get_json()['token']
+
+    response = test_client.delete('/users', headers={'Authorization': f'Bearer {first}'})
+    assert response.status_code == 200
+    assert token_mode.verify(second) is None
+
+    # Another worker picks the revocation up from the database
+    token_mode._revoked_users.clear()
+    token_mode._synced_at = None
+    assert token_mode.verify(second) is None
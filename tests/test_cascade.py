@@ -0,0 +1,41 @@
+# Tests for deleting users through ON DELETE CASCADE
+
+from sqlalchemy import event, text
+from backend import db
+from backend.models import User, Ingredient, Recipe
+
+
+def test_foreign_keys_enforced(test_app, init_db):
+    # SQLite only honours ON DELETE CASCADE with foreign keys switched on
+    with db.engine.connect() as connection:
+        assert connection.execute(text('PRAGMA foreign_keys')).scalar() == 1
+
+
+def test_delete_user_cascades_without_loading_children(test_client, init_db):
+    # The database removes children; the ORM never selects them
+    user = User(user_name='FooBar', user_email='FooBar@oregonstate.edu', user_password='LegITpW123@!')
+    init_db.session.add(user)
+    init_db.session.commit()
+    for name in ('egg', 'rice', 'leek'):
+        init_db.session.add(Ingredient(ingredient_name=name, user_id=user.user_id))
+    init_db.session.add(Recipe(recipe_name='Fried Rice', recipe_cooktime=15,
+                               recipe_instructions='Fry the rice with eggs', user_id=user.user_id))
+    init_db.session.commit()
+    test_client.post('/login', json={'user_email': 'FooBar@oregonstate.edu',
+                                     'user_password': 'LegITpW123@!'})
+
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = test_client.delete('/users')
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert response.status_code == 200
+    assert not any('FROM ingredients' in s or 'FROM recipes' in s for s in statements)
+    assert db.session.query(Ingredient).count() == 0
+    assert db.session.query(Recipe).count() == 0
@@ -0,0 +1,51 @@
+# Tests for JSON response compression and precompressed static files
+
+import gzip
+from flask import jsonify
+
+
+def test_large_json_is_gzipped(test_app):
+    # JSON above the size threshold is compressed for clients that accept it
+    payload = {'instructions': ['Stir the pot slowly'] * 200}
+    with test_app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+        response = test_app.process_response(jsonify(payload))
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert test_app.json.loads(gzip.decompress(response.get_data())) == payload
+
+
+def test_small_json_left_alone(test_app):
+    # Small bodies and clients without gzip support get plain JSON
+    with test_app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+        small = test_app.process_response(jsonify({'ok': True}))
+    with test_app.test_request_context():
+        large = test_app.process_response(jsonify({'steps': ['Stir'] * 500}))
+
+    assert 'Content-Encoding' not in small.headers
+    assert 'Content-Encoding' not in large.headers
+
+
+def test_static_bundle_served_precompressed(test_client):
+    # The bundle's .gz sibling is sent as-is with the original content type
+    response = test_client.get('/build/bundle.js', headers={'Accept-Encoding': 'gzip, deflate'})
+
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.mimetype in ('text/javascript', 'application/javascript')
+    assert gzip.decompress(response.get_data()).startswith(b'var app=function')
+    response.close()
+
+
+def test_precompress_tool_writes_gzip_siblings(tmp_path):
+    # The standalone tool writes a .gz next to each asset that decompresses to it
+    from tools.precompress import precompress_directory
+    (tmp_path / 'bundle.js').write_bytes(b'var app=function(){};' * 50)
+    (tmp_path / 'logo.png').write_bytes(b'not compressed')
+
+    written = precompress_directory(str(tmp_path))
+
+    assert str(tmp_path / 'bundle.js.gz') in written
+    assert not (tmp_path / 'logo.png.gz').exists()
+    assert gzip.decompress((tmp_path / 'bundle.js.gz').read_bytes()) == \
+        (tmp_path / 'bundle.js').read_bytes()
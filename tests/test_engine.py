@@ -0,0 +1,27 @@
+# Tests for the SQLite and Postgres engine tuning profiles
+
+from sqlalchemy import text
+from backend import db
+from backend.engine import engine_options
+
+
+def test_sqlite_pragmas_applied(test_app):
+    # New SQLite connections should pick up the configured pragmas
+    with db.engine.connect() as connection:
+        journal_mode = connection.execute(text('PRAGMA journal_mode')).scalar()
+        busy_timeout = connection.execute(text('PRAGMA busy_timeout')).scalar()
+
+    assert journal_mode.lower() == 'wal'
+    assert busy_timeout == test_app.config['SQLITE_PRAGMAS']['busy_timeout']
+
+
+def test_postgres_options_from_env(monkeypatch):
+    # Pool sizing and statement timeout should come from the environment
+    monkeypatch.setenv('DB_POOL_SIZE', '12')
+    monkeypatch.setenv('DB_STATEMENT_TIMEOUT_MS', '1500')
+    options = engine_options('postgresql://user@localhost/app')
+
+    assert options['pool_size'] == 12
+    assert options['pool_pre_ping'] is True
+    assert options['connect_args'] == {'options': '-c statement_timeout=1500'}
+    assert engine_options('sqlite:///app.db') == {}
@@ -141,9 +141,9 @@ def test_fridge_ingredient_list_number(test_client):
         })
 
         mock_generate_recipe.assert_not_called()
-        assert response.status_code == 500
+        assert response.status_code == 400
         data = response.get_json()
-        assert data['error'] == "Internal server error"
+        assert data['error'] == "Please provide ingredients as a list"
 
 
 def test_fridge_ingredient_string(test_client):
@@ -233,3 +233,17 @@ def test_user_flow(test_client, init_db):
     assert recipe['recipe']['recipe_name'] == 'Broccoli Soup'
     assert recipe['recipe']['ingredients'][0]['ingredient'] == "Broccoli"
 
+
+
+def test_openai_sdk_imported_lazily():
+    # Importing the routes should not load the OpenAI SDK or build a client
+    import subprocess
+    import sys
+    code = "import sys, backend.routes; print('openai' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=os.path.join(os.path.dirname(__file__), '..'),
+        env={**os.environ, 'SECRET_KEY': 'test', 'OPENAI_API_KEY': ''},
+        capture_output=True, text=True
+    )
+    assert result.stdout.strip() == 'False'
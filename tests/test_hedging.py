@@ -0,0 +1,135 @@
+# Tests for hedged OpenAI requests
+
+import threading
+import time
+from backend.admission import AdmissionController
+from backend.hedging import Hedger
+
+
+def test_disabled_hedger_calls_directly():
+    # With hedging off the call runs once on the calling thread
+    hedger = Hedger(enabled=False)
+    caller = []
+
+    result = hedger.run(lambda: caller.append(threading.current_thread()) or 'ok')
+
+    assert result == 'ok'
+    assert caller == [threading.current_thread()]
+    assert hedger.metrics()['hedges_fired'] == 0
+
+
+def test_fast_call_is_not_hedged():
+    # A call that finishes before the delay never fires a hedge
+    hedger = Hedger(enabled=True, hedge_after=1.0, max_rate=1.0)
+
+    assert hedger.run(lambda: 'fast') == 'fast'
+    assert hedger.metrics()['calls'] == 1
+    assert hedger.metrics()['hedges_fired'] == 0
+
+
+def test_slow_call_is_won_by_hedge():
+    # The hedge answers first while the primary is still stuck
+    hedger = Hedger(enabled=True, hedge_after=0.05, max_rate=1.0)
+    release = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(2)
+            return 'slow'
+        return 'hedge'
+
+    try:
+        assert hedger.run(call) == 'hedge'
+    finally:
+        release.set()
+    metrics = hedger.metrics()
+    assert metrics['hedges_fired'] == 1
+    assert metrics['hedges_won'] == 1
+
+
+def test_invalid_first_result_waits_for_other():
+    # An invalid answer does not win even if it arrives first
+    hedger = Hedger(enabled=True, hedge_after=0.05, max_rate=1.0)
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.2)
+            return 'good'
+        return 'bad'
+
+    assert hedger.run(call, is_valid=lambda r: r == 'good') == 'good'
+    assert hedger.metrics()['hedges_won'] == 0
+
+
+def test_hedge_rate_is_capped():
+    # Once the recent hedge share reaches max_rate no more hedges fire
+    hedger = Hedger(enabled=True, hedge_after=0.01, max_rate=0.5)
+
+    def slow():
+        time.sleep(0.05)
+        return 'ok'
+
+    for _ in range(4):
+        hedger.run(slow)
+
+    assert hedger.metrics()['calls'] == 4
+    assert hedger.metrics()['hedges_fired'] == 2
+
+
+def test_p90_delay_after_warmup():
+    # The rolling p90 replaces the fallback delay once enough samples exist
+    hedger = Hedger(enabled=True, fallback_delay=5.0, min_samples=3, max_rate=0.0)
+    assert hedger.delay() == 5.0
+
+    for _ in range(3):
+        hedger.run(lambda: 'ok')
+
+    assert hedger.delay() < 1.0
+
+
+def test_hedge_skipped_without_free_slot():
+    # With every admission slot taken the slow call is not hedged
+    admission = AdmissionController(max_concurrent=1)
+    admission.acquire()
+    hedger = Hedger(enabled=True, hedge_after=0.01, max_rate=1.0, admission=admission)
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.05)
+        return 'ok'
+
+    assert hedger.run(slow) == 'ok'
+    assert calls == [1]
+    assert hedger.metrics()['hedges_skipped_no_slot'] == 1
+    assert admission.metrics()['active'] == 1
+
+
+def test_hedge_slot_held_until_both_calls_finish():
+    # The hedge's slot stays taken while the abandoned primary is still running
+    admission = AdmissionController(max_concurrent=2)
+    admission.acquire()
+    hedger = Hedger(enabled=True, hedge_after=0.05, max_rate=1.0, admission=admission)
+    release = threading.Event()
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(2)
+            return 'slow'
+        return 'hedge'
+
+    try:
+        assert hedger.run(call) == 'hedge'
+        assert admission.metrics()['active'] == 2
+    finally:
+        release.set()
+    deadline = time.monotonic() + 2
+    while admission.metrics()['active'] != 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert admission.metrics()['active'] == 1
@@ -0,0 +1,49 @@
+# Tests for the request-scoped and TTL user identity cache
+
+from unittest.mock import patch
+from backend import db
+from backend.models import User
+
+
+def create_user(init_db, test_client):
+    user = User(user_name='FooBar', user_email='FooBar@oregonstate.edu', user_password='LegITpW123@!')
+    init_db.session.add(user)
+    init_db.session.commit()
+
+    with test_client.session_transaction() as session:
+        session['user_id'] = user.user_id
+
+
+def test_repeat_lookup_uses_cache(test_client, init_db):
+    # The second request should be answered without loading the user
+    create_user(init_db, test_client)
+    assert test_client.get('/users').status_code == 200
+
+    with patch.object(db.session, 'get', wraps=db.session.get) as mock_get:
+        response = test_client.get('/users')
+
+    assert response.status_code == 200
+    assert response.get_json()['user_name'] == 'FooBar'
+    mock_get.assert_not_called()
+
+
+def test_update_invalidates_cache(test_client, init_db):
+    # A renamed user should not be served from a stale cache entry
+    create_user(init_db, test_client)
+    test_client.get('/users')
+
+    response = test_client.put('/users', json={
+        'current_user_password': 'LegITpW123@!',
+        'user_name': 'BazQux'
+    })
+    assert response.status_code == 200
+    assert test_client.get('/users').get_json()['user_name'] == 'BazQux'
+
+
+def test_delete_invalidates_cache(test_client, init_db):
+    # A deleted user should not be found through the cache
+    create_user(init_db, test_client)
+    test_client.get('/users')
+
+    assert test_client.delete('/users').status_code == 200
+    assert test_client.get('/users').status_code == 404
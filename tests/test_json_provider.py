@@ -0,0 +1,22 @@
+# Tests for the msgspec JSON provider
+
+import pytest
+from markupsafe import Markup
+
+
+def test_response_round_trip(test_app):
+    # Responses should decode back to the same data
+    response = test_app.json.response({'recipe': {'name': 'Soup', 'steps': ['a', 'b']}, 'ok': True})
+    assert response.mimetype == 'application/json'
+    assert test_app.json.loads(response.get_data()) == {'recipe': {'name': 'Soup', 'steps': ['a', 'b']}, 'ok': True}
+
+
+def test_unknown_types_use_flask_default(test_app):
+    # Types msgspec does not handle natively fall back to Flask's hook
+    assert test_app.json.dumps({'html': Markup('<b>Soup</b>')}) == '{"html":"<b>Soup</b>"}'
+
+
+def test_invalid_json_raises_value_error(test_app):
+    # Werkzeug relies on ValueError to answer malformed bodies with 400
+    with pytest.raises(ValueError):
+        test_app.json.loads(b'{"broken"')
@@ -0,0 +1,103 @@
+# Tests for the offline log analyzer
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+from backend import log_parsing, warmer
+from tools import log_analyzer
+from tools.log_analyzer import LogAnalyzer, Reservoir, route_name
+
+ROOT = Path(__file__).resolve().parent.parent
+
+TEXT_LOG = [
+    '2024-11-05 14:43:12,896 - WARNING -  * Debugger is active!',
+    '2024-11-05 14:43:29,000 - INFO - Generating recipe for ingredients: rice, egg, Attempt: 1, Model: m, Diet: None',
+    '2024-11-05 14:43:31,000 - INFO - HTTP Request: POST https://api.openai.com/v1/chat/completions "HTTP/1.1 200 OK"',
+    '2024-11-05 14:43:31,001 - INFO - Token usage - Prompt: 20, Completion: 30, Total: 50',
+    '2024-11-05 14:43:33,000 - INFO - Generating recipe for ingredients: rice, egg, Attempt: 2, Model: m, Diet: None',
+    '2024-11-05 14:43:34,000 - INFO - HTTP Request: POST https://api.openai.com/v1/chat/completions "HTTP/1.1 200 OK"',
+    '2024-11-05 14:43:34,001 - INFO - Token usage - Prompt: 20, Completion: 40, Total: 60',
+    '2024-11-05 14:43:34,100 - INFO - 127.0.0.1 - - [05/Nov/2024 14:43:34] "POST /api/generate-recipe HTTP/1.1" 200 -',
+]
+
+
+def json_line(ts, msg, **fields):
+    return json.dumps({'ts': ts, 'level': 'INFO', 'msg': msg, **fields})
+
+
+def test_text_log_timeline():
+    # Text logs are read as one sequential timeline per access line
+    analyzer = LogAnalyzer()
+    for line in TEXT_LOG:
+        analyzer.feed(line)
+    report = analyzer.report()
+
+    route = report['routes']['POST /api/generate-recipe']
+    assert route['status'] == {'200': 1}
+    assert route['latency_ms']['max'] == 5100.0
+    assert report['openai_latency_ms']['count'] == 2
+    assert report['openai_latency_ms']['max'] == 2000.0
+    assert report['generations'] == 1
+    assert report['retry_rate'] == 1.0
+    assert report['tokens_per_call']['mean'] == 55.0
+    assert report['top_ingredient_sets'] == [
+        {'ingredients': ['egg', 'rice'], 'diet': None, 'count': 1}]
+
+
+def test_json_log_groups_by_request_id():
+    # Interleaved JSON requests are kept apart by their request ids
+    lines = [
+        json_line('2024-11-05 10:00:00,000', 'Generating recipe for ingredients: tofu, Attempt: 1, Model: m, Diet: vegan', request_id='a'),
+        json_line('2024-11-05 10:00:00,100', 'Generating recipe for ingredients: rice, Attempt: 1, Model: m, Diet: None', request_id='b'),
+        json_line('2024-11-05 10:00:01,000', 'HTTP Request: POST https://api.openai.com/v1/chat/completions "HTTP/1.1 200 OK"', request_id='b'),
+        json_line('2024-11-05 10:00:01,050', 'POST /api/generate-recipe 200 950.0ms', request_id='b', duration_ms=950.0),
+        json_line('2024-11-05 10:00:03,000', 'HTTP Request: POST https://api.openai.com/v1/chat/completions "HTTP/1.1 200 OK"', request_id='a'),
+        json_line('2024-11-05 10:00:03,010', 'POST /api/generate-recipe 200 3010.0ms', request_id='a', duration_ms=3010.0),
+        json_line('2024-11-05 10:00:03,020', '127.0.0.1 - - [05/Nov/2024 10:00:03] "POST /api/generate-recipe HTTP/1.1" 200 -'),
+        json_line('2024-11-05 10:00:04,000', 'GET /api/users/7 404 1.5ms', request_id='c', duration_ms=1.5),
+    ]
+    analyzer = LogAnalyzer()
+    for line in lines:
+        analyzer.feed(line)
+    report = analyzer.report()
+
+    assert report['routes']['POST /api/generate-recipe']['latency_ms']['count'] == 2
+    assert report['routes']['GET /api/users/<id>']['status'] == {'404': 1}
+    assert sorted(report['openai_latency_ms'][key] for key in ('p50', 'max')) == [900.0, 3000.0]
+    assert report['generations'] == 2
+    assert report['retry_rate'] == 0.0
+
+
+def test_reservoir_stays_bounded():
+    # The sample never grows past its size but counts every value
+    reservoir = Reservoir(size=100)
+    for value in range(10000):
+        reservoir.add(value)
+
+    assert len(reservoir.samples) == 100
+    assert reservoir.summary()['count'] == 10000
+
+
+def test_route_name_groups_ids():
+    # Numeric path segments collapse into a placeholder
+    assert route_name('/api/users/12/ingredients?x=1') == '/api/users/<id>/ingredients'
+
+
+def test_uses_backend_helpers():
+    # The analyzer parses logs with the same helpers the backend writes them for
+    assert log_analyzer.parse_log_line is log_parsing.parse_log_line
+    assert log_analyzer.normalize_combo is log_parsing.normalize_combo
+    assert log_analyzer.GENERATION_LINE is warmer.GENERATION_LINE
+
+
+def test_runs_without_app_config(tmp_path):
+    # The command runs without SECRET_KEY or any app config
+    log = tmp_path / 'recipe_api.log'
+    log.write_text('\n'.join(TEXT_LOG) + '\n')
+    result = subprocess.run(
+        [sys.executable, '-m', 'tools.log_analyzer', str(log), '--json'],
+        cwd=ROOT, env={'PATH': '/usr/bin:/bin'}, capture_output=True, text=True)
+
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout)['generations'] == 1
@@ -0,0 +1,79 @@
+# Tests for queue-based structured logging
+
+import json
+import logging
+import os
+import queue
+import sys
+from flask import g
+from backend.log_config import (JSONFormatter, RequestContextFilter,
+                                DroppingQueueHandler, WorkerFileHandler)
+
+
+def make_record(level=logging.INFO, msg='Generating recipe'):
+    return logging.LogRecord('root', level, __file__, 1, msg, None, None)
+
+
+def test_json_record_carries_request_details(test_app):
+    # Records logged during a request are tagged with its id and path
+    record = make_record()
+    with test_app.test_request_context('/ingredients', method='POST'):
+        g.request_id = 'abc123'
+        assert RequestContextFilter().filter(record)
+
+    entry = json.loads(JSONFormatter().format(record))
+    assert entry['msg'] == 'Generating recipe'
+    assert entry['request_id'] == 'abc123'
+    assert entry['method'] == 'POST'
+    assert entry['path'] == '/ingredients'
+
+
+def test_info_sampling_keeps_warnings(test_app):
+    # Unsampled requests drop INFO lines but keep warnings and errors
+    log_filter = RequestContextFilter(info_sample_rate=0.0)
+    with test_app.test_request_context('/'):
+        g.pop('log_sampled', None)
+        assert not log_filter.filter(make_record())
+        assert log_filter.filter(make_record(logging.WARNING))
+
+
+def test_full_queue_drops_instead_of_blocking():
+    # A full queue must never block the request thread
+    handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+    handler.emit(make_record())
+    handler.emit(make_record())
+
+    assert handler.dropped == 1
+
+
+def test_response_has_request_id(test_client):
+    # Each response echoes the request id used in its log lines
+    response = test_client.get('/api/metrics', headers={'X-Request-ID': 'req-42'})
+    assert response.headers['X-Request-ID'] == 'req-42'
+
+
+def test_queued_record_keeps_exception_for_json():
+    # The queue handler must not fold the traceback into the message
+    handler = DroppingQueueHandler(queue.Queue())
+    try:
+        raise ValueError('boom')
+    except ValueError:
+        record = logging.LogRecord('root', logging.ERROR, __file__, 1,
+                                   'Failed %s', ('job',), sys.exc_info())
+    handler.emit(record)
+
+    entry = json.loads(JSONFormatter().format(handler.queue.get_nowait()))
+    assert entry['msg'] == 'Failed job'
+    assert 'ValueError: boom' in entry['exc']
+
+
+def test_worker_file_handler_uses_pid(tmp_path, monkeypatch):
+    # Each process writes its own file when the path has a {pid} placeholder
+    handler = WorkerFileHandler(str(tmp_path / 'api.{pid}.log'), delay=True)
+    assert handler.baseFilename.endswith(f'api.{os.getpid()}.log')
+
+    monkeypatch.setattr(os, 'getpid', lambda: 4242)
+    handler.reopen()
+    handler.emit(make_record())
+    handler.close()
+    assert (tmp_path / 'api.4242.log').exists()
@@ -0,0 +1,92 @@
+# Tests for model routing and fallback in recipe generation
+
+import json
+from unittest.mock import patch, Mock
+from backend.model_routing import ModelRouter, percentile
+from backend.chatgptAPI import generate_recipe
+
+VALID_RECIPE = json.dumps({
+    "recipe_name": "Egg Fried Rice",
+    "cooking_time": "15 minutes",
+    "ingredients": [{"ingredient": "Rice", "quantity": "1", "unit": "cup"}],
+    "instructions": ["Fry rice", "Add eggs"],
+    "nutritional_info": {"calories": "300", "protein": "10g", "fat": "8g", "carbohydrates": "45g"},
+    "cooking_tips": "Use day-old rice."
+})
+
+
+def test_rules_pick_model():
+    # The first matching rule decides the preferred model
+    router = ModelRouter(
+        chain=['fast-model', 'big-model'],
+        rules=[{'when': {'min_ingredients': 6}, 'model': 'big-model'},
+               {'when': {'diets': ['Keto']}, 'model': 'big-model'}]
+    )
+
+    assert router.choose(3) == ['fast-model', 'big-model']
+    assert router.choose(8) == ['big-model', 'fast-model']
+    assert router.choose(2, diet='keto') == ['big-model', 'fast-model']
+
+
+def test_slow_or_failing_model_demoted():
+    # A primary over the p95 or error limit is tried last
+    router = ModelRouter(chain=['primary', 'backup'], p95_limit=5, error_limit=0.5,
+                         min_samples=3, probe_rate=0)
+    for _ in range(3):
+        router.record('primary', 12.0, True)
+    assert router.choose(3) == ['backup', 'primary']
+
+    router = ModelRouter(chain=['primary', 'backup'], min_samples=3, probe_rate=0)
+    for _ in range(3):
+        router.record('primary', 1.0, False)
+    assert router.choose(3) == ['backup', 'primary']
+    assert router.metrics()['primary']['error_rate'] == 1.0
+
+
+def test_percentile_nearest_rank():
+    # Nearest rank rounds up, so the p95 of 10 samples is the largest
+    samples = list(range(1, 11))
+    assert percentile(samples, 95) == 10
+    assert percentile(samples, 50) == 5
+    assert percentile(samples, 1) == 1
+    assert percentile([], 95) is None
+
+
+def test_old_samples_expire():
+    # A model demoted on a past bad spell is healthy again once its samples age out
+    router = ModelRouter(chain=['primary', 'backup'], min_samples=3, max_age=60, probe_rate=0)
+    with patch('backend.model_routing.time.monotonic', return_value=1000.0):
+        for _ in range(3):
+            router.record('primary', 1.0, False)
+        assert router.choose(3) == ['backup', 'primary']
+    with patch('backend.model_routing.time.monotonic', return_value=1061.0):
+        assert router.choose(3) == ['primary', 'backup']
+
+
+def test_demoted_model_probed():
+    # A share of requests still goes to a demoted model first so it can recover
+    router = ModelRouter(chain=['primary', 'backup'], min_samples=3, probe_rate=0.1)
+    for _ in range(3):
+        router.record('primary', 1.0, False)
+    with patch('backend.model_routing.random.random', return_value=0.05):
+        assert router.choose(3) == ['primary', 'backup']
+    with patch('backend.model_routing.random.random', return_value=0.5):
+        assert router.choose(3) == ['backup', 'primary']
+
+
+def test_generate_recipe_fails_over(test_app):
+    # A failed attempt on the primary retries on the next model in the chain
+    response = Mock()
+    response.choices = [Mock(message=Mock(content=VALID_RECIPE))]
+    response.usage = Mock(prompt_tokens=20, completion_tokens=30, total_tokens=50)
+    router = ModelRouter(chain=['primary', 'backup'])
+
+    with patch('backend.chatgptAPI.router', router), \
+            patch('backend.chatgptAPI.client.chat.completions.create',
+                  side_effect=[Exception('timeout'), response]) as mock_create:
+        result = generate_recipe(['rice', 'eggs'], delay=0)
+
+    assert result['success'] is True
+    assert result['model'] == 'backup'
+    assert [call.kwargs['model'] for call in mock_create.call_args_list] == ['primary', 'backup']
+    assert router.metrics()['primary']['error_rate'] == 1.0
@@ -0,0 +1,52 @@
+# Tests for the pooled OpenAI HTTP transport
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from backend.openai_http import build_http_client, transport_settings, stats
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_port}/'
+    server.shutdown()
+
+
+def test_settings_from_env(monkeypatch):
+    # Pool limits and per-phase timeouts should come from the environment
+    monkeypatch.setenv('OPENAI_MAX_CONNECTIONS', '64')
+    monkeypatch.setenv('OPENAI_READ_TIMEOUT', '12.5')
+    client = build_http_client(transport_settings())
+
+    assert client.timeout.read == 12.5
+    assert client.timeout.connect == 5
+    assert transport_settings()['sdk_max_retries'] == 0
+    client.close()
+
+
+def test_connections_are_reused(local_server):
+    # Sequential calls should share one warm keep-alive connection
+    before = stats.snapshot()
+    with build_http_client() as client:
+        for _ in range(3):
+            assert client.get(local_server).status_code == 200
+    after = stats.snapshot()
+
+    assert after['requests'] - before['requests'] == 3
+    assert after['new_connections'] - before['new_connections'] == 1
@@ -0,0 +1,120 @@
+# Tests for the bounded password hashing pool
+
+import pytest
+from unittest.mock import patch
+from backend.passwords import PasswordHasher, HashingBusyError
+from backend.models import User
+from werkzeug.security import generate_password_hash
+
+
+def test_hash_and_verify():
+    # Hashes made on the pool should verify against the original password
+    hasher = PasswordHasher(max_workers=1, max_queue=1)
+    password_hash = hasher.hash('P@ssValiD1')
+
+    assert password_hash.startswith('pbkdf2:sha256')
+    assert hasher.verify(password_hash, 'P@ssValiD1')
+    assert not hasher.verify(password_hash, 'WrongP@ss1')
+    assert hasher.metrics()['completed'] == 3
+
+
+def test_needs_rehash():
+    # Hashes made with other parameters should be flagged for rehashing
+    hasher = PasswordHasher(max_workers=1, max_queue=1)
+    old_hash = generate_password_hash('P@ssValiD1', method='pbkdf2:sha256:1000')
+
+    assert hasher.needs_rehash(old_hash)
+    assert not hasher.needs_rehash(hasher.hash('P@ssValiD1'))
+
+
+def test_full_queue_is_rejected():
+    # Callers are shed once every worker and queue slot is taken
+    hasher = PasswordHasher(max_workers=1, max_queue=0, queue_timeout=0.01)
+    hasher._in_flight = 1
+
+    with pytest.raises(HashingBusyError):
+        hasher.hash('P@ssValiD1')
+    assert hasher.metrics()['rejected'] == 1
+
+
+def test_configure_keeps_counters():
+    # Resizing in place keeps the counters and admits callers against the new limit
+    hasher = PasswordHasher(max_workers=1, max_queue=0, queue_timeout=0.01)
+    hasher.hash('P@ssValiD1')
+    hasher._in_flight = 1
+    hasher.configure(max_workers=2)
+
+    hasher.hash('P@ssValiD1')
+    assert hasher.metrics()['completed'] == 2
+    assert hasher.metrics()['max_workers'] == 2
+
+
+def test_login_survives_busy_rehash(test_client, init_db):
+    # A shed rehash keeps the old hash but does not fail the login
+    user = User(user_name='FooBar', user_email='FooBar@oregonstate.edu', user_password='LegITpW123@!')
+    init_db.session.add(user)
+    init_db.session.commit()
+    user_id = user.user_id
+    old_hash = generate_password_hash('LegITpW123@!', method='pbkdf2:sha256:1000')
+    User.query.filter_by(user_id=user_id).update({'user_password': old_hash})
+    init_db.session.commit()
+
+    with patch('backend.models.hasher.hash', side_effect=HashingBusyError('busy')):
+        response = test_client.post('/login', json={
+            'user_email': 'FooBar@oregonstate.edu',
+            'user_password': 'LegITpW123@!'
+        })
+
+    assert response.status_code == 200
+    assert init_db.session.get(User, user_id).user_password == old_hash
+
+
+def test_login_rehashes_old_password(test_client, init_db):
+    # Logging in with an outdated hash should upgrade it
+    user = User(user_name='FooBar', user_email='FooBar@oregonstate.edu', user_password='LegITpW123@!')
+    init_db.session.add(user)
+    init_db.session.commit()
+    user_id = user.user_id
+
+    # Bulk update skips the validator so the old hash is stored as-is
+    old_hash = generate_password_hash('LegITpW123@!', method='pbkdf2:sha256:1000')
+    User.query.filter_by(user_id=user_id).update({'user_password': old_hash})
+    init_db.session.commit()
+
+    response = test_client.post('/login', json={
+        'user_email': 'FooBar@oregonstate.edu',
+        'user_password': 'LegITpW123@!'
+    })
+
+    assert response.status_code == 200
+    stored = init_db.session.get(User, user_id).user_password
+    assert not stored.startswith('pbkdf2:sha256:1000$')
+
+
+def test_metrics_requires_admin_or_token(test_app, test_client, init_db):
+    # Anonymous callers are refused; the configured bearer token or an admin gets in
+    assert test_client.get('/api/metrics').status_code == 401
+
+    test_app.config['METRICS_TOKEN'] = 'scrape-me'
+    try:
+        assert test_client.get('/api/metrics', headers={
+            'Authorization': 'Bearer wrong'}).status_code == 401
+        response = test_client.get('/api/metrics', headers={
+            'Authorization': 'Bearer scrape-me'})
+        assert response.status_code == 200
+        assert 'password_hashing' in response.get_json()
+    finally:
+        test_app.config['METRICS_TOKEN'] = None
+
+    user = User(user_name='FooBar', user_email='FooBar@oregonstate.edu', user_password='LegITpW123@!')
+    init_db.session.add(user)
+    init_db.session.commit()
+    test_client.post('/login', json={'user_email': 'FooBar@oregonstate.edu',
+                                     'user_password': 'LegITpW123@!'})
+    try:
+        assert test_client.get('/api/metrics').status_code == 403
+        test_app.config['ADMIN_EMAILS'] = ['foobar@oregonstate.edu']
+        assert test_client.get('/api/metrics').status_code == 200
+    finally:
+        test_app.config['ADMIN_EMAILS'] = []
+        test_client.post('/logout')
@@ -0,0 +1,78 @@
+# Tests for token-bucket rate limiting of the generation endpoints
+
+from unittest.mock import patch
+from backend.ratelimit import LocalBucketStore, DatabaseBucketStore
+
+
+def test_local_bucket_refills():
+    # A drained bucket reports how long until the next token
+    store = LocalBucketStore()
+    with patch('backend.ratelimit.time.time', return_value=1000.0):
+        assert store.consume('ip:1', capacity=2, refill_rate=0.5) == (True, 0.0)
+        assert store.consume('ip:1', capacity=2, refill_rate=0.5) == (True, 0.0)
+        assert store.consume('ip:1', capacity=2, refill_rate=0.5) == (False, 2.0)
+
+    with patch('backend.ratelimit.time.time', return_value=1002.0):
+        assert store.consume('ip:1', capacity=2, refill_rate=0.5)[0] is True
+
+
+def test_database_bucket_shared(init_db):
+    # Two store instances (as in two workers) drain the same bucket
+    first, second = DatabaseBucketStore(), DatabaseBucketStore()
+
+    assert first.consume('user:7', capacity=1, refill_rate=0.01)[0] is True
+    allowed, retry_after = second.consume('user:7', capacity=1, refill_rate=0.01)
+    assert allowed is False
+    assert retry_after > 0
+
+
+def test_generation_over_limit_gets_429(test_app, test_client, init_db):
+    # The request after the burst should be refused with Retry-After
+    with patch.dict(test_app.config, {'RATE_LIMIT_ENABLED': True}), \
+            patch.object(test_app.extensions['rate_limiter'], 'capacity', 1), \
+            patch('backend.routes.generate_recipe', return_value={'success': True, 'recipe': {}}):
+        body = {'fridge_ingredients': ['eggs'], 'dietary_concerns': None}
+        headers = {'X-Forwarded-For': '203.0.113.9'}
+        first = test_client.post('/api/generate-recipe-from-fridge', json=body, headers=headers)
+        second = test_client.post('/api/generate-recipe-from-fridge', json=body, headers=headers)
+
+    assert first.status_code == 200
+    assert second.status_code == 429
+    assert int(second.headers['Retry-After']) >= 1
+
+
+def test_database_bucket_counts_concurrent_requests(test_app, init_db):
+    # Parallel requests on one key never spend more tokens than the bucket holds
+    import threading
+    from backend import db
+    store = DatabaseBucketStore()
+    results = []
+
+    def hit():
+        with test_app.app_context():
+            try:
+                results.append(store.consume('ip:9', capacity=3, refill_rate=0.001)[0])
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=hit) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results.count(True) == 3
+    assert len(results) == 8
+
+
+def test_database_bucket_prunes_refilled_rows(init_db):
+    # Rows idle long enough to be full again are deleted
+    from backend.models import RateLimitBucket
+    store = DatabaseBucketStore()
+    with patch('backend.ratelimit.time.time', return_value=1000.0):
+        store.consume('ip:old', capacity=2, refill_rate=1.0)
+    with patch('backend.ratelimit.time.time', return_value=1100.0):
+        store.consume('ip:new', capacity=2, refill_rate=1.0)
+
+    assert store.prune(1100.0, capacity=2, refill_rate=1.0) == 1
+    assert [b.bucket_key for b in RateLimitBucket.query.all()] == ['ip:new']
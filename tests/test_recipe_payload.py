@@ -0,0 +1,110 @@
+# Tests for the stored payload of saved recipes
+
+import json
+import os
+import sqlite3
+from unittest.mock import patch
+from flask_migrate import upgrade
+from sqlalchemy import text
+from backend.models import CompressedJSON, User
+from backend.setup_db import MIGRATIONS, setup_database
+
+PAYLOAD = {
+    'recipe_name': 'Vegetable Stir Fry',
+    'cooking_time': '20 minutes',
+    'ingredients': ['2 cups broccoli florets', '1 red bell pepper, sliced',
+                    '2 carrots, julienned', '3 tbsp soy sauce',
+                    '1 tbsp sesame oil', '2 cloves garlic, minced'],
+    'instructions': ['Heat the sesame oil in a wok over high heat.',
+                     'Add the garlic and stir for 30 seconds.',
+                     'Add the vegetables and stir fry for 5 minutes.',
+                     'Add the soy sauce and toss until coated.'],
+    'nutritional_info': {'calories': 180, 'protein': '6g', 'carbs': '22g', 'fat': '8g'},
+    'cooking_tips': ['Cut the vegetables evenly so they cook at the same rate.',
+                     'Keep the heat high so the vegetables stay crisp.']
+}
+
+
+def test_compressed_json_round_trip():
+    # Small values are stored plain, large ones compressed, both read back intact
+    column = CompressedJSON()
+    small = column.process_bind_param({'a': 1}, None)
+    large = column.process_bind_param(PAYLOAD, None)
+
+    assert small.startswith(b'j')
+    assert large.startswith(b'z')
+    assert len(large) < len(json.dumps(PAYLOAD))
+    assert column.process_result_value(small, None) == {'a': 1}
+    assert column.process_result_value(large, None) == PAYLOAD
+    assert column.process_bind_param(None, None) is None
+
+
+def test_saved_payload_returned_by_recipe_routes(test_client, init_db):
+    # The generated payload saved with a recipe comes back from get and list
+    user = User(user_name='FooBar', user_email='FooBar@oregonstate.edu', user_password='LegITpW123@!')
+    init_db.session.add(user)
+    init_db.session.commit()
+    with test_client.session_transaction() as session:
+        session['user_id'] = user.user_id
+
+    response = test_client.post('/recipes', json={
+        'recipe_name': 'Vegetable Stir Fry',
+        'recipe_cooktime': 20,
+        'recipe_instructions': '\n'.join(PAYLOAD['instructions']),
+        'recipe_payload': PAYLOAD
+    })
+    assert response.status_code == 201
+    recipe_id = response.get_json()['id']
+
+    stored = init_db.session.execute(
+        text('SELECT recipe_payload FROM recipes WHERE recipe_id = :id'),
+        {'id': recipe_id}).scalar()
+    assert stored.startswith(b'z')
+
+    assert test_client.get(f'/recipes/{recipe_id}').get_json()['payload'] == PAYLOAD
+    assert test_client.get('/recipes/').get_json()[0]['payload'] == PAYLOAD
+
+
+def test_recipe_without_payload(test_client, init_db):
+    # Recipes saved without a payload return null for it
+    user = User(user_name='FooBar', user_email='FooBar@oregonstate.edu', user_password='LegITpW123@!')
+    init_db.session.add(user)
+    init_db.session.commit()
+    with test_client.session_transaction() as session:
+        session['user_id'] = user.user_id
+
+    response = test_client.post('/recipes', json={
+        'recipe_name': 'Toast',
+        'recipe_cooktime': 5,
+        'recipe_instructions': 'Toast the bread until golden.'
+    })
+    recipe_id = response.get_json()['id']
+    assert test_client.get(f'/recipes/{recipe_id}').get_json()['payload'] is None
+
+
+def test_oversized_payload_rejected(test_client, init_db):
+    # Payloads over the size cap are refused before reaching the database
+    response = test_client.post('/recipes', json={
+        'recipe_name': 'Huge',
+        'recipe_cooktime': 5,
+        'recipe_instructions': 'Toast the bread until golden.',
+        'recipe_payload': {'cooking_tips': ['x' * 40000]}
+    })
+    assert response.status_code == 400
+    assert response.get_json()['message'] == 'Recipe payload is too large'
+
+
+def test_setup_db_then_upgrade(tmp_path):
+    # A database built by setup_db is stamped, so a later upgrade is a no-op
+    path = tmp_path / 'setup.db'
+    with patch.dict(os.environ, {'DATABASE_URL': f'sqlite:///{path}'}):
+        setup_database()
+        from backend import create_app
+        with create_app().app_context():
+            upgrade(directory=MIGRATIONS)
+
+    with sqlite3.connect(path) as connection:
+        versions = connection.execute('SELECT version_num FROM alembic_version').fetchall()
+        columns = [row[1] for row in connection.execute('PRAGMA table_info(recipes)')]
+    assert len(versions) == 1
+    assert 'recipe_payload' in columns
@@ -0,0 +1,124 @@
+# Tests for the admin-only sampling profiler
+
+import sys
+import threading
+import time
+import pytest
+from unittest.mock import patch
+from backend.models import User
+from backend.passwords import PasswordHasher
+from backend.sampling_profiler import (SamplingProfiler, ProfilerBusyError,
+                                       collapse_stack, format_collapsed)
+
+
+def spin(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.fixture
+def busy_thread():
+    stop = threading.Event()
+    thread = threading.Thread(target=spin, args=(stop,))
+    thread.start()
+    yield thread
+    stop.set()
+    thread.join()
+
+
+def test_collapse_stack_is_root_first():
+    # The current function is the leaf of its own collapsed stack
+    stack = collapse_stack(sys._getframe())
+    assert stack.endswith(f'{__name__}:test_collapse_stack_is_root_first')
+
+
+def test_profile_samples_other_threads(busy_thread):
+    # A busy request thread shows up in the samples, the caller does not
+    profiler = SamplingProfiler()
+    profiler._active_paths[busy_thread.ident] = '/users'
+    stacks = profiler.profile(seconds=0.1, interval=0.005)
+
+    assert any(stack.endswith(f'{__name__}:spin') for stack in stacks)
+    assert not any('test_profile_samples_other_threads' in stack for stack in stacks)
+    line = format_collapsed(stacks).splitlines()[0]
+    assert int(line.rsplit(' ', 1)[1]) > 0
+
+
+def test_route_filter_only_samples_matching_threads(busy_thread):
+    # Threads not serving the chosen route are skipped
+    profiler = SamplingProfiler()
+    profiler._active_paths[busy_thread.ident] = '/users'
+
+    assert not profiler.profile(seconds=0.02, route='/api/generate-recipe')
+    assert profiler.profile(seconds=0.02, route='/users')
+
+
+def test_threads_outside_requests_skipped(busy_thread):
+    # Without a route, threads not serving a request are still left out
+    assert not SamplingProfiler().profile(seconds=0.02)
+
+
+def test_password_hashing_counts_for_caller_route():
+    # pbkdf2 on the hash pool is sampled under the route that asked for it
+    profiler = SamplingProfiler()
+    hasher = PasswordHasher(max_workers=1, method='pbkdf2:sha256:2000000')
+    profiler._active_paths[threading.get_ident()] = '/login'
+    stacks = {}
+    with patch('backend.passwords.profiler', profiler):
+        sampler = threading.Thread(target=lambda: stacks.update(
+            profiler.profile(seconds=0.3, interval=0.005, route='/login')))
+        sampler.start()
+        hasher.hash('LegITpW123@!')
+        sampler.join()
+    profiler._active_paths.clear()
+
+    assert any(':generate_password_hash' in stack or ':_hash_internal' in stack
+               for stack in stacks)
+
+
+def test_one_profile_at_a_time():
+    # A second profile is refused while one is running
+    profiler = SamplingProfiler()
+    profiler._lock.acquire()
+    try:
+        with pytest.raises(ProfilerBusyError):
+            profiler.profile(seconds=0)
+    finally:
+        profiler._lock.release()
+
+
+def test_non_finite_durations_refused():
+    # NaN or infinite durations never reach the sampling loop
+    profiler = SamplingProfiler()
+    for seconds, interval in ((float('nan'), 0.01), (0, float('inf'))):
+        with pytest.raises(ValueError):
+            profiler.profile(seconds=seconds, interval=interval)
+
+
+def test_endpoint_requires_opt_in_and_admin(test_app, test_client, init_db):
+    # Disabled by default, then only admins get collapsed stacks back
+    assert test_client.post('/api/admin/profile', json={}).status_code == 404
+
+    user = User(user_name='FooBar', user_email='FooBar@oregonstate.edu', user_password='LegITpW123@!')
+    init_db.session.add(user)
+    init_db.session.commit()
+    test_client.post('/login', json={'user_email': 'FooBar@oregonstate.edu',
+                                     'user_password': 'LegITpW123@!'})
+
+    test_app.config['PROFILER_ENABLED'] = True
+    try:
+        test_app.config['ADMIN_EMAILS'] = []
+        assert test_client.post('/api/admin/profile', json={'seconds': 0}).status_code == 403
+
+        test_app.config['ADMIN_EMAILS'] = ['foobar@oregonstate.edu']
+        response = test_client.post('/api/admin/profile', json={'seconds': 0.02})
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+
+        for body in ({'seconds': 'nan'}, {'interval_ms': 'inf'}):
+            response = test_client.post('/api/admin/profile', json=body)
+            assert response.status_code == 400
+    finally:
+        test_app.config['PROFILER_ENABLED'] = False
+        test_app.config['ADMIN_EMAILS'] = []
+        test_client.post('/logout')
@@ -0,0 +1,63 @@
+# Tests for request schema validation
+
+import msgspec
+import pytest
+from unittest.mock import patch
+from backend.schemas import NewRecipe, NewUser, _decoders
+
+
+def test_new_user_valid():
+    # A well-formed body decodes into the struct
+    user = _decoders[NewUser].decode(
+        b'{"user_name": "Alice", "user_email": "alice@example.com",'
+        b' "user_password": "Secr3t!pass"}')
+    assert user.user_email == 'alice@example.com'
+
+
+@pytest.mark.parametrize('body, message', [
+    (b'{"user_name": "Al1ce", "user_email": "a@b.com", "user_password": "Secr3t!pass"}',
+     'User name cannot contain numbers'),
+    (b'{"user_name": "Alice", "user_email": "not-an-email", "user_password": "Secr3t!pass"}',
+     'Invalid email format'),
+    (b'{"user_name": "Alice", "user_email": "a@b.com", "user_password": "short"}',
+     'Password must be at least 8 characters long'),
+    (b'{"user_name": "Alice", "user_email": "a@b.com"}',
+     'missing required field `user_password`'),
+])
+def test_new_user_invalid(body, message):
+    # Each rule rejects the body with a readable message
+    with pytest.raises(msgspec.ValidationError, match=message):
+        _decoders[NewUser].decode(body)
+
+
+def test_recipe_cooktime_must_be_int():
+    # Strings and booleans are not accepted as a cook time
+    for cooktime in (b'"20"', b'true'):
+        with pytest.raises(msgspec.ValidationError, match='Expected `int`'):
+            _decoders[NewRecipe].decode(
+                b'{"recipe_name": "Soup", "recipe_cooktime": ' + cooktime +
+                b', "recipe_instructions": "Boil water and add soup."}')
+
+
+def test_invalid_body_skips_database(test_client):
+    # A malformed body is answered with 400 before a session or query is opened
+    with patch('backend.routes.current_user_id') as mock_user, \
+            patch('backend.routes.User') as mock_model:
+        response = test_client.post('/users', data=b'{"user_name": 1',
+                                    content_type='application/json')
+        assert response.status_code == 400
+        mock_model.assert_not_called()
+
+        response = test_client.post('/recipes', json={'recipe_name': 'Soup'})
+        assert response.status_code == 400
+        assert 'recipe_cooktime' in response.get_json()['message']
+        mock_user.assert_not_called()
+
+
+def test_generate_recipe_rejects_non_string(test_client):
+    # A list sent to the string route is rejected without calling OpenAI
+    with patch('backend.routes.generate_recipe') as mock_generate:
+        response = test_client.post('/api/generate-recipe',
+                                    json={'ingredients': ['eggs']})
+    assert response.status_code == 400
+    mock_generate.assert_not_called()
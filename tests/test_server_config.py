@@ -0,0 +1,92 @@
+# Tests for the production gunicorn configuration and fork hooks
+
+import os
+import pytest
+import runpy
+from unittest.mock import patch
+from backend import admission, chatgptAPI, create_app, engine
+
+CONFIG = os.path.join(os.path.dirname(__file__), '..', 'gunicorn.conf.py')
+
+
+def load_config(**env):
+    with patch.dict(os.environ, env, clear=False):
+        for name in ('OPENAI_MAX_CONCURRENCY', 'OPENAI_QUEUE_SIZE',
+                     'OPENAI_MAX_CONNECTIONS', 'OPENAI_MAX_KEEPALIVE',
+                     'DB_POOL_SIZE', 'DB_MAX_OVERFLOW', 'DB_POOL_TIMEOUT',
+                     'DB_MAX_CONNECTIONS', 'WEB_CONCURRENCY'):
+            if name not in env:
+                os.environ.pop(name, None)
+        settings = runpy.run_path(CONFIG)
+        settings['environ'] = dict(os.environ)
+    return settings
+
+
+def test_threaded_workers_by_default():
+    # gthread workers are sized for many concurrent waits and no preload
+    settings = load_config(GUNICORN_THREADS='48')
+
+    assert settings['worker_class'] == 'gthread'
+    assert settings['threads'] == 48
+    assert settings['preload_app'] is False
+    assert settings['timeout'] <= 30
+    assert settings['environ']['WEB_CONCURRENCY'] == str(settings['workers'])
+    assert 'OPENAI_MAX_CONCURRENCY' not in settings['environ']
+
+
+def test_gevent_mode_sizes_by_connections():
+    # Cooperative workers size the OpenAI limits from worker_connections
+    settings = load_config(GUNICORN_WORKER_CLASS='gevent', GUNICORN_WORKER_CONNECTIONS='300')
+
+    assert settings['worker_class'] == 'gevent'
+    assert settings['environ']['OPENAI_QUEUE_SIZE'] == '300'
+
+
+def test_db_pool_shares_connection_budget():
+    # Workers split DB_MAX_CONNECTIONS, however many threads each one runs
+    settings = load_config(WEB_CONCURRENCY='4', GUNICORN_THREADS='64')
+    assert settings['environ']['DB_POOL_SIZE'] == '4'
+    assert settings['environ']['DB_MAX_OVERFLOW'] == '0'
+    assert settings['environ']['DB_POOL_TIMEOUT'] == '10'
+
+    settings = load_config(WEB_CONCURRENCY='3', DB_MAX_CONNECTIONS='120')
+    assert settings['environ']['DB_POOL_SIZE'] == '40'
+
+
+def test_explicit_limits_win():
+    # Limits set in the environment are not overridden, but the timeout stays under 30s
+    settings = load_config(OPENAI_QUEUE_SIZE='4', DB_POOL_SIZE='10', GUNICORN_TIMEOUT='90')
+    assert settings['environ']['OPENAI_QUEUE_SIZE'] == '4'
+    assert settings['environ']['DB_POOL_SIZE'] == '10'
+    assert settings['timeout'] == 30
+
+
+def test_openai_cap_shared_across_workers(test_app):
+    # Each worker gets its share of the account-wide OpenAI limit
+    env = {'OPENAI_TIER_CONCURRENCY': '40', 'WEB_CONCURRENCY': '4'}
+    try:
+        with patch.dict(os.environ, env):
+            os.environ.pop('OPENAI_MAX_CONCURRENCY', None)
+            assert create_app().config['OPENAI_MAX_CONCURRENCY'] == 10
+        with patch.dict(os.environ, {**env, 'OPENAI_MAX_CONCURRENCY': '3'}):
+            assert create_app().config['OPENAI_MAX_CONCURRENCY'] == 3
+    finally:
+        admission.init_app(test_app)
+
+
+def test_fork_hooks_reset_shared_state(test_app):
+    # After a fork the OpenAI client is rebuilt and pooled connections dropped
+    chatgptAPI.get_client()
+    chatgptAPI.reset_client()
+    assert chatgptAPI._client is None
+
+    with patch.object(engine.db.engine, 'dispose') as dispose:
+        engine.dispose_after_fork(test_app)
+    dispose.assert_called_once_with(close=False)
+
+
+def test_create_app_requires_secret_key(monkeypatch):
+    # The app refuses to start without SECRET_KEY, though the package imports
+    monkeypatch.delenv('SECRET_KEY', raising=False)
+    with pytest.raises(RuntimeError, match='SECRET_KEY'):
+        create_app()
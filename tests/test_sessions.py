@@ -0,0 +1,60 @@
+# Tests for the database-backed session store
+
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from backend.models import User, UserSession
+
+
+def test_login_session_stored_in_db(test_client, init_db):
+    # Logging in should write one session row to the database
+    user = User(user_name='FooBar', user_email='FooBar@oregonstate.edu', user_password='LegITpW123@!')
+    init_db.session.add(user)
+    init_db.session.commit()
+
+    response = test_client.post('/login', json={
+        'user_email': 'FooBar@oregonstate.edu',
+        'user_password': 'LegITpW123@!'
+    })
+
+    assert response.status_code == 200
+    assert UserSession.query.count() == 1
+
+
+def test_unchanged_session_skips_write(test_app, test_client, init_db):
+    # Reading an unchanged, recently written session should not upsert it
+    with test_client.session_transaction() as session:
+        session['user_id'] = 1
+
+    interface = test_app.session_interface
+    with patch.object(interface, '_upsert_session') as mock_upsert:
+        test_client.get('/ingredients')
+
+    mock_upsert.assert_not_called()
+
+
+def test_sweeper_deletes_expired_in_batches(test_app, init_db):
+    # Expired sessions are removed in batches, live ones are kept
+    now = datetime.utcnow()
+    for i in range(5):
+        init_db.session.add(UserSession(session_id=f'old{i}', data=b'', expiry=now - timedelta(days=1)))
+    init_db.session.add(UserSession(session_id='live', data=b'', expiry=now + timedelta(days=1)))
+    init_db.session.commit()
+
+    interface = test_app.session_interface
+    with patch.object(interface, 'sweep_batch_size', 2):
+        removed = interface._delete_expired_sessions()
+
+    assert removed == 5
+    assert [s.session_id for s in UserSession.query.all()] == ['live']
+
+
+def test_session_cleanup_command(test_app, init_db):
+    # 'flask session_cleanup' runs the same sweep from the command line
+    init_db.session.add(UserSession(session_id='old', data=b'',
+                                    expiry=datetime.utcnow() - timedelta(days=1)))
+    init_db.session.commit()
+
+    result = test_app.test_cli_runner().invoke(args=['session_cleanup'])
+
+    assert 'Removed 1 expired sessions.' in result.output
+    assert UserSession.query.count() == 0
@@ -0,0 +1,79 @@
+# Tests for the per-request SQL profiler
+
+import logging
+import os
+import pytest
+from unittest.mock import patch
+from backend import create_app, db
+from backend.models import User
+from backend.sql_profiler import statement_shape
+
+
+@pytest.fixture(scope='module')
+def test_app():
+    # An app with the profiler switched on and a route that loads users one by one
+    with patch.dict(os.environ, {'SQL_PROFILER_ENABLED': 'true',
+                                 'SQL_SLOW_QUERY_MS': '100000',
+                                 'SQL_REPEAT_THRESHOLD': '3'}):
+        app = create_app()
+    app.config['TESTING'] = True
+    app.config['RATE_LIMIT_ENABLED'] = False
+
+    @app.route('/test/users-one-by-one')
+    def users_one_by_one():
+        names = [db.session.get(User, user_id) for user_id in (1, 2, 3, 4)]
+        return {'found': sum(1 for user in names if user is not None)}
+
+    with app.app_context():
+        yield app
+
+
+def test_statement_shape_collapses_in_lists():
+    # IN lists of any length and extra whitespace map to one shape
+    assert statement_shape('SELECT *\n  FROM users WHERE id IN (?, ?, ?)') == \
+        'SELECT * FROM users WHERE id IN (?)'
+    assert statement_shape('SELECT * FROM users WHERE id IN (?, ?)') == \
+        'SELECT * FROM users WHERE id IN (?)'
+
+
+def test_debug_headers_count_queries(test_app, test_client, init_db):
+    # Debug mode reports the query count and repeats in headers
+    test_app.debug = True
+    try:
+        response = test_client.get('/test/users-one-by-one')
+    finally:
+        test_app.debug = False
+
+    assert response.status_code == 200
+    assert int(response.headers['X-SQL-Queries']) >= 4
+    assert int(response.headers['X-SQL-Max-Repeat']) == 4
+    assert float(response.headers['X-SQL-Time-ms']) >= 0
+
+
+def test_no_headers_outside_debug(test_client, init_db):
+    # Production responses do not expose SQL details
+    response = test_client.get('/test/users-one-by-one')
+    assert 'X-SQL-Queries' not in response.headers
+
+
+def test_repeated_shape_is_logged(test_client, init_db, caplog):
+    # A shape repeated past the threshold is flagged as a possible N+1
+    with caplog.at_level(logging.WARNING):
+        test_client.get('/test/users-one-by-one')
+
+    assert any('Possible N+1 in users_one_by_one: 4 x' in record.getMessage()
+               for record in caplog.records)
+
+
+def test_slow_queries_are_logged(test_app, test_client, init_db, caplog):
+    # Queries over the threshold are logged with their parameters
+    from backend.sql_profiler import sql_profiler
+    sql_profiler.slow_query_ms = 0
+    try:
+        with caplog.at_level(logging.WARNING):
+            test_client.get('/test/users-one-by-one')
+    finally:
+        sql_profiler.slow_query_ms = 100000
+
+    assert any(record.getMessage().startswith('Slow query') and 'params=' in record.getMessage()
+               for record in caplog.records)
@@ -0,0 +1,81 @@
+# Tests for the in-memory static asset server
+
+import os
+import re
+
+
+def test_shell_references_hashed_bundle(test_client):
+    # The shell should point at content-hashed bundle URLs
+    response = test_client.get('/')
+    html = response.get_data(as_text=True)
+
+    assert response.headers['Cache-Control'] == 'no-cache'
+    assert re.search(r"src='/build/bundle\.[0-9a-f]{12}\.js'", html)
+    assert re.search(r"href='/build/bundle\.[0-9a-f]{12}\.css'", html)
+
+
+def test_shell_revalidates_with_etag(test_client):
+    # A repeat visit with a matching ETag should get an empty 304
+    etag = test_client.get('/favorites').headers['ETag']
+    response = test_client.get('/favorites', headers={'If-None-Match': etag})
+
+    assert response.status_code == 304
+    assert response.get_data() == b''
+
+
+def test_hashed_bundle_is_immutable(test_client):
+    # Hashed bundle URLs are cacheable forever, plain ones revalidate
+    html = test_client.get('/').get_data(as_text=True)
+    hashed_url = re.search(r"src='(/build/bundle\.[0-9a-f]{12}\.js)'", html).group(1)
+
+    hashed = test_client.get(hashed_url)
+    plain = test_client.get('/build/bundle.js')
+
+    assert hashed.status_code == 200
+    assert 'immutable' in hashed.headers['Cache-Control']
+    assert plain.headers['Cache-Control'] == 'no-cache'
+    assert hashed.get_data() == plain.get_data()
+
+
+def test_top_level_static_file(test_client):
+    # Files next to index.html are served as themselves, not as the shell
+    response = test_client.get('/global.css')
+
+    assert response.mimetype == 'text/css'
+
+
+def test_stale_precompressed_sibling_is_ignored(tmp_path):
+    # A .gz left over from an older build is replaced by in-memory gzip
+    import gzip
+    from backend.static_assets import StaticAssetStore
+    build = tmp_path / 'build'
+    build.mkdir()
+    (build / 'bundle.js').write_bytes(b'var app = "new build";' * 20)
+    (build / 'bundle.js.gz').write_bytes(gzip.compress(b'var app = "old build";'))
+    (tmp_path / 'index.html').write_text("<script src='/build/bundle.js'></script>")
+
+    asset = StaticAssetStore(str(tmp_path), str(build)).load().build_files['bundle.js']
+
+    assert gzip.decompress(asset.encoded['gzip']) == asset.data
+
+
+def test_disk_fallback_skips_stale_sibling(test_app, tmp_path):
+    # Files served from disk only use a sibling that decodes to the file
+    import gzip
+    from backend.compression import send_precompressed
+    (tmp_path / 'late.js').write_bytes(b'var late = 2;')
+    (tmp_path / 'late.js.gz').write_bytes(gzip.compress(b'var late = 1;'))
+
+    with test_app.test_request_context(headers={'Accept-Encoding': 'gzip'}):
+        response = send_precompressed(str(tmp_path), 'late.js')
+        response.direct_passthrough = False
+        assert 'Content-Encoding' not in response.headers
+        assert response.get_data() == b'var late = 2;'
+        response.close()
+
+        (tmp_path / 'late.js.gz').write_bytes(gzip.compress(b'var late = 2;'))
+        # Coarse filesystem clocks could otherwise keep the old stamp
+        os.utime(tmp_path / 'late.js.gz', (1, 1))
+        response = send_precompressed(str(tmp_path), 'late.js')
+        assert response.headers['Content-Encoding'] == 'gzip'
+        response.close()
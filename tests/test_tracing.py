@@ -0,0 +1,147 @@
+# Tests for request tracing spans and exporters
+
+import json
+from unittest.mock import patch, Mock
+from sqlalchemy import create_engine, event, text
+from backend import tracing
+from backend.tracing import Tracer, TracingMiddleware, FileExporter, tracer
+from backend.chatgptAPI import generate_recipe
+
+VALID_RECIPE = json.dumps({
+    "recipe_name": "Egg Fried Rice",
+    "cooking_time": "15 minutes",
+    "ingredients": [{"ingredient": "Rice", "quantity": "1", "unit": "cup"}],
+    "instructions": ["Fry rice", "Add eggs"],
+    "nutritional_info": {"calories": "300", "protein": "10g", "fat": "8g", "carbohydrates": "45g"},
+    "cooking_tips": "Use day-old rice."
+})
+
+
+class ListExporter:
+    def __init__(self):
+        self.traces = []
+
+    def export(self, spans):
+        self.traces.append(list(spans))
+
+
+def make_tracer(sample_rate=1.0):
+    return Tracer(sample_rate=sample_rate, exporter=ListExporter())
+
+
+def run_in_root(local_tracer, func):
+    # Run func under a sampled root span and return the exported spans
+    root = local_tracer.start_root('test')
+    token = tracing._current_span.set(root)
+    try:
+        func()
+    finally:
+        tracing._current_span.reset(token)
+        local_tracer.finish_root(root)
+    local_tracer.flush()
+    return local_tracer.exporter.traces[-1]
+
+
+def test_span_without_root_is_noop():
+    # Outside a sampled request nothing is recorded
+    with tracer.span('orphan') as span:
+        assert span is None
+
+
+def test_middleware_records_nested_spans():
+    # Child spans hang off the request's root span and the trace is exported
+    local_tracer = make_tracer()
+
+    def app(environ, start_response):
+        with local_tracer.span('work', step=1):
+            pass
+        start_response('201 Created', [])
+        return [b'ok']
+
+    middleware = TracingMiddleware(app, local_tracer)
+    middleware({'REQUEST_METHOD': 'POST', 'PATH_INFO': '/api/x'}, lambda *a: None)
+    local_tracer.flush()
+
+    spans = {span.name: span for span in local_tracer.exporter.traces[0]}
+    root = spans['POST /api/x']
+    assert spans['work'].parent_id == root.span_id
+    assert root.attributes['http.status_code'] == 201
+
+
+def test_unsampled_requests_are_not_exported():
+    # A zero sample rate skips tracing without an incoming traceparent
+    local_tracer = make_tracer(sample_rate=0.0)
+    assert local_tracer.start_root('GET /') is None
+
+
+def test_traceparent_continues_trace():
+    # A trusted upstream sampled traceparent keeps its trace id
+    local_tracer = make_tracer(sample_rate=0.5)
+    with patch('backend.tracing.random.random', return_value=0.99):
+        root = local_tracer.start_root(
+            'GET /', traceparent='00-' + 'a' * 32 + '-' + 'b' * 16 + '-01',
+            trusted=True)
+    assert root.trace.trace_id == 'a' * 32
+    assert root.parent_id == 'b' * 16
+
+
+def test_untrusted_sampled_flag_ignored():
+    # Only configured callers can force a request to be traced
+    local_tracer = Tracer(sample_rate=0.5, exporter=ListExporter(),
+                          trusted_parents=['10.0.0.0/8'])
+    environ = {'REQUEST_METHOD': 'GET', 'PATH_INFO': '/',
+               'HTTP_TRACEPARENT': '00-' + 'a' * 32 + '-' + 'b' * 16 + '-01'}
+    middleware = TracingMiddleware(lambda environ, start_response: [b'ok'], local_tracer)
+
+    with patch('backend.tracing.random.random', return_value=0.99):
+        middleware({**environ, 'REMOTE_ADDR': '203.0.113.7'}, Mock())
+        middleware({**environ, 'REMOTE_ADDR': 'not-an-ip'}, Mock())
+        assert local_tracer._queue.qsize() == 0
+        middleware({**environ, 'REMOTE_ADDR': '10.1.2.3'}, Mock())
+    local_tracer.flush()
+    assert [spans[0].trace.trace_id for spans in local_tracer.exporter.traces] == ['a' * 32]
+
+
+def test_sql_spans_from_engine_events():
+    # Each cursor execute becomes a span carrying its statement
+    engine = create_engine('sqlite://')
+    event.listen(engine, 'before_cursor_execute', tracing._before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', tracing._after_cursor_execute)
+
+    def query():
+        with engine.connect() as conn:
+            conn.execute(text('SELECT 1'))
+
+    spans = run_in_root(make_tracer(), query)
+    sql = [span for span in spans if span.name == 'sql']
+    assert len(sql) == 1
+    assert sql[0].attributes['db.statement'] == 'SELECT 1'
+
+
+def test_generate_recipe_spans(test_client):
+    # Prompt building, the OpenAI call and validation are each traced
+    response = Mock()
+    response.choices = [Mock(message=Mock(content=VALID_RECIPE))]
+    response.usage = Mock(prompt_tokens=20, completion_tokens=30, total_tokens=50)
+
+    with patch('backend.chatgptAPI.client.chat.completions.create', return_value=response):
+        spans = run_in_root(make_tracer(), lambda: generate_recipe('rice, egg'))
+
+    names = [span.name for span in spans]
+    for name in ('format_prompt', 'openai.chat.completions.create', 'validate_json'):
+        assert name in names
+    create = next(span for span in spans if span.name == 'openai.chat.completions.create')
+    assert create.attributes['tokens'] == 50
+
+
+def test_file_exporter_writes_otlp_json(tmp_path):
+    # Each trace is one OTLP/JSON line
+    local_tracer = Tracer(sample_rate=1.0, exporter=FileExporter(str(tmp_path / 'traces.jsonl')))
+    root = local_tracer.start_root('GET /')
+    local_tracer.finish_root(root)
+    local_tracer.flush()
+
+    payload = json.loads((tmp_path / 'traces.jsonl').read_text())
+    spans = payload['resourceSpans'][0]['scopeSpans'][0]['spans']
+    assert spans[0]['name'] == 'GET /'
+    assert len(spans[0]['traceId']) == 32
@@ -0,0 +1,187 @@
+# Tests for the generation cache and the off-peak recipe warmer
+
+import json
+import time
+from unittest.mock import patch
+from backend.generation_cache import generation_cache, normalize_combo, cache_key
+from backend.log_parsing import parse_log_line
+from backend.warmer import RecipeWarmer, log_files, mine_log, parse_hours
+
+LOG_LINES = [
+    '2024-11-05 02:00:00,001 - INFO - Generating recipe for ingredients: Rice, egg, Attempt: 1, Model: gpt-3.5-turbo, Diet: None\n',
+    '2024-11-05 02:00:03,001 - INFO - Generating recipe for ingredients: Rice, egg, Attempt: 2, Model: gpt-3.5-turbo, Diet: None\n',
+    '2024-11-05 02:01:00,001 - INFO - Generating recipe for: [\'egg\', \'rice\']\n',
+    json.dumps({'ts': '2024-11-05 02:02:00,001', 'level': 'INFO',
+                'msg': "Generating recipe for ingredients: ['tofu'], Attempt: 1, Model: m, Diet: vegan"}) + '\n',
+    '2024-11-05 02:03:00,001 - INFO - Successfully processed recipe request\n',
+]
+
+
+def test_normalize_combo():
+    # Order, case, duplicates and list reprs do not change the key
+    assert normalize_combo('Rice, egg ,rice') == (('egg', 'rice'), '')
+    assert normalize_combo("['egg', 'Rice']", 'None') == (('egg', 'rice'), '')
+    assert cache_key(['tofu'], 'Vegan') == 'tofu|vegan'
+
+
+def test_parse_log_line_text_and_json():
+    # Both log formats yield a timestamp and the message
+    timestamp, level, message, _ = parse_log_line(LOG_LINES[0])
+    assert timestamp.hour == 2 and level == 'INFO'
+    assert message.startswith('Generating recipe for ingredients')
+    assert parse_log_line(LOG_LINES[3])[2].endswith('Diet: vegan')
+
+
+def test_mine_log_counts_first_attempts(tmp_path):
+    # Retries are not counted twice and both log formats are mined
+    log = tmp_path / 'recipe_api.log'
+    log.write_text(''.join(LOG_LINES))
+
+    combos = mine_log([str(log)])
+
+    assert combos[(('egg', 'rice'), '')] == 2
+    assert combos[(('tofu',), 'vegan')] == 1
+
+
+def test_mine_log_counts_cache_hits(tmp_path, init_db):
+    # Combos served from the cache still count as demand
+    log = tmp_path / 'recipe_api.log'
+    generation_cache.enabled = True
+    try:
+        generation_cache.put('Rice, egg', 'Vegan', {'success': True, 'recipe': {}})
+        with patch('backend.generation_cache.logging.info') as mock_info:
+            generation_cache.get(['egg', 'rice'], 'vegan')
+    finally:
+        generation_cache.enabled = False
+    message = mock_info.call_args.args[0]
+    log.write_text(f'2024-11-05 02:00:00,001 - INFO - {message}\n' * 2)
+
+    assert mine_log([str(log)]) == {(('egg', 'rice'), 'vegan'): 2}
+
+
+def test_parse_hours():
+    # Ranges and single hours can be mixed
+    assert parse_hours('2-4, 23') == {2, 3, 4, 23}
+
+
+def test_cache_round_trip(init_db):
+    # Stored generations are found again under the normalized key
+    generation_cache.enabled = True
+    try:
+        generation_cache.put('Rice, egg', None, {'success': True, 'recipe': {'recipe_name': 'Fried Rice'}})
+        assert generation_cache.get(['egg', 'rice'])['recipe']['recipe_name'] == 'Fried Rice'
+        assert generation_cache.get(['tofu']) is None
+    finally:
+        generation_cache.enabled = False
+
+
+def test_warm_respects_budget_and_cache(init_db, tmp_path):
+    # Cached combos are skipped and generation stops once the budget is spent
+    log = tmp_path / 'recipe_api.log'
+    lines = []
+    for ingredients, count in (('rice, egg', 3), ('tofu', 2), ('pasta', 2)):
+        lines += [f'2024-11-05 02:00:00,001 - INFO - Generating recipe for ingredients: {ingredients}, Attempt: 1\n'] * count
+    log.write_text(''.join(lines))
+    generated = []
+
+    def fake_generate(ingredients, dietary_concerns=None, priority=None):
+        generated.append(ingredients)
+        return {'success': True, 'recipe': {}, 'tokens': 100}
+
+    warmer = RecipeWarmer(log_path=str(log), token_budget=100, min_count=2,
+                          lookback_hours=24 * 365 * 100, run_interval_hours=1)
+    generation_cache.enabled = True
+    try:
+        generation_cache.put(['egg', 'rice'], '', {'success': True, 'recipe': {}})
+        summary = warmer.warm(generate=fake_generate)
+    finally:
+        generation_cache.enabled = False
+
+    assert summary['cached'] == 1
+    assert summary['generated'] == 1
+    assert summary['tokens'] == 100
+    assert generated == [['tofu']]
+
+
+def test_log_files_for_stdout_and_per_worker_logs(tmp_path):
+    # No file when logging to stdout; every worker's file for a {pid} path
+    assert log_files('') == []
+    for name in ('api.11.log', 'api.12.log', 'api.11.log.1'):
+        (tmp_path / name).write_text('')
+
+    found = [p.rsplit('/', 1)[1] for p in log_files(str(tmp_path / 'api.{pid}.log'))]
+    assert found == ['api.11.log.1', 'api.11.log', 'api.12.log']
+
+
+def test_log_files_sorts_backups_numerically(tmp_path):
+    # Rotated backups are oldest first, so .10 comes before .2
+    for name in ('api.log', 'api.log.1', 'api.log.2', 'api.log.10'):
+        (tmp_path / name).write_text('')
+
+    found = [p.rsplit('/', 1)[1] for p in log_files(str(tmp_path / 'api.log'))]
+    assert found == ['api.log.10', 'api.log.2', 'api.log.1', 'api.log']
+
+
+def test_only_one_warmer_holds_lock(tmp_path):
+    # A second warmer sharing the lock file does not warm
+    lock_path = str(tmp_path / 'warmer.lock')
+    first = RecipeWarmer(lock_path=lock_path)
+    second = RecipeWarmer(lock_path=lock_path)
+    try:
+        assert first.hold_lock() is True
+        assert second.hold_lock() is False
+    finally:
+        first._lock_file.close()
+    assert second.hold_lock() is True
+    second._lock_file.close()
+
+
+def test_contains_treats_errors_as_miss(init_db):
+    # A failing cache lookup during warming is logged and counted as not cached
+    with patch('backend.generation_cache.db.session.get',
+               side_effect=RuntimeError('database is locked')):
+        assert generation_cache.contains(['tofu']) is False
+
+
+def test_internal_fields_not_returned(test_client, init_db):
+    # The model and token count stay out of fresh and cached responses
+    result = {'success': True, 'recipe': {'recipe_name': 'Toast'},
+              'dietary_concerns': 'None specified', 'model': 'm', 'tokens': 50}
+    generation_cache.enabled = True
+    try:
+        with patch('backend.routes.generate_recipe', return_value=result):
+            fresh = test_client.post('/api/generate-recipe',
+                                     json={'ingredients': 'bread'}).get_json()
+        cached = test_client.post('/api/generate-recipe',
+                                  json={'ingredients': 'bread'}).get_json()
+    finally:
+        generation_cache.enabled = False
+
+    for body in (fresh, cached):
+        assert body['recipe'] == {'recipe_name': 'Toast'}
+        assert 'model' not in body and 'tokens' not in body
+
+
+def test_warm_refreshes_entries_expiring_before_next_run(init_db, tmp_path):
+    # An entry that would expire before the next run is generated again
+    log = tmp_path / 'recipe_api.log'
+    log.write_text('2024-11-05 02:00:00,001 - INFO - Generating recipe for ingredients: tofu, Attempt: 1\n' * 2)
+
+    def fake_generate(ingredients, dietary_concerns=None, priority=None):
+        return {'success': True, 'recipe': {}, 'tokens': 10}
+
+    warmer = RecipeWarmer(log_path=str(log), lookback_hours=24 * 365 * 100,
+                          run_interval_hours=24)
+    generation_cache.enabled = True
+    try:
+        # Stored an hour ago, so 23 of its 24 hours are left
+        with patch('backend.generation_cache.time.time', return_value=time.time() - 3600):
+            generation_cache.put(['tofu'], '', {'success': True, 'recipe': {}})
+        assert generation_cache.contains(['tofu']) is True
+        assert generation_cache.contains(['tofu'], min_remaining=24 * 3600) is False
+        summary = warmer.warm(generate=fake_generate)
+        assert generation_cache.contains(['tofu'], min_remaining=23 * 3600) is True
+    finally:
+        generation_cache.enabled = False
+
+    assert summary['generated'] == 1
@@ -0,0 +1,260 @@
+# Rebuilds request timelines from recipe_api.log and reports latency,
+# retry, token and ingredient statistics.
+#
+# Usage (from the project root):
+#     python -m tools.log_analyzer recipe_api.log [more logs...] [--top N] [--json]
+#
+# Files are streamed line by line. Latencies keep a bounded random sample
+# per series, so memory stays flat however large the logs are.
+#
+# The app is never created, so no SECRET_KEY or database is required; the
+# log parsing helpers are shared with the backend through
+# backend.log_parsing.
+
+from collections import Counter, OrderedDict, defaultdict
+from backend.log_parsing import (
+    GENERATION_LINE, normalize_combo, parse_log_line, percentile)
+import argparse
+import json
+import random
+import re
+import sys
+
+REQUEST_SUMMARY = re.compile(
+    r'^(?P<method>[A-Z]+) (?P<path>/\S*) (?P<status>\d{3}) (?P<ms>[\d.]+)ms$')
+ACCESS_LINE = re.compile(
+    r'"(?P<method>[A-Z]+) (?P<path>\S+) HTTP/[\d.]+" (?P<status>\d{3})')
+OPENAI_REQUEST = re.compile(r'^HTTP Request: POST https://api\.openai\.com/\S+')
+TOKEN_USAGE = re.compile(r'Total: (?P<total>\d+)')
+NUMERIC_SEGMENT = re.compile(r'/\d+(?=/|$)')
+# Werkzeug start-up and reloader banners
+SERVER_LINE = re.compile(r'^( \* |\x1b\[)')
+
+class Reservoir:
+    """Fixed-size uniform sample of a stream, for approximate percentiles."""
+
+    def __init__(self, size=10000, rng=None):
+        self.size = size
+        self.count = 0
+        self.total = 0.0
+        self.samples = []
+        self._rng = rng or random.Random(0)
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if len(self.samples) < self.size:
+            self.samples.append(value)
+        else:
+            index = self._rng.randrange(self.count)
+            if index < self.size:
+                self.samples[index] = value
+
+    def summary(self):
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 3),
+            'p50': percentile(self.samples, 50),
+            'p90': percentile(self.samples, 90),
+            'p99': percentile(self.samples, 99),
+            'max': max(self.samples)
+        }
+
+
+class _Timeline:
+    __slots__ = ('started', 'attempt_started', 'attempts', 'combo')
+
+    def __init__(self, started):
+        self.started = started
+        self.attempt_started = None
+        self.attempts = 0
+        self.combo = None
+
+
+def route_name(path):
+    """Group concrete paths such as /api/users/7 under /api/users/<id>."""
+    return NUMERIC_SEGMENT.sub('/<id>', path.split('?', 1)[0])
+
+
+class LogAnalyzer:
+    """Streams log lines and aggregates per-request timelines.
+
+    JSON lines are grouped by ``request_id``. Text lines carry no id, so
+    they are read as one sequential timeline that each request summary or
+    Werkzeug access line closes; this is exact for a single-threaded
+    server and approximate when requests interleave.
+    """
+
+    def __init__(self, top_n=10, max_open=10000):
+        self.top_n = top_n
+        self.max_open = max_open
+        self.route_latency = defaultdict(Reservoir)
+        self.route_status = defaultdict(Counter)
+        self.openai_latency = Reservoir()
+        self.tokens = Reservoir()
+        self.combos = Counter()
+        self.generations = 0
+        self.attempts = 0
+        self.retried = 0
+        self.lines = 0
+        self.unparsed = 0
+        self._open = OrderedDict()
+        self._has_summaries = False
+
+    def _timeline(self, key, timestamp):
+        timeline = self._open.get(key)
+        if timeline is None:
+            timeline = self._open[key] = _Timeline(timestamp)
+            if len(self._open) > self.max_open:
+                self._close(*self._open.popitem(last=False))
+        return timeline
+
+    def _close(self, key, timeline):
+        if timeline.attempts:
+            self.generations += 1
+            self.attempts += timeline.attempts
+            if timeline.attempts > 1:
+                self.retried += 1
+            if timeline.combo is not None:
+                self.combos[timeline.combo] += 1
+
+    def _finish(self, key, method, path, status, duration_ms, timestamp):
+        timeline = self._open.pop(key, None)
+        route = f'{method} {route_name(path)}'
+        if duration_ms is None and timeline is not None and timestamp and timeline.started:
+            duration_ms = (timestamp - timeline.started).total_seconds() * 1000
+        if duration_ms is not None:
+            self.route_latency[route].add(round(duration_ms, 3))
+        self.route_status[route][status] += 1
+        if timeline is not None:
+            self._close(key, timeline)
+
+    def feed(self, line):
+        """Consume one raw log line."""
+        self.lines += 1
+        timestamp, _, message, fields = parse_log_line(line)
+        if timestamp is None:
+            self.unparsed += 1
+            return
+        key = fields.get('request_id') or '-'
+
+        summary = REQUEST_SUMMARY.match(message)
+        if summary:
+            self._has_summaries = True
+            duration = fields.get('duration_ms', float(summary.group('ms')))
+            self._finish(key, summary.group('method'), summary.group('path'),
+                         summary.group('status'), duration, timestamp)
+            return
+
+        access = ACCESS_LINE.search(message)
+        if access:
+            # Werkzeug lines only matter for logs written before request summaries
+            if not self._has_summaries:
+                self._finish(key, access.group('method'), access.group('path'),
+                             access.group('status'), None, timestamp)
+            return
+
+        if SERVER_LINE.match(message):
+            return
+
+        timeline = self._timeline(key, timestamp)
+        generation = GENERATION_LINE.match(message)
+        if generation:
+            timeline.attempts += 1
+            timeline.attempt_started = timestamp
+            if timeline.combo is None:
+                items, diet = normalize_combo(
+                    generation.group('ingredients'), generation.group('diet'))
+                if items:
+                    timeline.combo = (items, diet)
+        elif OPENAI_REQUEST.match(message):
+            if timeline.attempt_started is not None:
+                self.openai_latency.add(round(
+                    (timestamp - timeline.attempt_started).total_seconds() * 1000, 3))
+                timeline.attempt_started = None
+            if not timeline.attempts:
+                # Older logs without per-attempt lines
+                timeline.attempts = 1
+        elif message.startswith('Token usage'):
+            usage = TOKEN_USAGE.search(message)
+            if usage:
+                self.tokens.add(int(usage.group('total')))
+
+    def feed_file(self, path):
+        with open(path, encoding='utf-8', errors='replace') as log_file:
+            for line in log_file:
+                self.feed(line)
+
+    def report(self):
+        """Return every aggregate as a JSON-serializable dict."""
+        for key, timeline in list(self._open.items()):
+            self._close(key, timeline)
+        self._open.clear()
+        return {
+            'lines': self.lines,
+            'unparsed_lines': self.unparsed,
+            'routes': {
+                route: {'latency_ms': self.route_latency[route].summary(),
+                        'status': dict(self.route_status[route])}
+                for route in sorted(self.route_status)
+            },
+            'openai_latency_ms': self.openai_latency.summary(),
+            'generations': self.generations,
+            'attempts': self.attempts,
+            'retry_rate': round(self.retried / self.generations, 3)
+            if self.generations else 0.0,
+            'tokens_per_call': self.tokens.summary(),
+            'top_ingredient_sets': [
+                {'ingredients': list(items), 'diet': diet or None, 'count': count}
+                for (items, diet), count in self.combos.most_common(self.top_n)
+            ]
+        }
+
+
+def format_report(report):
+    """Render a report as plain text."""
+    lines = [f"{report['lines']} lines ({report['unparsed_lines']} unparsed)", '', 'Routes:']
+    for route, data in report['routes'].items():
+        latency = data['latency_ms']
+        status = ', '.join(f'{code}x{n}' for code, n in sorted(data['status'].items()))
+        if latency['count']:
+            lines.append(f"  {route:<40} n={latency['count']:<6} p50={latency['p50']}ms "
+                         f"p90={latency['p90']}ms p99={latency['p99']}ms  [{status}]")
+        else:
+            lines.append(f'  {route:<40} [{status}]')
+
+    openai = report['openai_latency_ms']
+    lines += ['', f"OpenAI calls: n={openai['count']}"]
+    if openai['count']:
+        lines[-1] += f" p50={openai['p50']}ms p90={openai['p90']}ms p99={openai['p99']}ms"
+    lines.append(f"Generations: {report['generations']}, attempts: {report['attempts']}, "
+                 f"retry rate: {report['retry_rate']:.1%}")
+    tokens = report['tokens_per_call']
+    if tokens['count']:
+        lines.append(f"Tokens per call: mean={tokens['mean']} p50={tokens['p50']} "
+                     f"p90={tokens['p90']} max={tokens['max']}")
+    lines += ['', 'Top ingredient sets:']
+    for entry in report['top_ingredient_sets']:
+        diet = f" ({entry['diet']})" if entry['diet'] else ''
+        lines.append(f"  {entry['count']:>5}  {', '.join(entry['ingredients'])}{diet}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Analyze recipe API logs.')
+    parser.add_argument('paths', nargs='+', help='log files, oldest first')
+    parser.add_argument('--top', type=int, default=10, help='ingredient sets to list')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+
+    analyzer = LogAnalyzer(top_n=args.top)
+    for path in args.paths:
+        analyzer.feed_file(path)
+    report = analyzer.report()
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
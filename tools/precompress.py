@@ -0,0 +1,51 @@
+# Writes .gz (and .br, if brotli is installed) siblings of the built
+# frontend assets so they can be served without compressing per request.
+#
+# Usage (from the project root):
+#     python -m tools.precompress [directory]
+#
+# Only the standard library is needed; the app and its config are not
+# imported.
+
+import gzip
+import os
+import sys
+
+try:
+    import brotli
+except ImportError:  # Brotli is optional, gzip is always available
+    brotli = None
+
+STATIC_BUILD = os.path.abspath(os.path.join(
+    os.path.dirname(__file__), '..', 'backend', 'static', 'build'))
+EXTENSIONS = ('.js', '.css', '.html', '.map')
+
+
+def precompress_directory(directory, extensions=EXTENSIONS, level=9):
+    """Write ``.gz`` (and ``.br`` if available) siblings for static assets."""
+    written = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if not name.endswith(extensions):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            targets = [(path + '.gz', gzip.compress(data, compresslevel=level, mtime=0))]
+            if brotli is not None:
+                targets.append((path + '.br', brotli.compress(data, quality=11)))
+            for target, compressed in targets:
+                with open(target, 'wb') as f:
+                    f.write(compressed)
+                written.append(target)
+    return written
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    for path in precompress_directory(argv[0] if argv else STATIC_BUILD):
+        print(f'Wrote {path}')
+
+
+if __name__ == '__main__':
+    sys.exit(main())